@@ -0,0 +1,10 @@
+"""Tableau de bord servi avec ses routes d'export en flux (cf. dashboard.exports) ::
+
+    streamlit run app.py
+"""
+
+import streamlit as st
+
+from dashboard.exports import routes
+
+app = st.App("projet_Stage.py", routes=routes())
@@ -0,0 +1 @@
+"""Mesures de performance sur cohortes synthétiques (``python -m benchmarks.run``)."""
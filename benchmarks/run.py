@@ -0,0 +1,200 @@
+"""Mesures de performance du tableau de bord sur des cohortes synthétiques.
+
+Pour chaque taille de cohorte, des exports sont générés (``fredd.synthetic``)
+puis chaque étape est chronométrée avec son pic mémoire (``tracemalloc``) :
+lecture en flux, étapes du prétraitement, agrégats et index, et chaque
+constructeur de figure des vues (construction + sérialisation JSON envoyée au
+navigateur, dont la taille en octets est relevée). Les résultats peuvent être enregistrés en JSON et comparés à une
+mesure de référence pour repérer une régression avant un déploiement.
+
+Exécution depuis la racine du dépôt ::
+
+    python -m benchmarks.run --sizes 1000 10000 100000 --json mesures.json
+    python -m benchmarks.run --sizes 100000 --baseline mesures.json --tolerance 1.5
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+import plotly.express as px
+from streamlit.logger import set_log_level
+
+from fredd.aggregates import CohortAggregates
+from fredd.cube import AggregateCube
+from fredd.filters import FilterIndex
+from fredd.hierarchy import Hierarchy
+from fredd.missingness import binned_heatmap, null_patterns, pattern_order
+from fredd.patients import PatientIndex
+from fredd.preprocessing import derive_ages, downcast_integers, encode_categories, encode_codes, parse_dates
+from fredd.quality import check_sites
+from fredd.report import site_indicators
+from fredd.sankey import sankey_links
+from fredd.signs import count_combinations, sign_indicators
+from fredd.streaming import CSV_SEP, stream_exports
+from fredd.synthetic import write_cohort
+from fredd.timeline import Timeline
+from fredd.variants import GENE, VariantStore
+
+
+def measure(name, function, memory=True):
+    """Exécute ``function()`` ; renvoie son résultat et la mesure (durée en s, pic mémoire en Mo)."""
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = function()
+    finally:
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] / 2**20 if memory else None
+        if memory:
+            tracemalloc.stop()
+    return result, {'etape': name, 'secondes': seconds, 'pic_mo': peak}
+
+
+def _figure(build):
+    # Construction de la figure et sérialisation JSON (ce que Streamlit envoie au navigateur) ; renvoie sa taille
+    return lambda: len(build().to_json())
+
+
+def stages(paths):
+    """Étapes mesurées : (nom, fonction du contexte, clé sous laquelle garder le résultat ou ``None``)."""
+    from dashboard.parallel import run_by_site
+    from dashboard.state import FILTER_AGE_COLUMN, FILTER_COLUMNS
+    from dashboard.views import overview, sites, trends
+
+    files = [(path.name, path) for path in paths]
+
+    def filtered(ctx):
+        sites_ = ctx['filter_index'].values('site')[:1]
+        return ctx['filter_index'].select(ctx['df'], {'site': sites_}, age=(18, 65))
+
+    steps = [
+        ('lecture:csv_brut', lambda ctx: pd.read_csv(paths[0], sep=CSV_SEP, low_memory=False), 'raw'),
+    ]
+    # Étapes du prétraitement, dans l'ordre, sur le premier export lu en brut
+    steps += [(f'pretraitement:{step.__name__}', lambda ctx, step=step: step(ctx['raw']), None)
+              for step in (parse_dates, derive_ages, encode_codes, encode_categories, downcast_integers)]
+    steps += [
+        ('lecture:stream_exports', lambda ctx: stream_exports(files)[0], 'df'),
+        ('agregat:cube', lambda ctx: AggregateCube.from_frame(ctx['df']), 'cube'),
+        ('agregat:variants', lambda ctx: VariantStore.from_frame(ctx['df']), 'variants'),
+        ('agregat:index_filtres', lambda ctx: FilterIndex(ctx['df'], FILTER_COLUMNS, age_column=FILTER_AGE_COLUMN,
+                                                          positions={'gene': ctx['variants'].gene_positions()}),
+         'filter_index'),
+        ('agregat:selection_filtres', filtered, 'filtered'),
+        ('agregat:cube_site', lambda ctx: ctx['cube'].slice({'leg_site_inc_nom': ctx['filter_index'].values('site')[:1]}),
+         'site_cube'),
+        ('agregat:hierarchie', lambda ctx: Hierarchy.from_variants(ctx['variants']), 'hierarchy'),
+        ('agregat:index_patients', lambda ctx: PatientIndex(ctx['df']), None),
+        ('agregat:combinaisons_signes', lambda ctx: count_combinations(sign_indicators(ctx['df'])), None),
+        ('agregat:profils_manquants', lambda ctx: null_patterns(ctx['df']), None),
+        ('agregat:carte_manquants', lambda ctx: binned_heatmap(ctx['df'], order=pattern_order(ctx['df'])), 'heatmap'),
+        ('agregat:controles_qualite', lambda ctx: check_sites(ctx['df'], workers=1), None),
+        ('agregat:indicateurs_site', lambda ctx: site_indicators(ctx['df']), None),
+        ('agregat:liens_sankey', lambda ctx: sankey_links(ctx['variants'].genes['diaCli_diagMR_nom'],
+                                                          ctx['variants'].genes[GENE], top_k=20), None),
+        ('agregat:chronologie', lambda ctx: Timeline(ctx['df']), 'timeline'),
+        ('agregat:chronologie_intervalle', lambda ctx: ctx['timeline'].rollup(
+            'inclusion', 'trimestre', 'site', pd.Timestamp('2018-01-01'), pd.Timestamp('2020-12-31')), None),
+        ('agregat:agregats_delta', lambda ctx: CohortAggregates().add('cohorte', ctx['df']), None),
+        # Premier graphique : chargement des modèles Plotly, compté à part
+        ('figure:initialisation_plotly', lambda ctx: _figure(lambda: px.bar(x=[0], y=[0]))(), None),
+        ('figure:sexe', lambda ctx: _figure(lambda: overview.sex_figure(ctx['cube']))(), None),
+        ('figure:age', lambda ctx: _figure(lambda: overview.age_figure(ctx['cube']))(), None),
+        ('figure:diagnostics', lambda ctx: _figure(lambda: overview.diagnosis_figure(ctx['cube'], "Top 10"))(), None),
+        ('figure:genes', lambda ctx: _figure(lambda: overview.gene_figure(ctx['variants'], "Tous les gènes"))(), None),
+        ('figure:sankey', lambda ctx: _figure(lambda: overview.sankey_figure(ctx['variants'], 20, 1))(), None),
+        ('figure:camemberts_maladies', lambda ctx: _figure(lambda: sites.disease_pie_figure(ctx['cube'], ctx['filter_index'].values('site')[0]))(), None),
+        ('figure:genes_sites', lambda ctx: _figure(lambda: sites.global_genes_figure(ctx['variants']))(), None),
+        ('figure:variants_genes', lambda ctx: _figure(lambda: sites.gene_variants_figure(ctx['variants']))(), None),
+        ('figure:classes_genes', lambda ctx: _figure(lambda: sites.gene_class_figure(ctx['hierarchy']))(), None),
+        ('figure:sunburst', lambda ctx: _figure(lambda: sites.sunburst_figure(ctx['hierarchy']))(), None),
+        ('figure:sunburst_developpe', lambda ctx: _figure(lambda: sites.sunburst_figure(
+            ctx['hierarchy'], expand=ctx['hierarchy'].children().index[:1]))(), None),
+        ('figure:age_site', lambda ctx: _figure(lambda: sites.site_age_figure(ctx['site_cube']))(), None),
+        ('figure:diagnostics_site', lambda ctx: _figure(lambda: sites.site_diagnosis_figure(ctx['site_cube']))(), None),
+        ('figure:genes_site', lambda ctx: _figure(lambda: sites.site_gene_figure(
+            ctx['variants'].slice({'leg_site_inc_nom': ctx['filter_index'].values('site')[:1]})))(), None),
+        ('figure:acuite', lambda ctx: _figure(lambda: sites.acuity_figure(ctx['filtered']))(), None),
+        # Camemberts d'acuité de tous les sites, calculés dans le pool de threads de la vue
+        ('figure:acuite_tous_sites', lambda ctx: sum(size for _, size, _ in run_by_site(
+            lambda site: _figure(lambda: sites.acuity_figure(sites.site_rows(ctx['df'], site, sites.ACUITY_COLUMNS)))(),
+            ctx['filter_index'].values('site'))), None),
+        ('figure:inclusions', lambda ctx: _figure(lambda: trends.inclusions_figure(
+            ctx['timeline'], None, None, 'mois', 'site', True))(), None),
+        ('figure:delai_diagnostic', lambda ctx: _figure(lambda: trends.delay_figure(
+            ctx['timeline'], None, None, 'trimestre'))(), None),
+        ('figure:carte_manquants', lambda ctx: _figure(lambda: sites.missingness_figure(ctx['heatmap']))(), None),
+    ]
+    return steps
+
+
+def run(n_patients, n_sites=2, memory=True, seed=0):
+    """Mesure toutes les étapes pour une cohorte de ``n_patients`` ; renvoie une ligne par étape."""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        paths, generation = measure('generation', lambda: write_cohort(tmp, n_patients, n_sites, seed), memory=False)
+        results.append(generation)
+        ctx = {}
+        for name, function, key in stages(paths):
+            result, row = measure(name, lambda: function(ctx), memory)
+            if name.startswith('figure:'):
+                row['octets'] = result
+            results.append(row)
+            if key is not None:
+                ctx[key] = result
+    for row in results:
+        row['patients'] = n_patients
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Étapes plus lentes que la référence (même taille de cohorte) au-delà de ``tolerance``."""
+    reference = {(row['patients'], row['etape']): row['secondes'] for row in baseline}
+    slower = []
+    for row in results:
+        before = reference.get((row['patients'], row['etape']))
+        # En dessous de 10 ms, les écarts sont du bruit de mesure
+        if before is not None and row['secondes'] > max(before * tolerance, 0.01):
+            slower.append({**row, 'reference': before})
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mesure les étapes du tableau de bord sur des cohortes synthétiques.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000],
+                        help="tailles de cohorte (patients)")
+    parser.add_argument('--sites', type=int, default=2, help="nombre d'exports par cohorte")
+    parser.add_argument('--no-memory', action='store_true', help="sans mesure du pic mémoire (plus rapide)")
+    parser.add_argument('--json', help="enregistre les mesures dans ce fichier")
+    parser.add_argument('--baseline', help="mesures de référence (JSON) à comparer")
+    parser.add_argument('--tolerance', type=float, default=1.5, help="ralentissement toléré (défaut : x1.5)")
+    args = parser.parse_args(argv)
+
+    # Les caches Streamlit utilisés hors d'une application signalent l'absence de contexte
+    set_log_level('error')
+    results = []
+    for size in args.sizes:
+        results += run(size, args.sites, memory=not args.no_memory)
+    table = pd.DataFrame(results).pivot_table(index='etape', columns='patients', values=['secondes', 'pic_mo', 'octets'],
+                                              sort=False)
+    print(table.round(3).to_string())
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=1), encoding='utf-8')
+    if args.baseline:
+        slower = compare(results, json.loads(Path(args.baseline).read_text(encoding='utf-8')), args.tolerance)
+        for row in slower:
+            print(f"Régression : {row['etape']} ({row['patients']} patients) "
+                  f"{row['secondes']:.3f} s au lieu de {row['reference']:.3f} s")
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""Coût du démarrage à froid du tableau de bord : imports et premier rendu.
+
+Chaque mesure est prise dans un nouveau processus Python, comme sur un
+réplica qui vient de démarrer :
+
+- imports : temps d'import de chaque module, dans l'ordre où l'application les
+  charge (chaque ligne ne compte que ce que les précédentes n'ont pas chargé) ;
+- premier rendu : exécution du script ``projet_Stage.py`` (``AppTest``) sur une
+  cohorte synthétique déjà lue, une fois à froid puis une seconde fois, pour
+  chaque vue.
+
+Exécution depuis la racine du dépôt ::
+
+    python -m benchmarks.startup --patients 10000 --json demarrage.json
+    python -m benchmarks.startup --baseline demarrage.json --tolerance 1.5
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+APP = Path(__file__).resolve().parent.parent / 'projet_Stage.py'
+
+# Modules dans l'ordre de chargement par l'application puis par les vues
+IMPORTS = [
+    'streamlit',
+    'pandas',
+    'dashboard.state',
+    'dashboard.views',
+    'fredd.ingestion',
+    'fredd.snapshots',
+    'plotly.express',
+    'dashboard.views.overview',
+    'dashboard.views.sites',
+    'dashboard.views.patient',
+    'dashboard.views.report',
+]
+
+
+def _child(argv):
+    # Mesure exécutée dans un processus neuf ; le résultat est écrit en JSON sur la dernière ligne
+    mode, args = argv[0], argv[1:]
+    results = []
+    if mode == 'imports':
+        for name in args:
+            start = time.perf_counter()
+            __import__(name)
+            results.append({'etape': f'import:{name}', 'secondes': time.perf_counter() - start})
+        start = time.perf_counter()
+        import plotly.express as px
+        px.bar(x=[0], y=[0]).to_json()
+        results.append({'etape': 'figure:premiere_figure', 'secondes': time.perf_counter() - start})
+    else:
+        from streamlit.logger import set_log_level
+        from streamlit.testing.v1 import AppTest
+
+        from dashboard.views import VIEWS
+        from fredd.ingestion import ExportCache, load_exports
+
+        set_log_level('error')
+        view = VIEWS[int(args[0])]
+        df, version = load_exports(ExportCache(), [(Path(path).name, Path(path).read_bytes()) for path in args[1:]])
+        app = AppTest.from_file(str(APP), default_timeout=600)
+        app.session_state['data'], app.session_state['data_version'] = df, version
+        app.session_state['vue'] = view.label
+        name = view.module.rsplit('.', 1)[-1]
+        for step in ('premier_rendu', 'second_rendu'):
+            start = time.perf_counter()
+            app.run()
+            results.append({'etape': f'{step}:{name}', 'secondes': time.perf_counter() - start,
+                            'erreur': bool(app.exception)})
+    print(json.dumps(results))
+
+
+def _run_child(*args):
+    completed = subprocess.run([sys.executable, '-m', 'benchmarks.startup', '--mesure', *map(str, args)],
+                               capture_output=True, text=True, check=True, cwd=APP.parent)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run(n_patients, n_sites=2, seed=0):
+    """Mesures des imports puis du premier rendu de chaque vue ; une ligne par étape."""
+    from dashboard.views import VIEWS
+    from fredd.synthetic import write_cohort
+
+    results = _run_child('imports', *IMPORTS)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_cohort(tmp, n_patients, n_sites, seed)
+        for i, _ in enumerate(VIEWS):
+            results += _run_child('rendu', i, *paths)
+    for row in results:
+        row['patients'] = n_patients
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mesure le démarrage à froid du tableau de bord.")
+    parser.add_argument('--patients', type=int, default=10_000, help="taille de la cohorte synthétique")
+    parser.add_argument('--sites', type=int, default=2, help="nombre d'exports")
+    parser.add_argument('--json', help="enregistre les mesures dans ce fichier")
+    parser.add_argument('--baseline', help="mesures de référence (JSON) à comparer")
+    parser.add_argument('--tolerance', type=float, default=1.5, help="ralentissement toléré (défaut : x1.5)")
+    parser.add_argument('--mesure', nargs='+', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.mesure:
+        _child(args.mesure)
+        return
+
+    from streamlit.logger import set_log_level
+
+    from benchmarks.run import compare
+
+    # Les caches Streamlit utilisés hors d'une application signalent l'absence de contexte
+    set_log_level('error')
+    results = run(args.patients, args.sites)
+    for row in results:
+        flag = '  (erreur)' if row.get('erreur') else ''
+        print(f"{row['etape']:<40} {row['secondes']:8.3f} s{flag}")
+    print(f"{'imports (total)':<40} {sum(r['secondes'] for r in results if r['etape'].startswith('import:')):8.3f} s")
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=1), encoding='utf-8')
+    if args.baseline:
+        slower = compare(results, json.loads(Path(args.baseline).read_text(encoding='utf-8')), args.tolerance)
+        for row in slower:
+            print(f"Régression : {row['etape']} {row['secondes']:.3f} s au lieu de {row['reference']:.3f} s")
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
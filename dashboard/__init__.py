@@ -0,0 +1 @@
+"""Tableau de bord Streamlit FREDD : ressources partagées et vues."""
@@ -0,0 +1,112 @@
+"""Téléchargement en flux de la cohorte filtrée.
+
+``st.download_button`` construit toujours le fichier entier en mémoire avant
+de l'envoyer. Quand le tableau de bord est lancé par ``streamlit run app.py``,
+les exports passent par une route HTTP du serveur (``ROUTE``) : au clic sur
+« Préparer l'export », la session enregistre la recette de l'export (source
+des blocs, format, nom de fichier) sous un jeton, et la route rend le fichier
+bloc par bloc dans une réponse en flux. Le téléchargement commence aussitôt et
+la mémoire du serveur reste bornée à un bloc, quelle que soit la taille de la
+cohorte. Une session ne garde qu'un export : il est retiré dès que les données,
+les filtres ou les options de l'export changent.
+
+Lancé par ``streamlit run projet_Stage.py``, le tableau de bord garde un
+bouton de téléchargement classique : le fichier n'est alors construit qu'au
+clic, mais en entier.
+"""
+
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from fredd.export import EXPORT_FORMATS, stream_export
+
+ROUTE = '/fredd/export/{token}'
+
+# Durée de validité d'un lien d'export (secondes) et nombre d'exports conservés par processus
+EXPORT_TTL = 15 * 60
+MAX_EXPORTS = 256
+
+# Vrai quand les routes d'export sont servies (lancement par app.py)
+_served = False
+
+
+@dataclass
+class Export:
+    """Recette d'un export : ``chunks()`` rend un nouvel itérateur de blocs à chaque téléchargement."""
+
+    chunks: object
+    fmt: str
+    file_name: str
+    created: float = field(default_factory=time.monotonic)
+
+
+class ExportRegistry:
+    """Exports enregistrés par les sessions, retrouvés par jeton ; partagé par tout le processus."""
+
+    def __init__(self, ttl=EXPORT_TTL, max_exports=MAX_EXPORTS):
+        self.ttl = ttl
+        self.max_exports = max_exports
+        self._lock = threading.Lock()
+        self._exports = OrderedDict()
+
+    def register(self, chunks, fmt, file_name):
+        """Enregistre un export et renvoie son jeton (un nouveau jeton à chaque appel)."""
+        with self._lock:
+            self._expire()
+            token = secrets.token_urlsafe(16)
+            self._exports[token] = Export(chunks, fmt, file_name)
+            while len(self._exports) > self.max_exports:
+                self._exports.popitem(last=False)
+            return token
+
+    def get(self, token):
+        with self._lock:
+            self._expire()
+            return self._exports.get(token)
+
+    def discard(self, token):
+        """Retire l'export ``token`` (et libère les données que sa recette retient)."""
+        with self._lock:
+            self._exports.pop(token, None)
+
+    def _expire(self):
+        now = time.monotonic()
+        for token, export in list(self._exports.items()):
+            if now - export.created > self.ttl:
+                del self._exports[token]
+
+
+REGISTRY = ExportRegistry()
+
+
+def export_url(token):
+    return ROUTE.format(token=token)
+
+
+async def export_endpoint(request):
+    """Réponse en flux de l'export du jeton demandé."""
+    from starlette.responses import PlainTextResponse, StreamingResponse
+
+    export = REGISTRY.get(request.path_params['token'])
+    if export is None:
+        return PlainTextResponse("Export inconnu ou expiré : relancer l'export depuis le tableau de bord.",
+                                 status_code=404)
+    mime, _ = EXPORT_FORMATS[export.fmt]
+    return StreamingResponse(stream_export(export.chunks(), export.fmt), media_type=mime,
+                             headers={'Content-Disposition': f'attachment; filename="{export.file_name}"'})
+
+
+def routes():
+    """Routes d'export à passer à ``st.App`` (cf. app.py)."""
+    from starlette.routing import Route
+
+    global _served
+    _served = True
+    return [Route(ROUTE, export_endpoint, methods=['GET'])]
+
+
+def streaming_available():
+    return _served
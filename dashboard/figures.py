@@ -0,0 +1,145 @@
+"""Cache des figures Plotly du tableau de bord.
+
+Une figure est identifiée par son nom, la version des données et les
+paramètres qui la déterminent (filtres, options d'affichage) : tant que ces
+entrées ne changent pas, la figure déjà construite est resservie. Le cache est
+borné en mémoire (taille JSON des figures) avec éviction LRU, et compte ses
+succès et échecs pour le panneau de débogage.
+
+La taille JSON d'une figure est aussi ce que reçoit le navigateur : chaque
+figure dispose d'un budget (octets). Une figure qui le dépasse est signalée
+dans les journaux et comptée, puis reconstruite en version réduite (moins de
+catégories, les autres regroupées) quand la vue en fournit une ; si elle
+dépasse encore le budget, elle n'est pas envoyée et un avis la remplace.
+
+La toute première figure d'un processus coûte bien plus que les suivantes
+(import de Plotly Express, chargement des modèles et des validateurs) :
+``warm_up`` la construit en arrière-plan dès le démarrage.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Catégories gardées par les versions réduites des figures qui dépassent leur budget
+BUDGET_CATEGORIES = 30
+
+
+def warm_up():
+    """Construit et sérialise une figure minimale pour charger Plotly avant le premier graphique."""
+    import plotly.express as px
+    import plotly.graph_objects  # noqa: F401
+    from plotly.subplots import make_subplots  # noqa: F401
+    px.bar(x=[0], y=[0]).to_json()
+
+
+def start_warm_up():
+    """Lance ``warm_up`` dans un thread d'arrière-plan et renvoie ce thread."""
+    thread = threading.Thread(target=warm_up, name='fredd-plotly-warm-up', daemon=True)
+    thread.start()
+    return thread
+
+
+def histogram_figure(hist, title=None, xaxis_title=None, yaxis_title="Nombre de personnes"):
+    """Histogramme Plotly d'une table ``debut``/``fin``/``patients`` (``fredd.binning.histogram``) : une barre par tranche."""
+    import plotly.graph_objects as go
+    fig = go.Figure(go.Bar(
+        x=(hist['debut'] + hist['fin']) / 2, y=hist['patients'], width=hist['fin'] - hist['debut'],
+        customdata=hist[['debut', 'fin']], hovertemplate="%{customdata[0]}–%{customdata[1]} : %{y}<extra></extra>"))
+    fig.update_layout(title=title, xaxis_title=xaxis_title, yaxis_title=yaxis_title, bargap=0.02)
+    return fig
+
+
+def budget_notice(size, budget):
+    """Figure vide affichée à la place d'une figure de ``size`` octets, au-delà du ``budget``."""
+    import plotly.graph_objects as go
+    fig = go.Figure()
+    fig.add_annotation(text=f"Graphique trop volumineux ({size / 2**10:.0f} Ko, budget {budget / 2**10:.0f} Ko) :"
+                            "<br>restreindre les filtres ou le nombre de catégories affichées.",
+                       showarrow=False, x=0.5, y=0.5, xref='paper', yref='paper')
+    fig.update_layout(xaxis_visible=False, yaxis_visible=False, height=200)
+    return fig
+
+
+class FigureCache:
+    """Cache LRU de figures Plotly borné par un budget mémoire (en octets).
+
+    ``budget`` est la taille maximale d'une figure envoyée (octets) ; les
+    figures plus grandes sont comptées dans ``over_budget`` et remplacées.
+    """
+
+    def __init__(self, max_bytes=256 * 2**20, budget=1 * 2**20):
+        self.max_bytes = max_bytes
+        self.budget = budget
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.n_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.over_budget = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, build, reduce=None):
+        """Renvoie ``(figure, taille JSON en octets)`` pour ``key`` ; la figure est construite par ``build()`` si absente.
+
+        Au-delà du budget, la figure est remplacée par ``reduce()`` (version
+        réduite) puis, si elle le dépasse encore, par un avis. Les figures
+        renvoyées sont partagées : elles ne doivent pas être modifiées.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                size, fig = self._entries[key]
+                return fig, size
+            self.misses += 1
+
+        fig = build()
+        size = len(fig.to_json())
+        if size > self.budget:
+            with self._lock:
+                self.over_budget += 1
+            logger.warning("Figure %s : %d octets, au-delà du budget de %d octets", key[0], size, self.budget)
+            if reduce is not None:
+                fig = reduce()
+                size = len(fig.to_json())
+            if size > self.budget:
+                fig = budget_notice(size, self.budget)
+                size = len(fig.to_json())
+
+        with self._lock:
+            if size > self.max_bytes:
+                return fig, size
+            if key in self._entries:
+                self.n_bytes -= self._entries[key][0]
+            self._entries[key] = (size, fig)
+            self._entries.move_to_end(key)
+            self.n_bytes += size
+            while self.n_bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.n_bytes -= evicted
+        return fig, size
+
+    def stats(self):
+        """Compteurs du cache : entrées, mémoire utilisée, succès et échecs."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.n_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'budget': self.budget,
+                'over_budget': self.over_budget,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.n_bytes = 0
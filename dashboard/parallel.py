@@ -0,0 +1,69 @@
+"""Calcul des sections par site dans un pool de threads, affichées au fil de l'eau.
+
+Les agrégats et les figures d'un site (requête SQL ou sélection pandas,
+comptes, construction et sérialisation de la figure) sont calculés dans un
+pool de threads ; le script Streamlit affiche chaque site dès qu'il est prêt,
+dans l'emplacement qui lui a été réservé. Les threads reçoivent le contexte
+d'exécution de la session (caches Streamlit) et le ``Recorder`` actif.
+
+Réglages : ``$FREDD_SITE_WORKERS`` threads (8 au plus par défaut) et
+``$FREDD_SITE_TIMEOUT`` secondes au plus par site (60 par défaut).
+"""
+
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+# Intervalle de vérification des délais pendant l'attente (secondes)
+_POLL = 0.05
+
+
+def site_workers():
+    return int(os.environ.get('FREDD_SITE_WORKERS', 0)) or min(8, os.cpu_count() or 1)
+
+
+def site_timeout():
+    return float(os.environ.get('FREDD_SITE_TIMEOUT', 60)) or None
+
+
+def run_by_site(function, sites, workers=None, timeout=None):
+    """Exécute ``function(site)`` pour chaque site ; génère ``(site, résultat, erreur)`` dans l'ordre de fin.
+
+    ``erreur`` vaut ``None``, l'exception levée, ou ``TimeoutError`` si le site
+    dépasse ``timeout`` secondes de calcul (son thread n'est pas interrompu,
+    mais son résultat est abandonné). ``workers=1`` calcule les sites un à un.
+    """
+    sites = list(sites)
+    if not sites:
+        return
+    workers = workers or site_workers()
+    timeout = timeout if timeout is not None else site_timeout()
+    script_context = get_script_run_ctx()
+    started = {}
+
+    def task(site):
+        started[site] = time.monotonic()
+        return function(site)
+
+    pool = ThreadPoolExecutor(max_workers=min(workers, len(sites)), thread_name_prefix='fredd-site',
+                              initializer=lambda: add_script_run_ctx(threading.current_thread(), script_context))
+    try:
+        # Un contexte par tâche : mesures enregistrées dans le Recorder de la session
+        futures = {pool.submit(contextvars.copy_context().run, task, site): site for site in sites}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=_POLL if timeout else None, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                yield futures[future], None if error else future.result(), error
+            if timeout:
+                now = time.monotonic()
+                for future in [f for f in pending if now - started.get(futures[f], now) > timeout]:
+                    pending.discard(future)
+                    yield futures[future], None, TimeoutError(f"plus de {timeout:g} s")
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
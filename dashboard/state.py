@@ -0,0 +1,209 @@
+"""Ressources du tableau de bord mises en cache par version des données.
+
+Les exports, le cube d'agrégats, les index, les figures, les snapshots et la
+base DuckDB sont partagés entre les sessions (``st.cache_resource``) ; ils ne
+sont construits que lorsqu'une vue qui en dépend est affichée. Les modules
+propres à une seule vue (valeurs manquantes, rapport, DuckDB) ne sont importés
+qu'au premier appel de la fonction qui les utilise.
+"""
+
+import os
+
+import streamlit as st
+
+from dashboard.figures import FigureCache, start_warm_up
+
+from fredd.cube import AggregateCube
+from fredd.filters import FilterIndex
+from fredd.ingestion import ExportCache
+from fredd.instrumentation import frame_memory, section
+from fredd.patients import ID_COLUMN, PatientIndex
+from fredd.signs import count_combinations, sign_indicators
+from fredd.snapshots import load_snapshot
+from fredd.variants import CONTEXT_COLUMNS, VariantStore, variant_columns
+
+# Colonnes des filtres de la barre latérale
+FILTER_COLUMNS = {'diagnostic': 'diaCli_diagMR_nom', 'gene': 'diaGen_var_hgcn_1', 'site': 'leg_site_inc_nom'}
+FILTER_AGE_COLUMN = 'leg_age_patientFREDD'
+
+
+# Cache des exports partagé entre les sessions : 16 fichiers max, 6 h de durée de vie
+@st.cache_resource
+def get_export_cache():
+    return ExportCache(max_entries=16, ttl=6 * 3600)
+
+
+# Cache des figures partagé entre les sessions, budget mémoire en Mo ($FREDD_FIGURE_CACHE_MB, 256 par défaut)
+# et budget par figure envoyée au navigateur en Ko ($FREDD_FIGURE_BUDGET_KB, 1024 par défaut)
+@st.cache_resource
+def get_figure_cache():
+    return FigureCache(max_bytes=int(os.environ.get('FREDD_FIGURE_CACHE_MB', 256)) * 2**20,
+                       budget=int(os.environ.get('FREDD_FIGURE_BUDGET_KB', 1024)) * 2**10)
+
+
+# Préchauffage de Plotly, une fois par processus, pendant le chargement des données de la première session
+@st.cache_resource
+def warm_up_figures():
+    return start_warm_up()
+
+
+def cached_figure(name, data_version, params, build, reduce=None):
+    """Figure ``name`` pour cette version des données et ces paramètres (filtres, options).
+
+    ``reduce()`` construit une version réduite de la figure, envoyée si elle dépasse son budget.
+    """
+    with section(f'figure:{name}') as record:
+        record.cache = 'hit'
+
+        def build_and_record():
+            record.cache = 'miss'
+            return build()
+        fig, record.payload = get_figure_cache().get((name, data_version, params), build_and_record, reduce)
+        return fig
+
+
+# Cube d'agrégats (site, diagnostic, gène, classe, nature, sexe, âge), un par version des données
+@st.cache_resource(max_entries=4)
+def get_cube(data_version, _df):
+    with section('agregat:cube', len(_df)):
+        return AggregateCube.from_frame(_df)
+
+
+# Gènes et variants de tous les emplacements au format long, une table par version des données
+@st.cache_resource(max_entries=4)
+def get_variant_store(data_version, _df):
+    with section('agregat:variants', len(_df)):
+        return VariantStore.from_frame(_df)
+
+
+# En mode SQL : seules les colonnes des emplacements de variants des lignes filtrées sont relues
+@st.cache_resource(max_entries=16)
+def get_sql_variant_store(data_version, filter_key, _database, _filters=None, _age=None):
+    with section('agregat:variants') as record:
+        columns = variant_columns(_database.columns) + CONTEXT_COLUMNS
+        frame = _database.frame(columns, _filters, _age)
+        record.rows = len(frame)
+        return VariantStore.from_frame(frame)
+
+
+# Arbre gène → classe → nature des variants, un par version des données et état des filtres
+@st.cache_resource(max_entries=16)
+def get_hierarchy(data_version, filter_key, _variants):
+    from fredd.hierarchy import Hierarchy
+    with section('agregat:hierarchie', len(_variants)):
+        return Hierarchy.from_variants(_variants)
+
+
+# Index des filtres de la barre latérale, construit une fois par version des données ;
+# le filtre des gènes porte sur tous les emplacements (index par gène de la table des variants)
+@st.cache_resource(max_entries=4)
+def get_filter_index(data_version, _df):
+    gene_positions = get_variant_store(data_version, _df).gene_positions()
+    with section('agregat:index_filtres', len(_df)):
+        return FilterIndex(_df, FILTER_COLUMNS, age_column=FILTER_AGE_COLUMN, positions={'gene': gene_positions})
+
+
+# Index des identifiants patients, construit une fois par version des données
+@st.cache_resource(max_entries=4)
+def get_patient_index(data_version, _df):
+    with section('agregat:index_patients', len(_df)):
+        return PatientIndex(_df)
+
+
+# Index des identifiants en mode SQL : seule la colonne des identifiants est relue
+@st.cache_resource(max_entries=4)
+def get_sql_patient_index(data_version, _database):
+    with section('agregat:index_patients') as record:
+        ids = _database.frame([ID_COLUMN])
+        record.rows = len(ids)
+        return PatientIndex(ids)
+
+
+# Résumé des valeurs manquantes d'un site : taux par colonne, profils et carte agrégée
+@st.cache_data(max_entries=16, show_spinner=False)
+def get_missingness(data_version, site, by_pattern, _df):
+    from fredd.missingness import binned_heatmap, null_patterns, null_rates, pattern_order
+    with section('agregat:valeurs_manquantes', len(_df)):
+        order = pattern_order(_df) if by_pattern else None
+        profiles, _ = null_patterns(_df)
+        return null_rates(_df), profiles, binned_heatmap(_df, order=order), order
+
+
+# Contrôles qualité de tous les sites : anomalies et résumé par contrôle et par site
+# (pool de processus pour les grandes tables : $FREDD_QC_WORKERS, tous les cœurs par défaut)
+@st.cache_data(max_entries=4, show_spinner=False)
+def get_quality(data_version, _df):
+    from fredd.quality import check_sites
+    with section('agregat:controles_qualite', len(_df)):
+        return check_sites(_df, workers=int(os.environ.get('FREDD_QC_WORKERS', 0)) or None)
+
+
+# En mode SQL : seules les colonnes lues par les contrôles qualité sont relues
+@st.cache_resource(max_entries=4)
+def get_sql_quality_rows(data_version, _database):
+    from fredd.quality import ID_COLUMN, SITE_COLUMN, rule_columns
+    with section('lecture:controles_qualite') as record:
+        columns = [col for col in [ID_COLUMN, SITE_COLUMN] + rule_columns() if col in _database.columns]
+        frame = _database.frame(columns)
+        record.rows = len(frame)
+        return frame
+
+
+# Index de dates triées et effectifs mensuels des événements (inclusions, comptes rendus…), un par version des données
+@st.cache_resource(max_entries=4)
+def get_timeline(data_version, _df):
+    from fredd.timeline import Timeline
+    with section('agregat:chronologie', len(_df)):
+        return Timeline(_df)
+
+
+# En mode SQL : seules les colonnes de dates et de ventilation sont relues
+@st.cache_resource(max_entries=4)
+def get_sql_timeline(data_version, _database):
+    from fredd.timeline import Timeline, timeline_columns
+    with section('agregat:chronologie') as record:
+        frame = _database.frame([col for col in timeline_columns() if col in _database.columns])
+        record.rows = len(frame)
+        return Timeline(frame)
+
+
+# Combinaisons de signes cliniques, par version des données et état des filtres
+@st.cache_data(max_entries=32, show_spinner=False)
+def get_sign_combinations(data_version, filter_key, _filtered_data):
+    return count_combinations(sign_indicators(_filtered_data))
+
+
+# Snapshot partagé entre les sessions, relu seulement si les fichiers Parquet ou les colonnes changent
+@st.cache_resource(max_entries=8)
+def load_dashboard_snapshot(root, sources, version, columns):
+    with section('lecture:snapshot') as record:
+        df = load_snapshot(root, columns=list(columns), sources=list(sources))
+        record.rows, record.memory = len(df), frame_memory(df)
+        return df
+
+
+# Rapport précalculé (python -m fredd.report), relu seulement si ses fichiers changent
+@st.cache_data(max_entries=4, show_spinner=False)
+def get_report(root, version):
+    from fredd.report import load_report
+    return load_report(root)
+
+
+# Base DuckDB sur un snapshot, une par processus et partagée en lecture seule entre les sessions
+# (threads : $FREDD_DUCKDB_THREADS, tous les cœurs par défaut)
+@st.cache_resource(max_entries=4)
+def get_snapshot_database(root, sources, version):
+    from fredd.sql import SnapshotDatabase
+    return SnapshotDatabase(root, list(sources), threads=int(os.environ.get('FREDD_DUCKDB_THREADS', 0)) or None)
+
+
+def sidebar_filters():
+    """Filtres de la vue globale laissés par la session : ``(filtres par dimension, (âge min, âge max), clé)``."""
+    filters = {dim: list(st.session_state.get(f'filtre_{dim}', [])) for dim in FILTER_COLUMNS}
+    age = tuple(st.session_state.get('filtre_age', (0, 100)))
+    return filters, age, (*map(tuple, filters.values()), *age)
+
+
+def get_sql_database():
+    """Base SQL interrogée par la session (snapshots avec DuckDB), sinon ``None``."""
+    return st.session_state.get('sql_database')
@@ -0,0 +1,72 @@
+"""Configuration statique de l'interface : styles, titres et gabarits HTML.
+
+Ces constantes sont construites une seule fois, à l'import du module, au lieu
+d'être redéfinies à chaque réexécution du script Streamlit ; les vues n'ont
+plus qu'à remplir les gabarits.
+"""
+
+# Style des differents onglets
+CSS = """
+    <style>
+        .sidebar .sidebar-content {
+            background-color: #004080;
+            padding: 20px;
+            border-radius: 10px;
+        }
+        .sidebar .sidebar-content h2, .sidebar .sidebar-content h3, .sidebar .sidebar-content h4 {
+            color: #004080;
+        }
+        .sidebar .stMultiSelect > label, .sidebar .stSlider > label {
+            font-weight: bold;
+        }
+        .main-title {
+            text-align: center;
+            font-size: 50px;
+            font-weight: bold;
+            color: #d62728;
+            margin-bottom: 40px;
+        }
+         .section-title {
+            text-align: left;
+            font-size: 34px;
+            font-weight: bold;
+            color: #0055a0;
+            margin-top: 20px;
+            margin-bottom: 30px;
+        }
+    </style>
+"""
+
+MAIN_TITLE = "<div class='main-title'>Tableau de bord 🩺 Clinique et 🧬 Génétique</div>"
+
+# Indicateurs principaux type Snowflake : pour les couleurs adapter en fonction de l'affiche de l'user #ffffff white et #000000 black
+KPI_CARD = """
+    <div style='background-color:#ffffff; padding:10px; border-radius:10px; text-align:center'>
+        <h3>{title}</h3>
+        <h1 style='color:{color}; font-size:50px'>{value}</h1>
+    </div>
+"""
+
+# Indicateurs principaux : (titre, couleur)
+KPI_STYLES = {
+    'patients': ("👤 Patients", '#1f77b4'),
+    'maladies': ("🩺 Maladies", '#2ca02c'),
+    'genes': ("🧬 Gènes", '#d62728'),
+    'sites': ("🏥 Sites", '#9467bd'),
+}
+
+# Liste d’icônes et couleurs par site (à adapter selon les noms de sites connus)
+SITE_STYLES = {
+    "Hôpital National des 15-20": {"color": "#d9f2ff", "icon": "🏥"},
+    "Hôpitaux universitaires de Strasbourg": {"color": "#e6ffe6", "icon": "🏛️"},
+}
+DEFAULT_SITE_STYLE = {"color": "#ffffff", "icon": "🏬"}
+
+SITE_CARD = """
+    <div style='background-color:#ffffff; padding:10px; border-radius:10px; text-align:center; box-shadow: 1px 1px 5px rgba(0,0,0,0.1);'>
+        <h4 style='color:#d62728; font-size:22px;'>{icon} {site}</h4>
+        <p style='margin:0; font-size:15px;'>👤 Patients : <strong style='color:#1f77b4'>{patients}</strong></p>
+        <p style='margin:0; font-size:15px;'>🩺 Maladies : <strong style='color:#2ca02c'>{maladies}</strong></p>
+        <p style='margin:0; font-size:15px;'>🧬 Gènes : <strong style='color:#d62728'>{genes}</strong></p>
+    </div>
+"""
@@ -0,0 +1,73 @@
+"""Vues du tableau de bord.
+
+Chaque vue déclare les colonnes qu'elle lit et les agrégats partagés dont elle
+dépend. Seule la vue sélectionnée est importée, chargée (colonnes utiles des
+snapshots) et calculée ; les autres ne coûtent rien.
+"""
+
+import importlib
+from dataclasses import dataclass
+
+from dashboard.state import FILTER_AGE_COLUMN, FILTER_COLUMNS
+from fredd.cube import AGE_COLUMN, DIMENSIONS, VARIANT_COLUMN
+from fredd.quality import ID_COLUMN, SITE_COLUMN, rule_columns
+from fredd.signs import SIGN_COLUMNS
+from fredd.timeline import timeline_columns
+from fredd.variants import CONTEXT_COLUMNS, variant_columns
+
+# Colonnes nécessaires à chaque agrégat partagé ; les emplacements de variants
+# (diaGen_var_*) dépendent de l'export et sont ajoutés par ``required_columns``
+AGGREGATE_COLUMNS = {
+    'cube': DIMENSIONS + [AGE_COLUMN, VARIANT_COLUMN],
+    'filters': list(FILTER_COLUMNS.values()) + [FILTER_AGE_COLUMN],
+    'signs': SIGN_COLUMNS,
+    'variants': CONTEXT_COLUMNS,
+}
+
+
+@dataclass(frozen=True)
+class View:
+    """Vue du tableau de bord : module exposant ``render(df, data_version)``.
+
+    Une vue sans ``requires_data`` est affichée même sans export chargé (``df`` vaut alors ``None``).
+    En mode SQL (DuckDB), ``df`` vaut aussi ``None`` : la vue interroge ``get_sql_database()``.
+    """
+
+    label: str
+    module: str
+    columns: tuple = ()
+    aggregates: tuple = ()
+    requires_data: bool = True
+
+    def required_columns(self, available=()):
+        """Colonnes lues par la vue et par ses agrégats, sans doublon.
+
+        ``available`` (colonnes du snapshot) fournit les emplacements de variants présents.
+        """
+        columns = list(self.columns)
+        for aggregate in self.aggregates:
+            columns += AGGREGATE_COLUMNS[aggregate]
+        if 'variants' in self.aggregates:
+            columns += variant_columns(available)
+        return list(dict.fromkeys(columns))
+
+    def render(self, df, data_version):
+        importlib.import_module(self.module).render(df, data_version)
+
+
+VIEWS = [
+    View("📊 Vue globale", 'dashboard.views.overview',
+         columns=('leg_age_patientFREDD',), aggregates=('cube', 'filters', 'signs', 'variants')),
+    View("🧍 Analyse par patient", 'dashboard.views.patient',
+         columns=('id', 'leg_site_inc_nom', 'adm_sexe', 'adm_date_naissance', 'adm_occupation',
+                  'diaCli_diagMR_nom', 'diaGen_var_hgcn_1', 'diaGen_var_nature_1_1', 'exaAcu_date',
+                  'exaAcu_quant_OD', 'exaAcu_quant_OG', 'exaChv_date', 'exaChv_type')),
+    View("🏥 Analyse comparative entre sites", 'dashboard.views.sites',
+         columns=('leg_site_inc_nom', 'leg_age_patientFREDD', 'diaCli_diagMR_nom', 'diaGen_var_hgcn_1',
+                  'exaAcu_type_examen_OG', 'exaAcu_type_examen_OD'),
+         aggregates=('cube', 'filters', 'variants')),
+    View("📈 Tendances temporelles", 'dashboard.views.trends', columns=tuple(timeline_columns())),
+    View("✅ Contrôles qualité", 'dashboard.views.quality', columns=(ID_COLUMN, SITE_COLUMN, *rule_columns())),
+    View("📋 Rapport des sites", 'dashboard.views.report', requires_data=False),
+    View("📚 Glossaire", 'dashboard.views.glossary'),
+]
@@ -0,0 +1,13 @@
+"""Glossaire des variables chargé depuis la barre latérale."""
+
+import streamlit as st
+
+
+def render(df_final, data_version):
+    st.markdown("<div class='section-title'>📚 Glossaire des variables</div>", unsafe_allow_html=True)
+    glossaire = st.session_state.get('glossaire')
+    if glossaire is not None:
+        st.write("Ci-dessous la liste des variables avec leurs définitions :")
+        st.dataframe(glossaire)
+    else:
+        st.info("Veuillez charger un fichier de glossaire pour afficher les définitions des variables.")
@@ -0,0 +1,395 @@
+"""Vue globale : indicateurs, filtres de la barre latérale et graphiques de synthèse."""
+
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from dashboard.state import (FILTER_COLUMNS, cached_figure, get_cube, get_filter_index,
+                             get_sign_combinations, get_sql_database, get_sql_variant_store, get_variant_store)
+from dashboard.exports import REGISTRY, export_url, streaming_available
+from dashboard.figures import BUDGET_CATEGORIES, histogram_figure
+from dashboard.static import DEFAULT_SITE_STYLE, KPI_CARD, KPI_STYLES, SITE_CARD, SITE_STYLES
+from fredd.binning import age_histogram, top_categories
+from fredd.cube import PATIENTS
+from fredd.export import EXPORT_FORMATS, frame_chunks, stream_export
+from fredd.instrumentation import timed
+from fredd.sankey import PALETTE, rgba, sankey_links
+from fredd.signs import SIGN_COLUMNS
+from fredd.streaming import HASH_COLUMN
+from fredd.schema import label_codes
+from fredd.variants import GENE, gene_columns
+
+# Colonnes proposées par défaut pour l'export de la cohorte filtrée
+EXPORT_COLUMNS = ['id', 'leg_site_inc_nom', 'adm_sexe', 'leg_age_patientFREDD', 'diaCli_diagMR_nom',
+                  'diaGen_var_hgcn_1']
+
+def render(df_final, data_version):
+    # En mode SQL, cartes, filtres et graphiques sont des requêtes DuckDB sur la base partagée
+    database = get_sql_database()
+    cube = database.cube() if database is not None else get_cube(data_version, df_final)
+    # Gènes de tous les emplacements (table longue des variants)
+    if database is not None:
+        variants = get_sql_variant_store(data_version, None, database)
+    else:
+        variants = get_variant_store(data_version, df_final)
+    # st.title("Tableau de bord: Vue globale")
+    st.markdown("<div class='section-title'>Vue globale (ensemble des données)</div>", unsafe_allow_html=True)
+
+    # Indicateurs principaux (gabarits et couleurs : dashboard.static)
+    indicators = {
+        'patients': cube.total(),
+        'maladies': cube.nunique('diaCli_diagMR_nom'),
+        'genes': variants.nunique(GENE),
+        'sites': cube.nunique('leg_site_inc_nom'),
+    }
+    for col, (key, value) in zip(st.columns(4), indicators.items()):
+        title, color = KPI_STYLES[key]
+        col.markdown(KPI_CARD.format(title=title, color=color, value=value), unsafe_allow_html=True)
+
+    # Détail par site
+    st.markdown("### 🏥 Indicateurs par site")
+    site_summary = pd.concat([
+        cube.rollup(['leg_site_inc_nom'], dropna=True).set_index('leg_site_inc_nom')[PATIENTS],
+        cube.nunique_by('diaCli_diagMR_nom', 'leg_site_inc_nom'),
+        variants.nunique_by(GENE, 'leg_site_inc_nom')
+    ], axis=1).fillna(0).astype(int).reset_index()
+    site_summary.columns = ['Site', 'Patients', 'Maladies identifiées', 'Gènes identifiés']
+    cols = st.columns(len(site_summary))
+
+    for i, row in site_summary.iterrows():
+        site_name = row['Site']
+        icon = SITE_STYLES.get(site_name, DEFAULT_SITE_STYLE)["icon"]
+
+        with cols[i]:
+            st.markdown(SITE_CARD.format(icon=icon, site=site_name, patients=row['Patients'],
+                                         maladies=row['Maladies identifiées'], genes=row['Gènes identifiés']),
+                        unsafe_allow_html=True)
+
+    with st.sidebar:
+        # Filtres
+        if database is not None:
+            options = {dim: database.values(col) for dim, col in FILTER_COLUMNS.items()}
+            options['gene'] = variants.values(GENE)
+        else:
+            filter_index = get_filter_index(data_version, df_final)
+            options = {dim: filter_index.values(dim) for dim in FILTER_COLUMNS}
+        diag_filter = st.multiselect("Filtrer par diagnostic clinique :", options=options['diagnostic'], key='filtre_diagnostic')
+        gene_filter = st.multiselect("Filtrer par gène identifié :", options=options['gene'], key='filtre_gene')
+        site_filter = st.multiselect("Filtrer par site d'inclusion :", options=options['site'], key='filtre_site')
+        age_min, age_max = st.slider("Filtrer par âge à l'inclusion(années)", 0, 100, (0, 100), key='filtre_age')
+
+    filters = {'diagnostic': diag_filter, 'gene': gene_filter, 'site': site_filter}
+    filter_key = (tuple(diag_filter), tuple(gene_filter), tuple(site_filter), age_min, age_max)
+    if database is not None:
+        # Un gène est cherché dans tous les emplacements diaGen_var_hgcn_* (OU en SQL)
+        column_filters = {FILTER_COLUMNS['diagnostic']: diag_filter, tuple(gene_columns(database.columns)): gene_filter,
+                          FILTER_COLUMNS['site']: site_filter}
+        # Seules les lignes retenues et les colonnes des signes sont relues
+        filtered_data = database.frame(SIGN_COLUMNS, column_filters, age=(age_min, age_max))
+        filtered_cube = cube.slice(column_filters, age=(age_min, age_max))
+        filtered_variants = get_sql_variant_store(data_version, filter_key, database, column_filters, (age_min, age_max))
+    else:
+        # Intersection des bitsets de chaque filtre, puis extraction des lignes retenues
+        positions = filter_index.positions(filters, age=(age_min, age_max))
+        filtered_data = df_final.take(positions)
+        # Les mêmes filtres appliqués au cube d'agrégats ; le cube ne connaissant que le premier gène,
+        # ses cellules sont recomptées sur les patients retenus quand un filtre de gènes est actif
+        if gene_filter:
+            filtered_cube = cube.subset(positions)
+        else:
+            filtered_cube = cube.slice({'diaCli_diagMR_nom': diag_filter, 'leg_site_inc_nom': site_filter},
+                                       age=(age_min, age_max))
+        filtered_variants = variants.subset(positions)
+
+    # st.metric("Nombre total de patients", len(filtered_data))
+    st.markdown("---")
+    st.subheader("📊 Visualisations globales")
+    # Les figures sont resservies depuis le cache tant que la version des données et les filtres sont inchangés
+    st.plotly_chart(cached_figure('sexe', data_version, filter_key, lambda: sex_figure(filtered_cube)))
+    st.plotly_chart(cached_figure('age', data_version, filter_key, lambda: age_figure(filtered_cube)))
+
+    # Sections à widgets locaux : fragments relancés seuls quand leur widget change
+    show_diagnoses(data_version, filter_key, filtered_cube)
+    show_sign_combinations(data_version, filter_key, filtered_data)
+    show_genes(data_version, filter_key, filtered_variants)
+
+    # ********* Correlation entre les variables *************
+    show_sankey(data_version, filter_key, filtered_variants)
+
+    # Export de la cohorte filtrée : les lignes retenues sont relues par blocs, sans copie entière
+    with st.sidebar:
+        if database is not None:
+            show_export(data_version, filter_key, database.columns, filtered_cube.total(),
+                        lambda columns: database.iter_frames(columns, column_filters, age=(age_min, age_max)))
+        else:
+            show_export(data_version, filter_key, df_final.columns, len(positions),
+                        lambda columns: frame_chunks(df_final, positions, columns))
+
+
+@st.fragment
+@timed('section:diagnostics')
+def show_diagnoses(data_version, filter_key, filtered_cube):
+    st.subheader("🩺 Répartition des maladies selon le diagnostic clinique ")
+    mode = st.selectbox("Afficher :", ["Toutes les maladies", "Top 10"])
+    st.plotly_chart(cached_figure('diagnostics', data_version, (filter_key, mode),
+                                  lambda: diagnosis_figure(filtered_cube, mode),
+                                  lambda: diagnosis_figure(filtered_cube, mode, BUDGET_CATEGORIES)))
+
+
+@st.fragment
+@timed('section:combinaisons_signes')
+def show_sign_combinations(data_version, filter_key, filtered_data):
+    st.subheader("🔍 Visualisation des combinaisons de signes cliniques")
+    # Ajuster le nombre de combinaison
+    top_n = st.slider("Nombre de combinaisons à afficher", 5, 50, 10)
+    st.plotly_chart(cached_figure('signes', data_version, (filter_key, top_n),
+                                  lambda: sign_figure(data_version, filter_key, filtered_data, top_n)),
+                    use_container_width=True)
+
+
+@st.fragment
+@timed('section:genes')
+def show_genes(data_version, filter_key, filtered_variants):
+    st.subheader("🧬Répartition des gènes selon le test génétique ")
+    mode = st.selectbox("Afficher :", ["Tous les gènes", "Top 10"])
+    st.plotly_chart(cached_figure('genes', data_version, (filter_key, mode),
+                                  lambda: gene_figure(filtered_variants, mode),
+                                  lambda: gene_figure(filtered_variants, mode, BUDGET_CATEGORIES)),
+                    use_container_width=True)
+
+
+@st.fragment
+@timed('section:sankey')
+def show_sankey(data_version, filter_key, filtered_variants):
+    st.markdown("## 🔄 Corrélation entre maladies et gènes")
+    # Maladies et gènes les moins fréquents regroupés en « Autres », flux faibles masqués
+    col_top, col_flow = st.columns(2)
+    top_k = col_top.slider("Nombre de maladies et de gènes affichés", 5, 100, 20)
+    min_flow = col_flow.number_input("Flux minimal (patients)", min_value=1, value=1)
+    st.plotly_chart(cached_figure('sankey', data_version, (filter_key, top_k, min_flow),
+                                  lambda: sankey_figure(filtered_variants, top_k, min_flow)),
+                    use_container_width=False)
+
+
+@st.fragment
+def show_export(data_version, filter_key, columns, n_patients, chunks):
+    with st.expander("📤 Exporter la cohorte filtrée"):
+        columns = [col for col in columns if col != HASH_COLUMN]
+        selected = st.multiselect("Colonnes exportées :", columns,
+                                  default=[col for col in EXPORT_COLUMNS if col in columns], key='export_colonnes')
+        fmt = st.radio("Format :", list(EXPORT_FORMATS), format_func=str.upper, horizontal=True, key='export_format')
+        if not selected:
+            st.caption("Choisir au moins une colonne.")
+            return
+        mime, extension = EXPORT_FORMATS[fmt]
+        file_name = f"cohorte_fredd{extension}"
+        label = f"Télécharger {n_patients} patients ({fmt.upper()})"
+        if streaming_available():
+            # Lien vers la route d'export (app.py) : fichier envoyé bloc par bloc. L'export n'est enregistré
+            # qu'au clic, et celui de la session est retiré dès que les données ou la sélection changent
+            key = (data_version, filter_key, tuple(selected), fmt)
+            previous = st.session_state.get('export_lien')
+            if previous is not None and (previous[0] != key or REGISTRY.get(previous[1]) is None):
+                REGISTRY.discard(previous[1])
+                del st.session_state['export_lien']
+                previous = None
+            if previous is None and st.button("Préparer l'export", key='export_preparer'):
+                previous = (key, REGISTRY.register(lambda: chunks(selected), fmt, file_name))
+                st.session_state['export_lien'] = previous
+            if previous is not None:
+                st.link_button(label, export_url(previous[1]))
+        else:
+            # Sans la route d'export, le fichier n'est construit qu'au clic, mais en entier
+            st.download_button(label, lambda: b''.join(stream_export(chunks(selected), fmt)), file_name=file_name,
+                               mime=mime, on_click='ignore')
+            st.caption("Pour un téléchargement en flux, lancer `streamlit run app.py`.")
+
+
+def sex_figure(filtered_cube):
+    # Cammenbert sexe des patients
+    proportions = filtered_cube.counts('adm_sexe', dropna=True).reset_index()
+    proportions.columns = ['adm_sexe', 'proportion']
+    totals_counts = proportions['proportion'].sum()
+    proportions['Percentage'] = (proportions['proportion'] / totals_counts * 100).round(1)
+
+    proportions['label'] = label_codes(proportions['adm_sexe'], 'adm_sexe')
+
+    fig1 = px.pie(
+        proportions,
+        names='label',
+        values='proportion',
+        title=f"<b>Sexe des patients",
+        color_discrete_sequence=px.colors.qualitative.Bold
+
+    )
+    fig1.update_traces(textposition='inside', textinfo='percent+label+value')
+    return fig1
+
+
+def age_figure(filtered_cube):
+    # ****************** Histogramme age des patients à l'inclusion dans FREDD *********************
+    # Tranches de 5 ans comptées sur le cube : une barre par tranche, quel que soit le nombre de patients
+    fig2 = histogram_figure(age_histogram(filtered_cube), title="<b>Age des patients à l'inclusion dans FREDD",
+                            xaxis_title="Âge")
+    fig2.update_layout(title_font_size=17)
+    return fig2
+
+
+def diagnosis_figure(filtered_cube, mode, limit=None):
+    # ************** Diagnostic clinique *******************
+    # Avec ``limit``, maladies au-delà des ``limit`` premières regroupées en « Autres »
+    diagnosis_counts = top_categories(filtered_cube.counts('diaCli_diagMR_nom'), limit).reset_index()
+    diagnosis_counts.columns = ['Diagnosis', 'Number of cases']
+    diagnosis_counts['Diagnosis'] = diagnosis_counts['Diagnosis'].astype(object).fillna('Missing')
+    total_cases = diagnosis_counts['Number of cases'].sum()
+    diagnosis_counts['Percentage'] = (diagnosis_counts['Number of cases'] / total_cases * 100).round(1)
+
+    if mode == "Top 10":
+        data_to_plot = diagnosis_counts.head(10)
+    else:
+        data_to_plot = diagnosis_counts
+    fig3 = px.bar(
+        data_to_plot,
+        y='Diagnosis',
+        x='Number of cases',
+        color='Number of cases',
+        orientation='h',
+        color_continuous_scale='Plasma',
+        text='Number of cases',
+        title='<b>Maladies</b>',
+        labels={'Number of cases': 'Nombre de cas', 'Diagnosis': 'Maladies'},
+        height=900
+    )
+
+    fig3.update_layout(
+        yaxis={'categoryorder':'total ascending'}, 
+        plot_bgcolor='rgba(0,0,0,0)',
+        hovermode='y unified',
+        title_font={'size': 17},
+        uniformtext_minsize=8,
+        margin=dict(r=150),
+        bargap=0.1
+    )
+
+    fig3.update_traces(
+        texttemplate='<b>%{x}</b><br>(%{customdata[0]}%)',
+        hovertemplate="<b>%{y}</b><br>Cases: %{x}<br>Proportion: %{customdata[0]}%",
+        textposition='auto',
+        customdata=data_to_plot[['Percentage']]
+    )
+    return fig3
+
+
+def sign_figure(data_version, filter_key, filtered_data, top_n):
+    # ***************** Signes cliniques associés aux patients *************************
+    # Matrice binaire et comptage des combinaisons (recalculés seulement si les filtres changent)
+    combos = get_sign_combinations(data_version, filter_key, filtered_data)
+
+    fig = px.bar(
+        combos.head(top_n),
+        x='combination',
+        y='count',
+        text='count',
+        color='count',
+        color_continuous_scale='Plasma',
+        labels={'combination': 'Combinaison de signes cliniques', 'count': 'Nombre de patients'},
+        title=f"{top_n} combinaisons les plus fréquentes",
+        height=800 if top_n <= 25 else 1200
+    )
+
+    fig.update_layout(
+        xaxis_tickangle=-45,
+        height=1000,
+        hovermode='x unified',
+        plot_bgcolor='rgba(0,0,0,0)',
+        title_font=dict(size=20)
+    )
+    fig.update_traces(
+        textposition='auto',
+        hovertemplate="<b>%{y}</b><br>Cases: %{x}",
+    )
+    return fig
+
+
+def gene_figure(filtered_variants, mode, limit=None):
+    # ****************** Graphique Listes des gènes *************************
+    # Patients par gène, tous emplacements confondus ; « Missing » : patients sans gène
+    diagnosis_counts = top_categories(filtered_variants.counts(GENE, dropna=False), limit).reset_index()
+    diagnosis_counts.columns = ['Diagnosis', 'Number of cases']
+    diagnosis_counts['Diagnosis'] = diagnosis_counts['Diagnosis'].astype(object).fillna('Missing')
+    total_cases = diagnosis_counts['Number of cases'].sum()
+    diagnosis_counts['Percentage'] = (diagnosis_counts['Number of cases'] / total_cases * 100).round(1)
+
+    if mode == "Top 10":
+        data_to_plot = diagnosis_counts.head(10)
+    else:
+        data_to_plot = diagnosis_counts
+
+    fig4 = px.bar(
+        data_to_plot,
+        y='Diagnosis',
+        x='Number of cases',
+        color='Number of cases',
+        orientation='h',
+        color_continuous_scale='Plasma',
+        text='Number of cases',
+        title='<b>Gènes</b>',
+        labels={'Number of cases': 'Nombre de cas', 'Diagnosis': 'Genes'},
+        height=800 if mode == "Top 10" else 1200
+    )
+
+    fig4.update_layout(
+        yaxis={'categoryorder': 'total ascending'},
+        plot_bgcolor='rgba(0,0,0,0)',
+        hovermode='y unified',
+        height=1000,
+        title_font={'size': 20},
+        uniformtext_minsize=20
+    )
+
+    fig4.update_traces(
+        texttemplate='<b>%{x}</b><br>(%{customdata[0]}%)',
+        hovertemplate="<b>%{y}</b><br>Cases: %{x}<br>Proportion: %{customdata[0]}%",
+        textposition='auto',
+        customdata=data_to_plot[['Percentage']],
+        textfont_size=17
+    )
+    return fig4
+
+
+def sankey_figure(filtered_variants, top_k, min_flow):
+    # Flux maladie -> gène (tous emplacements) agrégés depuis la table des variants filtrée (sommes NumPy)
+    pairs = filtered_variants.rollup(['diaCli_diagMR_nom', GENE])
+    diagnoses, genes, links = sankey_links(pairs['diaCli_diagMR_nom'], pairs[GENE], pairs[PATIENTS],
+                                           top_k=top_k, min_flow=min_flow)
+    labels = diagnoses + genes
+
+    # colors
+    node_colors = ['#1f77b4'] * len(diagnoses) + ['red'] * len(genes)
+    link_colors = [rgba(PALETTE[source % len(PALETTE)], 0.7) for source in links['source']]
+    fig = go.Figure(data=[
+        go.Sankey(
+            node=dict(
+                pad=15,
+                thickness=20,
+                line=dict(color="black", width=0.5),
+                label=labels,
+                color=node_colors
+            ),
+            link=dict(
+                source=links['source'],
+                target=links['target'],
+                value=links['value'],
+                color=link_colors,
+                hovertemplate='Source: %{source.label}<br />Target: %{target.label}<br />Count: %{value}<extra></extra>'
+            )
+        )
+    ])
+
+    fig.update_layout(
+        title_text="Flux entre les maladies diagnostiquées et les gènes identifiés",
+        font_size=12,
+        width=1000,     
+        height=700)
+    return fig
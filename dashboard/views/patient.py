@@ -0,0 +1,51 @@
+"""Analyse par patient : recherche d'un identifiant et fiche clinique."""
+
+import streamlit as st
+
+from dashboard.state import get_patient_index, get_sql_database, get_sql_patient_index
+from fredd.instrumentation import timed
+from fredd.patients import ID_COLUMN
+
+# Nombre d'identifiants proposés par page de résultats
+PAGE_SIZE = 50
+
+PATIENT_COLUMNS = ['leg_site_inc_nom', 'adm_sexe', 'adm_date_naissance', 'adm_occupation', 'diaCli_diagMR_nom',
+                   'diaGen_var_hgcn_1', 'diaGen_var_nature_1_1', 'exaAcu_date',
+                   'exaAcu_quant_OD', 'exaAcu_quant_OG', 'exaChv_date', 'exaChv_type']
+
+
+def render(df_final, data_version):
+    st.markdown("<div class='section-title'>Analyse par patient</div>", unsafe_allow_html=True)
+    database = get_sql_database()
+    if database is not None:
+        st.metric("Nombre total de patients", database.cube().total())
+        show_patient(df_final, get_sql_patient_index(data_version, database))
+    else:
+        st.metric("Nombre total de patients", len(df_final))
+        show_patient(df_final, get_patient_index(data_version, df_final))
+
+
+# La recherche et le choix du patient ne relancent que la fiche
+@st.fragment
+@timed('section:fiche_patient')
+def show_patient(df_final, patient_index):
+    # Seule la page d'identifiants correspondant à la recherche est envoyée au navigateur
+    col_search, col_page = st.columns([3, 1])
+    prefix = col_search.text_input("Rechercher un identifiant patient (début de l'identifiant) :").strip()
+    _, total = patient_index.search(prefix, page_size=PAGE_SIZE)
+    n_pages = max(1, -(-total // PAGE_SIZE))
+    page = col_page.number_input(f"Page (sur {n_pages})", min_value=1, max_value=n_pages, value=1) - 1
+    ids, total = patient_index.search(prefix, page=page, page_size=PAGE_SIZE)
+    st.caption(f"{total} identifiant(s) correspondant(s)")
+    if not ids:
+        st.info("Aucun identifiant ne correspond à cette recherche.")
+        return
+    selected_id = st.selectbox("Sélectionner un identifiant patient :", ids)
+    database = get_sql_database()
+    if database is not None:
+        patient_data = database.frame(PATIENT_COLUMNS, {ID_COLUMN: [selected_id]})
+    else:
+        patient_data = patient_index.lookup(df_final, selected_id)
+    st.subheader("Fiche patient")
+    st.write("Informations cliniques principales :")
+    st.dataframe(patient_data[PATIENT_COLUMNS].T)
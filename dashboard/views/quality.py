@@ -0,0 +1,62 @@
+"""Contrôles qualité de tous les sites : résumé par contrôle et par site, et patients en anomalie."""
+
+import streamlit as st
+import plotly.express as px
+
+from dashboard.state import cached_figure, get_quality, get_sql_database, get_sql_quality_rows
+from fredd.quality import ID_COLUMN, QC_CHECKS, SITE_COLUMN, check_columns
+
+
+def render(df_final, data_version):
+    st.markdown("<div class='section-title'>✅ Contrôles qualité</div>", unsafe_allow_html=True)
+    database = get_sql_database()
+    rows = get_sql_quality_rows(data_version, database) if database is not None else df_final
+    anomalies, summary = get_quality(data_version, rows)
+    if summary.empty:
+        st.info("Aucun contrôle applicable : les colonnes contrôlées sont absentes des données.")
+        return
+
+    st.metric("⚠️ Anomalies", f"{len(anomalies)}",
+              help=f"{anomalies['ligne'].nunique()} patients concernés sur {len(rows)}")
+    tab_summary, tab_anomalies = st.tabs(["📊 Résumé par contrôle et par site", "📋 Patients en anomalie"])
+    with tab_summary:
+        counts = summary.pivot_table(index='controle', columns=SITE_COLUMN, values='anomalies', aggfunc='sum',
+                                     sort=False, dropna=False)
+        counts.insert(0, 'Description', [QC_CHECKS[check][0] for check in counts.index])
+        st.dataframe(counts)
+        st.plotly_chart(cached_figure('qc_rates', data_version, (), lambda: rates_figure(summary)),
+                        use_container_width=True)
+
+    with tab_anomalies:
+        show_anomalies(rows, anomalies, summary)
+
+
+def show_anomalies(rows, anomalies, summary):
+    col_check, col_site = st.columns(2)
+    checks = col_check.multiselect("Contrôles :", list(dict.fromkeys(summary['controle'])))
+    sites = col_site.multiselect("Sites :", list(dict.fromkeys(summary[SITE_COLUMN].dropna())))
+    selected = anomalies
+    if checks:
+        selected = selected[selected['controle'].isin(checks)]
+    if sites:
+        selected = selected[selected[SITE_COLUMN].isin(sites)]
+    st.write(f"{len(selected)} anomalies")
+    st.dataframe(selected.assign(description=selected['controle'].map(lambda check: QC_CHECKS[check][0])),
+                 hide_index=True)
+    st.download_button("Exporter les anomalies (CSV)", selected.to_csv(index=False, sep=';'),
+                       file_name="anomalies_qualite.csv", mime="text/csv")
+
+    # Valeurs des colonnes contrôlées pour les patients d'un seul contrôle
+    if len(checks) == 1:
+        columns = [ID_COLUMN, SITE_COLUMN] + check_columns(QC_CHECKS[checks[0]][1])
+        detail = rows.take(selected['ligne'].to_numpy())
+        st.dataframe(detail[[col for col in columns if col in detail.columns]], hide_index=True)
+
+
+def rates_figure(summary):
+    fig = px.bar(summary.assign(taux=summary['taux'] * 100), x='controle', y='taux', color=SITE_COLUMN,
+                 barmode='group', hover_data=['anomalies', 'lignes'],
+                 labels={'controle': 'Contrôle', 'taux': 'Lignes en anomalie (%)', SITE_COLUMN: 'Site',
+                         'anomalies': 'Anomalies', 'lignes': 'Lignes contrôlées'})
+    fig.update_layout(xaxis_tickangle=-30)
+    return fig
@@ -0,0 +1,47 @@
+"""Rapport des sites : indicateurs et contrôles qualité précalculés par ``python -m fredd.report``."""
+
+import os
+
+import streamlit as st
+import plotly.express as px
+
+from dashboard.state import cached_figure, get_report
+from fredd.report import QC_CHECKS, report_version
+
+
+def render(df_final, data_version):
+    st.markdown("<div class='section-title'>📋 Rapport des sites</div>", unsafe_allow_html=True)
+    # Rapport produit hors du tableau de bord : python -m fredd.report <exports.csv> --out <répertoire>
+    report_dir = st.text_input("Répertoire du rapport :", os.environ.get('FREDD_REPORT_DIR', 'reports'))
+    version = report_version(report_dir)
+    report = get_report(report_dir, version)
+    if not report:
+        st.info("Aucun rapport trouvé dans ce répertoire (python -m fredd.report <exports.csv> --out <répertoire>).")
+        return
+
+    if 'resume' in report:
+        st.subheader("🏥 Indicateurs par export")
+        st.dataframe(report['resume'].rename(columns={'source_file': 'Export', 'sites': 'Site(s)', 'patients': 'Patients',
+                                                      'maladies': 'Maladies', 'genes': 'Gènes', 'age_moyen': 'Âge moyen'}),
+                     hide_index=True)
+
+    if 'qc' in report:
+        st.subheader("✅ Contrôles qualité")
+        qc = report['qc'].pivot_table(index='controle', columns='source_file', values='anomalies', aggfunc='sum')
+        qc.insert(0, 'Description', [QC_CHECKS[check][0] if check in QC_CHECKS else '' for check in qc.index])
+        st.dataframe(qc)
+
+    if 'ages' in report:
+        st.subheader("📅 Âge à l'inclusion par export")
+        st.plotly_chart(cached_figure('report_ages', version, report_dir, lambda: ages_figure(report['ages'])))
+
+    st.subheader("🔎 Tables du rapport")
+    table = st.selectbox("Table :", sorted(report))
+    st.dataframe(report[table], hide_index=True)
+
+
+def ages_figure(ages):
+    ages = ages.assign(tranche=ages['debut'].astype(int).astype(str) + '–' + ages['fin'].astype(int).astype(str))
+    fig = px.bar(ages, x='tranche', y='patients', color='source_file', barmode='group',
+                 labels={'tranche': 'Âge', 'patients': 'Nombre de patients', 'source_file': 'Export'})
+    return fig
@@ -0,0 +1,384 @@
+"""Analyse comparative entre sites : un site en détail ou tous les sites comparés."""
+
+import streamlit as st
+import plotly.express as px
+from plotly.subplots import make_subplots
+import plotly.graph_objects as go
+
+from dashboard.figures import BUDGET_CATEGORIES, histogram_figure
+from dashboard.parallel import run_by_site
+from dashboard.state import (FILTER_COLUMNS, cached_figure, get_cube, get_filter_index, get_hierarchy, get_missingness,
+                             get_sql_database, get_sql_variant_store, get_variant_store, sidebar_filters)
+from fredd.binning import age_histogram, top_categories
+from fredd.cube import PATIENTS, VARIANTS
+from fredd.instrumentation import timed
+from fredd.missingness import row_range
+from fredd.schema import label_codes
+from fredd.snapshots import load_snapshot
+from fredd.variants import CLASSE, GENE, gene_columns
+
+# Gènes (et enfants de chaque nœud) affichés par défaut dans la vue hiérarchique
+HIERARCHY_TOP_K = 10
+
+# Colonnes lues pour le détail d'un site et pour les camemberts d'acuité
+SITE_COLUMNS = ['leg_site_inc_nom', 'leg_age_patientFREDD', 'diaCli_diagMR_nom']
+ACUITY_COLUMNS = ['exaAcu_type_examen_OG', 'exaAcu_type_examen_OD']
+
+
+def site_rows(df_final, site, columns, database=None):
+    """Lignes d'un site : requête SQL si une base DuckDB est donnée, sinon sélection dans ``df_final``."""
+    if database is not None:
+        return database.frame(columns, {'leg_site_inc_nom': [site]})
+    return df_final[df_final['leg_site_inc_nom'] == site]
+
+
+def filtered_variants(df_final, data_version, variants, database=None):
+    """Variants des patients retenus par les filtres de la vue globale : ``(clé des filtres, variants)``."""
+    filters, age, filter_key = sidebar_filters()
+    if not any(filters.values()) and age == (0, 100):
+        return filter_key, variants
+    if database is not None:
+        column_filters = {FILTER_COLUMNS['diagnostic']: filters['diagnostic'],
+                          tuple(gene_columns(database.columns)): filters['gene'],
+                          FILTER_COLUMNS['site']: filters['site']}
+        return filter_key, get_sql_variant_store(data_version, filter_key, database, column_filters, age)
+    return filter_key, variants.subset(get_filter_index(data_version, df_final).positions(filters, age))
+
+
+def render(df_final, data_version):
+    database = get_sql_database()
+    cube = database.cube() if database is not None else get_cube(data_version, df_final)
+    # Gènes et variants de tous les emplacements (table longue)
+    if database is not None:
+        variants = get_sql_variant_store(data_version, None, database)
+    else:
+        variants = get_variant_store(data_version, df_final)
+    sites = sorted(cube.counts('leg_site_inc_nom', dropna=True).index)
+    st.markdown("<div class='section-title'>🏥 Analyse comparative entre sites</div>", unsafe_allow_html=True)
+    with st.expander("▶️ Afficher la section Comparaison des sites", expanded=True):
+
+        site_filter = st.selectbox("Choisir un site spécifique ou comparer tous les sites :", ["Tous les sites"] + sites)
+
+        if site_filter != "Tous les sites":
+            site_data = site_rows(df_final, site_filter, SITE_COLUMNS, database)
+            st.metric(label="👥 Nombre de patients", value=len(site_data))
+
+            st.subheader("📊 Heatmap des données")
+            # Avec les snapshots, seules les lignes du site sont relues (toutes les colonnes)
+            if 'snapshot_dir' in st.session_state:
+                heatmap_data = load_snapshot(st.session_state['snapshot_dir'], sources=st.session_state['snapshot_sources'],
+                                             filters=[('leg_site_inc_nom', '=', site_filter)])
+            else:
+                heatmap_data = site_data
+            show_missingness(heatmap_data, data_version, site_filter)
+
+            # Histogramme et effectifs par maladie tirés du cube : la figure ne dépend pas du nombre de patients
+            site_cube = cube.slice({'leg_site_inc_nom': [site_filter]})
+            st.subheader("📅 Répartition par âge à l’inclusion")
+            st.write(f"Âge moyen : {site_data['leg_age_patientFREDD'].mean():.1f} ans")
+            st.plotly_chart(cached_figure('site_age', data_version, site_filter, lambda: site_age_figure(site_cube)))
+
+            # ************ Graphique des maladies identifiées pour chaque site ********************
+            st.subheader("🎯 Répartition des maladies identifiées")
+            st.plotly_chart(cached_figure('site_diagnostics', data_version, site_filter,
+                                          lambda: site_diagnosis_figure(site_cube),
+                                          lambda: site_diagnosis_figure(site_cube, BUDGET_CATEGORIES)))
+
+            st.subheader("🧬 Répartition des gènes identifiés")
+            site_variants = variants.slice({'leg_site_inc_nom': [site_filter]})
+            st.plotly_chart(cached_figure('site_genes', data_version, site_filter,
+                                          lambda: site_gene_figure(site_variants),
+                                          lambda: site_gene_figure(site_variants, BUDGET_CATEGORIES)))
+
+        else:
+            # *************** Graphique Maladies identifiées pour tous les sites*****************
+            # Un camembert par site, calculés en parallèle et affichés dès qu'ils sont prêts
+            st.subheader("🔎 Comparaison des maladies identifiées entre sites")
+            show_by_site(sites, lambda site: cached_figure('disease_pie', data_version, site,
+                                                           lambda: disease_pie_figure(cube, site)), columns=3)
+
+            # ************* Graphique des Gènes ***************
+            st.subheader("🧬 Comparaison gènes, classes entre sites")
+            tab1, tab2 = st.tabs(["Gènes entre les deux sites", "Variant par gène entre les sites"])
+            with tab1:
+                st.plotly_chart(cached_figure('global_genes', data_version, (), lambda: global_genes_figure(variants)),
+                                theme="streamlit", use_container_width=True)
+            with tab2:
+                st.plotly_chart(cached_figure('gene_variants', data_version, (), lambda: gene_variants_figure(variants)),
+                                theme="streamlit", use_container_width=True)
+
+            # Arbre gène → classe → nature (effectifs de tous les nœuds), restreint aux filtres de la vue globale
+            filter_key, tree_variants = filtered_variants(df_final, data_version, variants, database)
+            hierarchy = get_hierarchy(data_version, filter_key, tree_variants)
+            if tree_variants is not variants:
+                st.caption("Les filtres de la vue globale s'appliquent aux deux graphiques suivants.")
+
+            # ************ Graphique Gène ↔ Classe du variant *********************
+            st.subheader("🧪 Classe des variants par gène sur le top 10 des gènes")
+            st.plotly_chart(cached_figure('gene_class', data_version, filter_key, lambda: gene_class_figure(hierarchy)),
+                            use_container_width=True)
+
+            # 6. Sunburst Gène ↔ Classe ↔ Nature
+            st.subheader("🌞 Vue hiérarchique des variants (gène → classe → nature)")
+            show_hierarchy(data_version, filter_key, hierarchy)
+
+            show_acuity_exams(df_final, data_version, sites, database)
+
+
+# Sunburst élagué : les natures ne sont envoyées que pour le gène développé
+@st.fragment
+@timed('section:hierarchie')
+def show_hierarchy(data_version, filter_key, hierarchy):
+    col_top, col_gene = st.columns([1, 2])
+    top_k = col_top.slider("Enfants affichés par niveau", 3, 30, HIERARCHY_TOP_K, key='hierarchie_top')
+    expand = col_gene.selectbox("Développer un gène jusqu'à la nature des variants :",
+                                [None, *hierarchy.children().index[:top_k]],
+                                format_func=lambda gene: "Aucun" if gene is None else gene, key='hierarchie_gene')
+    expand = () if expand is None else (expand,)
+    st.plotly_chart(cached_figure('sunburst', data_version, (filter_key, top_k, expand),
+                                  lambda: sunburst_figure(hierarchy, top_k, expand)),
+                    use_container_width=True)
+
+
+# Carte des valeurs manquantes agrégée par tranches de lignes (taille bornée), avec détail à la demande
+@st.fragment
+@timed('section:valeurs_manquantes')
+def show_missingness(heatmap_data, data_version, site):
+    by_pattern = st.checkbox("Regrouper les lignes par profil de valeurs manquantes")
+    rates, profiles, heatmap, order = get_missingness(data_version, site, by_pattern, heatmap_data)
+    st.plotly_chart(cached_figure('missingness', data_version, (site, by_pattern), lambda: missingness_figure(heatmap)))
+
+    # Les sections sont déjà dans un expander : affichage à la demande par interrupteurs
+    if st.toggle("Taux de valeurs manquantes et profils les plus fréquents"):
+        col_rates, col_profiles = st.columns(2)
+        col_rates.dataframe((rates * 100).round(1).rename('% manquant').sort_values(ascending=False))
+        col_profiles.dataframe(profiles[['count', 'n_manquantes']].head(20)
+                               .rename(columns={'count': 'Patients', 'n_manquantes': 'Variables manquantes'}))
+
+    if st.toggle("Détail d'une plage de lignes"):
+        row_bin = st.selectbox("Plage de lignes :", heatmap.index)
+        if row_bin is not None:
+            start, stop = (int(bound) for bound in row_bin.split('–'))
+            st.plotly_chart(cached_figure('missingness_rows', data_version, (site, by_pattern, row_bin),
+                                          lambda: px.imshow(row_range(heatmap_data, start, stop + 1, order=order),
+                                                            aspect='auto')))
+
+
+# Le choix des sites ne relance que les camemberts d'acuité
+@st.fragment
+@timed('section:acuite')
+def show_acuity_exams(df_final, data_version, sites, database=None):
+    # *************** Examen de l'acuité visuelle *******************
+    st.subheader("👓 Comparaison des types d'examen d'acuité visuelle")
+    selected_sites = st.multiselect("Sélectionner les sites à comparer :", sites, default=sites)
+
+    # Lignes du site et figure calculées en parallèle, site par site
+    show_by_site(selected_sites, lambda site: cached_figure(
+        'acuity', data_version, site, lambda: acuity_figure(site_rows(df_final, site, ACUITY_COLUMNS, database))),
+        title="### 🏥 Site : {site}")
+
+
+def show_by_site(sites, build, columns=1, title=None):
+    """Réserve un emplacement par site, puis y affiche la figure ``build(site)`` dès qu'elle est calculée.
+
+    Les figures sont calculées dans un pool de threads (``dashboard.parallel``) ;
+    un site en erreur ou trop long est signalé sans bloquer les autres.
+    """
+    if not sites:
+        return
+    cols = st.columns(min(columns, len(sites)))
+    slots = {}
+    for i, site in enumerate(sites):
+        with cols[i % len(cols)]:
+            if title:
+                st.markdown(title.format(site=site))
+            slots[site] = st.empty()
+            slots[site].caption(f"⏳ {site} : calcul en cours…")
+    for site, fig, error in run_by_site(build, sites):
+        if isinstance(error, TimeoutError):
+            slots[site].warning(f"⏱️ {site} : calcul abandonné ({error}).")
+        elif error is not None:
+            slots[site].error(f"{site} : {error}")
+        else:
+            slots[site].plotly_chart(fig, use_container_width=True)
+
+
+def missingness_figure(heatmap):
+    fig_map = px.imshow(heatmap, zmin=0, zmax=1, aspect='auto', color_continuous_scale='Blues',
+                        labels={'x': 'Variable', 'y': 'Lignes', 'color': 'Part manquante'})
+    fig_map.update_layout(width=1000, height=800)
+    return fig_map
+
+
+def site_age_figure(site_cube):
+    return histogram_figure(age_histogram(site_cube), xaxis_title="Âge")
+
+
+def site_diagnosis_figure(site_cube, limit=None):
+    # Une barre par maladie (effectifs du cube), au lieu d'une ligne par patient ; au-delà de ``limit`` : « Autres »
+    counts = top_categories(site_cube.counts('diaCli_diagMR_nom', dropna=True), limit).reset_index()
+    fig_diag = px.bar(counts, x='diaCli_diagMR_nom', y=PATIENTS, title="Distribution des diagnostics",
+                      labels={'diaCli_diagMR_nom': 'Maladie', PATIENTS: 'Nombre de patients'})
+    fig_diag.update_layout(xaxis_tickangle=-45)
+    return fig_diag
+
+
+def site_gene_figure(site_variants, limit=None):
+    # Patients par gène (tous emplacements) du site ; au-delà de ``limit`` : « Autres »
+    counts = top_categories(site_variants.counts(GENE), limit).reset_index()
+    fig_genes = px.bar(counts, x=GENE, y=PATIENTS, title="Variants génétiques",
+                       labels={GENE: 'Gène', PATIENTS: 'Patients'})
+    fig_genes.update_layout(xaxis_tickangle=-45)
+    return fig_genes
+
+
+def disease_pie_figure(cube, site):
+    grouped = cube.slice({'leg_site_inc_nom': [site]}).rollup(['diaCli_diagMR_nom']).rename(columns={PATIENTS: 'count'})
+    grouped['diaCli_diagMR_nom'] = grouped['diaCli_diagMR_nom'].astype(object).fillna('Missing')
+
+    # Regrouper les maladies < 10 en "Autres"
+    grouped['maladie_affichée'] = grouped['diaCli_diagMR_nom'].where(grouped['count'] >= 10, 'Autres')
+    df_site = grouped.groupby('maladie_affichée', as_index=False)['count'].sum()
+
+    colors = ['#636EFA', '#EF553B', '#00CC96', '#AB63FA', '#FFA15A', '#19D3F3', '#FF6692', '#B6E880', '#FF97FF', '#FECB52']
+
+    fig = go.Figure(
+        go.Pie(
+            labels=df_site['maladie_affichée'],
+            values=df_site['count'],
+            name=site,
+            textinfo='percent+label+value',
+            showlegend=False,
+            marker=dict(colors=colors)
+        )
+    )
+
+    fig.update_layout(
+        title_text=f"<b>Site : {site}</b><br><sup>maladies < 10 patients regroupées</sup>",
+        height=400,
+        margin=dict(t=80, b=50)
+    )
+    return fig
+
+
+def global_genes_figure(variants):
+    grouped = variants.rollup([GENE, 'leg_site_inc_nom']).rename(columns={PATIENTS: 'count'})
+    color_mapping = {
+        'HNV15-20': 'red',
+        'HUV': 'blue'
+    }
+    fig_global_genes = px.bar(
+        grouped,
+        x=GENE,
+        y='count',
+        color='leg_site_inc_nom',
+        barmode='group',
+        text='count',
+        # color_discrete_map=color_mapping,
+        labels={GENE: 'Gènes', 'count': 'Nombre de cas', 'leg_site_inc_nom': 'Site'},
+        title="🧬 Comparaison des gènes identifiés entre sites",
+        height=1200
+    )
+    fig_global_genes.update_traces(
+        textposition='outside',
+        hovertemplate="<b>%{y}</b><br>Cases: %{x}",)
+    fig_global_genes.update_layout(xaxis_tickangle=-45)
+    return fig_global_genes
+
+
+def gene_variants_figure(variants):
+    # ****************** Graphique Gène ↔ Nb de variants ***********************
+    gene_var_count_all = variants.rollup([GENE, 'leg_site_inc_nom'], measure=VARIANTS)
+    gene_var_count_all.columns = ['Gène', 'Site', 'Total variants']
+
+    fig_gene_grouped = px.bar(
+        gene_var_count_all,
+        x='Gène',
+        y='Total variants',
+        color='Site',
+        text='Total variants',
+        barmode='group',
+        # color_discrete_map=color_mapping,
+        labels={'diaGen_var_hgcn_1': 'Gènes', 'leg_site_inc_nom': 'Site'},
+        title="🧬 Comparaison du nombre total de variants détectés par gène entre les sites",
+        height=1200)
+
+    fig_gene_grouped.update_traces(
+        textposition='outside',
+        hovertemplate="<b>%{y}</b><br>Cases: %{x}",)
+    fig_gene_grouped.update_layout(xaxis_tickangle=-45)
+    return fig_gene_grouped
+
+
+def gene_class_figure(hierarchy):
+    # Variants des 10 gènes qui en portent le plus, par classe, lus dans l'arbre gène → classe → nature
+    gene_class = hierarchy.breakdown(depth=2, top_k=10).rename(columns={VARIANTS: 'Occurrences',
+                                                                         CLASSE: 'Classe_label'})
+
+    # Barplot groupé avec facettes verticales
+    fig_gene_class = px.bar(
+        gene_class,
+        x=GENE,
+        y='Occurrences',
+        text='Occurrences',
+        color='leg_site_inc_nom',
+        barmode='group',
+        facet_row='Classe_label',
+        labels={
+            GENE: 'Gène',
+            'leg_site_inc_nom': 'Site',
+            'Occurrences': 'Nombre de variants',
+            'Classe_label': 'Classe'
+        },
+        title="📊 Répartition des classes de variants sur le top 10 des gènes par site"
+    )
+
+    fig_gene_class.update_layout(
+        height=1200,
+        margin=dict(t=100),
+        xaxis_tickangle=-45,
+        legend_title_text='Site'
+    )
+    fig_gene_class.update_traces(
+        textposition='outside',
+        hovertemplate="<b>%{y}</b><br>Cases: %{x}",)
+    fig_gene_class.update_layout(xaxis_tickangle=-45)
+    return fig_gene_class
+
+
+def sunburst_figure(hierarchy, top_k=HIERARCHY_TOP_K, expand=()):
+    # Gènes et classes élagués aux ``top_k`` premiers enfants (reste dans « Autres »), natures du gène développé ;
+    # effectifs en variants, qui s'additionnent d'un niveau à l'autre
+    nodes = hierarchy.nodes(top_k, depth=2, expand=expand)
+    fig_sunburst = go.Figure(go.Sunburst(ids=nodes['ids'], labels=nodes['labels'], parents=nodes['parents'],
+                                         values=nodes['values'], branchvalues='total',
+                                         hovertemplate="<b>%{label}</b><br>%{value} variants<extra></extra>"))
+    fig_sunburst.update_layout(title="Hiérarchie des gènes, classes et natures de mutation (nombre de variants)")
+    # Augmenter la taille du graphique
+    fig_sunburst.update_layout(
+        width=1000,   # Largeur en pixels
+        height=800    # Hauteur en pixels
+)
+    return fig_sunburst
+
+
+def acuity_figure(df_site):
+    variables = ACUITY_COLUMNS
+    variable_labels = {
+        'exaAcu_type_examen_OG': "Type d'examen OG",
+        'exaAcu_type_examen_OD': "Type d'examen OD"
+    }
+    fig = make_subplots(
+        rows=1, cols=2,
+        subplot_titles=[variable_labels[var] for var in variables],
+        specs=[[{'type': 'domain'}, {'type': 'domain'}]])
+    for i, col in enumerate(variables):
+        counts = df_site[col].value_counts(dropna=False).reset_index()
+        counts.columns = ['category', 'count']
+        counts['label'] = label_codes(counts['category'], col)
+        fig.add_trace(go.Pie(labels=counts['label'], values=counts['count'], textinfo='percent+value+label'), row=1, col=i+1)
+    fig.update_layout(
+        height=400,
+        width=800,
+        margin=dict(t=80, b=50))
+    return fig
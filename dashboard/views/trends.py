@@ -0,0 +1,131 @@
+"""Tendances temporelles : inclusions par période, délai jusqu'au diagnostic génétique et rendement diagnostique."""
+
+import calendar
+import datetime
+
+import numpy as np
+import streamlit as st
+import plotly.express as px
+import plotly.graph_objects as go
+
+from dashboard.figures import histogram_figure
+from dashboard.state import cached_figure, get_sql_database, get_sql_timeline, get_timeline
+from fredd.binning import histogram
+from fredd.instrumentation import timed
+from fredd.timeline import PATIENTS, PERIOD, PERIODS, SOLVED
+
+GROUP_LABELS = {None: "Aucune", 'site': "Site", 'diagnostic': "Diagnostic", 'gene': "Gène (premier saisi)"}
+
+# Valeurs les plus fréquentes affichées quand les effectifs sont ventilés (les autres sous « Autres »)
+TOP_VALUES = 8
+
+
+def render(df_final, data_version):
+    st.markdown("<div class='section-title'>📈 Tendances temporelles</div>", unsafe_allow_html=True)
+    database = get_sql_database()
+    if database is not None:
+        timeline = get_sql_timeline(data_version, database)
+    else:
+        timeline = get_timeline(data_version, df_final)
+    spans = [span for span in (timeline.span('inclusion'), timeline.span('compte_rendu')) if span]
+    if not spans:
+        st.info("Aucune date d'inclusion ni de compte rendu génétique dans les données.")
+        return
+    show_trends(data_version, timeline, min(first for first, _ in spans).date(), max(last for _, last in spans).date())
+
+
+@st.fragment
+@timed('section:tendances')
+def show_trends(data_version, timeline, first, last):
+    # Les dates sont cherchées par dichotomie dans l'index : déplacer le curseur ne relit aucune colonne
+    col_range, col_period, col_group = st.columns([3, 1, 1])
+    start, end = col_range.slider("Période :", min_value=first, max_value=last, value=(first, last),
+                                  format="MM/YYYY", key='tendances_periode')
+    period = col_period.radio("Pas :", list(PERIODS), format_func=str.capitalize, horizontal=True,
+                              key='tendances_pas')
+    by = col_group.selectbox("Ventiler par :", [None, *timeline.groups], format_func=GROUP_LABELS.get,
+                             key='tendances_ventilation')
+    # Le curseur affiche des mois : bornes ramenées au début et à la fin de leur mois, comme les effectifs
+    # mensuels de ``rollup``, pour que compteurs, délais et graphiques portent sur la même période
+    start = start.replace(day=1)
+    end = end.replace(day=calendar.monthrange(end.year, end.month)[1])
+    # Fin de période incluse jusqu'à la fin de sa journée
+    end = datetime.datetime.combine(end, datetime.time.max)
+    params = (start, end, period, by)
+
+    reports = timeline.rollup('compte_rendu', period, start=start, end=end)
+    delays = timeline.delays_between(start, end)
+    solved = reports[SOLVED].sum() / reports[PATIENTS].sum() if len(reports) else None
+    col_inc, col_cr, col_yield, col_delay = st.columns(4)
+    col_inc.metric("🗓️ Inclusions", timeline.count('inclusion', start, end))
+    col_cr.metric("🧬 Comptes rendus génétiques", timeline.count('compte_rendu', start, end))
+    col_yield.metric("🎯 Rendement diagnostique", "—" if solved is None else f"{solved:.0%}",
+                     help="Part des patients avec un compte rendu sur la période dont au moins un gène est identifié")
+    col_delay.metric("⏱️ Délai médian", f"{np.median(delays):.1f} ans" if len(delays) else "—",
+                     help="Des premiers signes au compte rendu génétique")
+
+    tab_inclusions, tab_delay, tab_yield = st.tabs(["🗓️ Inclusions", "⏱️ Délai jusqu'au diagnostic génétique",
+                                                    "🎯 Rendement diagnostique"])
+    with tab_inclusions:
+        rolling = st.checkbox("Ajouter les inclusions sur 12 mois glissants", key='tendances_glissant')
+        st.plotly_chart(cached_figure('inclusions', data_version, (params, rolling),
+                                      lambda: inclusions_figure(timeline, start, end, period, by, rolling)),
+                        use_container_width=True)
+    with tab_delay:
+        col_trend, col_hist = st.columns(2)
+        col_trend.plotly_chart(cached_figure('delai', data_version, params,
+                                             lambda: delay_figure(timeline, start, end, period)),
+                               use_container_width=True)
+        col_hist.plotly_chart(cached_figure('delai_histogramme', data_version, params[:2],
+                                            lambda: histogram_figure(histogram(delays, width=1, span=(0, 20)),
+                                                                     title="Répartition des délais",
+                                                                     xaxis_title="Délai (années)")),
+                              use_container_width=True)
+    with tab_yield:
+        st.plotly_chart(cached_figure('rendement', data_version, params,
+                                      lambda: yield_figure(timeline, start, end, period, by)),
+                        use_container_width=True)
+
+
+def inclusions_figure(timeline, start, end, period, by, rolling):
+    counts = timeline.rollup('inclusion', period, by, start, end, limit=TOP_VALUES)
+    labels = {PERIOD: "Période", PATIENTS: "Inclusions", 'valeur': GROUP_LABELS[by]}
+    fig = px.bar(counts, x=PERIOD, y=PATIENTS, color='valeur' if by else None, labels=labels)
+    if rolling and len(counts):
+        # Inclusions des 12 mois précédant chaque fin de période, par dichotomie dans l'index des dates
+        starts = counts[PERIOD].drop_duplicates().to_numpy()
+        ends = (starts.astype('datetime64[M]') + PERIODS[period]).astype('datetime64[ns]') - np.timedelta64(1, 'ns')
+        fig.add_trace(go.Scatter(x=starts, y=timeline.rolling('inclusion', ends),
+                                 name="12 mois glissants", mode='lines', yaxis='y2', line_color='black'))
+        fig.update_layout(yaxis2=dict(title="Inclusions sur 12 mois", overlaying='y', side='right',
+                                      showgrid=False))
+    fig.update_layout(title=f"Inclusions par {period}", bargap=0.1, legend_title_text=labels['valeur'])
+    return fig
+
+
+def delay_figure(timeline, start, end, period):
+    delays = timeline.delay_summary(period, start, end)
+    fig = go.Figure([
+        go.Scatter(x=delays[PERIOD], y=delays['q3'], mode='lines', line_width=0, showlegend=False,
+                   hoverinfo='skip'),
+        go.Scatter(x=delays[PERIOD], y=delays['q1'], mode='lines', line_width=0, fill='tonexty',
+                   fillcolor='rgba(31, 119, 180, 0.2)', name="1er – 3e quartile", hoverinfo='skip'),
+        go.Scatter(x=delays[PERIOD], y=delays['mediane'], mode='lines+markers', name="Médiane",
+                   customdata=delays[[PATIENTS]],
+                   hovertemplate="%{x|%m/%Y} : %{y:.1f} ans (%{customdata[0]} patients)<extra></extra>"),
+    ])
+    fig.update_layout(title="Délai des premiers signes au compte rendu génétique",
+                      xaxis_title=f"{period.capitalize()} du compte rendu", yaxis_title="Délai (années)")
+    return fig
+
+
+def yield_figure(timeline, start, end, period, by):
+    counts = timeline.rollup('compte_rendu', period, by, start, end, limit=TOP_VALUES)
+    counts = counts.assign(rendement=counts[SOLVED] / counts[PATIENTS] * 100)
+    labels = {PERIOD: f"{period.capitalize()} du compte rendu", 'rendement': "Patients avec un gène identifié (%)",
+              PATIENTS: "Comptes rendus", SOLVED: "Gène identifié", 'valeur': GROUP_LABELS[by]}
+    fig = px.line(counts, x=PERIOD, y='rendement', color='valeur' if by else None, markers=True,
+                  hover_data=[PATIENTS, SOLVED], labels=labels)
+    fig.update_layout(title="Rendement diagnostique par période", yaxis_range=[0, 100],
+                      legend_title_text=labels['valeur'])
+    return fig
@@ -0,0 +1,47 @@
+"""Outils d'analyse des exports FREDD (French Rare Eye Disease Database).
+
+Les noms publics sont importés à la première utilisation (``fredd.load_exports``…) :
+importer un sous-module comme ``fredd.cube`` ne charge pas tout le paquet.
+"""
+
+import importlib
+
+# Nom public -> sous-module qui le définit
+_EXPORTS = {
+    "AggregateCube": "fredd.cube",
+    "ExportCache": "fredd.ingestion",
+    "FilterIndex": "fredd.filters",
+    "PatientIndex": "fredd.patients",
+    "Timeline": "fredd.timeline",
+    "VariantStore": "fredd.variants",
+    "check_sites": "fredd.quality",
+    "code_labels": "fredd.schema",
+    "compute_report": "fredd.report",
+    "concat_exports": "fredd.preprocessing",
+    "count_combinations": "fredd.signs",
+    "fingerprint": "fredd.ingestion",
+    "label_codes": "fredd.schema",
+    "load_exports": "fredd.ingestion",
+    "load_report": "fredd.report",
+    "preprocess": "fredd.preprocessing",
+    "qc_violations": "fredd.quality",
+    "read_export": "fredd.ingestion",
+    "sign_indicators": "fredd.signs",
+    "site_indicators": "fredd.report",
+    "stream_export": "fredd.export",
+    "stream_exports": "fredd.streaming",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module 'fredd' has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,120 @@
+"""Agrégats précalculés d'un snapshot, mis à jour par delta.
+
+Pour chaque export (``source_file``), les effectifs sont tenus par site, par
+couple site × diagnostic, par couple site × gène et par combinaison de signes
+cliniques. Ils s'additionnent : au chargement d'une nouvelle version d'un
+export, on retire les lignes supprimées ou modifiées et on ajoute les lignes
+nouvelles ou modifiées, sans repasser sur les lignes inchangées. Le résumé par
+site, les comptes de diagnostics et de gènes et les combinaisons de signes en
+sont déduits.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from fredd.signs import count_combinations, sign_indicators
+
+SOURCE_COLUMN = 'source_file'
+COUNT_COLUMN = 'patients'
+
+SITE, DIAGNOSTIC, GENE = 'leg_site_inc_nom', 'diaCli_diagMR_nom', 'diaGen_var_hgcn_1'
+
+# Table d'agrégats -> colonnes de regroupement
+AGGREGATE_KEYS = {
+    'sites': [SITE],
+    'diagnostics': [SITE, DIAGNOSTIC],
+    'genes': [SITE, GENE],
+    'signs': ['combination'],
+}
+
+
+def frame_counts(df, name):
+    """Effectifs de la table ``name`` pour les lignes de ``df`` (colonnes absentes : valeurs manquantes)."""
+    columns = AGGREGATE_KEYS[name]
+    if name == 'signs':
+        combos = count_combinations(sign_indicators(df))
+        signs = combos.columns[:-2]
+        # Libellé indépendant de l'ordre d'apparition des signes : les comptes de plusieurs lots s'additionnent
+        labels = [', '.join(sorted(signs[row])) for row in combos[signs].to_numpy(dtype=bool)]
+        counts = pd.DataFrame({'combination': labels, COUNT_COLUMN: combos['count'].to_numpy()})
+        return counts.groupby('combination', as_index=False)[COUNT_COLUMN].sum()
+    keys = pd.DataFrame({col: df[col].astype(object) if col in df.columns else np.nan for col in columns},
+                        index=df.index)
+    return keys.groupby(columns, dropna=False).size().reset_index(name=COUNT_COLUMN)
+
+
+class CohortAggregates:
+    """Tables d'effectifs par export, additives (ajout et retrait de lignes)."""
+
+    def __init__(self, tables=None):
+        self.tables = {name: pd.DataFrame(columns=[SOURCE_COLUMN] + keys + [COUNT_COLUMN])
+                       for name, keys in AGGREGATE_KEYS.items()}
+        self.tables.update(tables or {})
+
+    def sources(self):
+        return sorted(set(self.tables['sites'][SOURCE_COLUMN]))
+
+    def _update(self, source, df, sign):
+        for name, keys in AGGREGATE_KEYS.items():
+            counts = frame_counts(df, name)
+            if counts.empty:
+                continue
+            counts[COUNT_COLUMN] *= sign
+            counts.insert(0, SOURCE_COLUMN, source)
+            merged = pd.concat([self.tables[name], counts], ignore_index=True)
+            merged = merged.groupby([SOURCE_COLUMN] + keys, dropna=False)[COUNT_COLUMN].sum().reset_index()
+            self.tables[name] = merged[merged[COUNT_COLUMN] != 0].reset_index(drop=True)
+
+    def add(self, source, df):
+        """Ajoute les lignes ``df`` de l'export ``source``."""
+        self._update(source, df, 1)
+
+    def remove(self, source, df):
+        """Retire les lignes ``df`` (telles qu'elles étaient stockées) de l'export ``source``."""
+        self._update(source, df, -1)
+
+    def drop_source(self, source):
+        for name, table in self.tables.items():
+            self.tables[name] = table[table[SOURCE_COLUMN] != source].reset_index(drop=True)
+
+    def replace_source(self, source, df):
+        """Recalcule entièrement les effectifs de l'export ``source``."""
+        self.drop_source(source)
+        self.add(source, df)
+
+    def counts(self, name, sources=None):
+        """Effectifs de la table ``name`` cumulés sur ``sources`` (tous les exports par défaut)."""
+        table = self.tables[name]
+        if sources is not None:
+            table = table[table[SOURCE_COLUMN].isin(sources)]
+        keys = AGGREGATE_KEYS[name]
+        totals = table.groupby(keys, dropna=False)[COUNT_COLUMN].sum()
+        return totals.sort_values(ascending=False, kind='stable').reset_index()
+
+    def site_summary(self, sources=None):
+        """Patients, maladies et gènes distincts par site."""
+        patients = self.counts('sites', sources).dropna(subset=[SITE]).set_index(SITE)[COUNT_COLUMN]
+        maladies = self.counts('diagnostics', sources).dropna().groupby(SITE)[DIAGNOSTIC].nunique()
+        genes = self.counts('genes', sources).dropna().groupby(SITE)[GENE].nunique()
+        summary = pd.concat([patients, maladies, genes], axis=1).fillna(0).astype(int).reset_index()
+        summary.columns = ['Site', 'Patients', 'Maladies identifiées', 'Gènes identifiés']
+        return summary
+
+    def value_counts(self, column, sources=None):
+        """Effectifs par diagnostic (``DIAGNOSTIC``) ou par gène (``GENE``), tous sites confondus."""
+        name = {DIAGNOSTIC: 'diagnostics', GENE: 'genes'}[column]
+        counts = self.counts(name, sources).groupby(column, dropna=False)[COUNT_COLUMN].sum()
+        return counts.sort_values(ascending=False, kind='stable')
+
+    def save(self, root):
+        root = Path(root)
+        root.mkdir(parents=True, exist_ok=True)
+        for name, table in self.tables.items():
+            table.astype({col: object for col in AGGREGATE_KEYS[name]}).to_parquet(root / f"{name}.parquet", index=False)
+
+    @classmethod
+    def load(cls, root):
+        root = Path(root)
+        return cls({path.stem: pd.read_parquet(path) for path in root.glob('*.parquet') if path.stem in AGGREGATE_KEYS})
@@ -0,0 +1,60 @@
+"""Agrégats compacts des graphiques : histogrammes et effectifs par catégorie.
+
+Les graphiques reçoivent des tables déjà agrégées (une ligne par tranche ou
+par catégorie) au lieu des lignes patients : la figure envoyée au navigateur a
+une taille qui dépend du nombre de tranches ou de catégories, et non du nombre
+de patients. Les comptes sont faits en NumPy côté serveur.
+"""
+
+import numpy as np
+import pandas as pd
+
+from fredd.cube import AGE_BUCKET, PATIENTS, bucket_ages
+
+# Largeur des tranches d'âge (années) et étendue minimale des histogrammes d'âge
+AGE_WIDTH = 5
+AGE_RANGE = (0, 100)
+
+OTHER = 'Autres'
+
+
+def bin_edges(values, width=AGE_WIDTH, span=AGE_RANGE):
+    """Bornes régulières de largeur ``width`` couvrant ``span`` et toutes les ``values`` connues."""
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    low, high = span
+    if len(values):
+        low, high = min(low, values.min()), max(high, values.max())
+    start = np.floor(low / width) * width
+    stop = max(np.ceil(high / width) * width, start + width)
+    return np.arange(start, stop + width / 2, width)
+
+
+def histogram(values, weights=None, edges=None, width=AGE_WIDTH, span=AGE_RANGE):
+    """Effectifs par tranche ``[debut, fin[`` (la dernière tranche est fermée), valeurs manquantes ignorées.
+
+    ``weights`` donne le nombre de patients de chaque valeur (valeurs déjà agrégées).
+    """
+    values = np.asarray(values, dtype=float)
+    known = ~np.isnan(values)
+    if edges is None:
+        edges = bin_edges(values, width, span)
+    if weights is not None:
+        weights = np.asarray(weights, dtype=float)[known]
+    counts, edges = np.histogram(values[known], bins=edges, weights=weights)
+    return pd.DataFrame({'debut': edges[:-1], 'fin': edges[1:], 'patients': counts.astype(np.int64)})
+
+
+def age_histogram(cube, edges=None):
+    """Histogramme des âges d'un cube (``AggregateCube`` ou ``SqlCube``), sans relire les lignes patients."""
+    counts = cube.age_counts()
+    return histogram(bucket_ages(counts[AGE_BUCKET]), weights=counts[PATIENTS], edges=edges)
+
+
+def top_categories(counts, limit=None, other=OTHER):
+    """Effectifs (série triée par ordre décroissant) réduits aux ``limit`` premiers, le reste sous ``other``."""
+    if limit is None or len(counts) <= limit:
+        return counts
+    head = counts.iloc[:limit]
+    rest = pd.Series([counts.iloc[limit:].sum()], index=[other], name=counts.name)
+    return pd.concat([head, rest]).rename_axis(counts.index.name)
@@ -0,0 +1,132 @@
+"""Cube d'agrégats des indicateurs du tableau de bord.
+
+Le cube compte les patients (et somme le nombre de variants) pour chaque
+combinaison observée de site, diagnostic, gène, classe et nature du variant,
+sexe et tranche d'âge. Il est construit une fois par version des données ; les
+cartes, graphiques et filtres sont ensuite obtenus en découpant et en agrégeant
+ce cube de quelques milliers de lignes au lieu de parcourir la table patients.
+
+Le cube garde aussi la cellule de chaque ligne d'origine : le sous-cube d'un
+ensemble de patients quelconque (filtre sur tous les emplacements de gènes,
+par exemple) est recompté par cellule (``np.bincount``), sans regrouper de
+nouveau les lignes patients.
+"""
+
+import numpy as np
+import pandas as pd
+
+DIMENSIONS = [
+    'leg_site_inc_nom',
+    'diaCli_diagMR_nom',
+    'diaGen_var_hgcn_1',
+    'diaGen_var_classe_1_1',
+    'diaGen_var_nature_1_1',
+    'adm_sexe',
+]
+
+AGE_COLUMN = 'leg_age_patientFREDD'
+AGE_BUCKET = 'age_bucket'
+
+PATIENTS = 'patients'
+VARIANTS = 'variants'
+VARIANT_COLUMN = 'diaGen_var_nbvar_1'
+
+
+def age_buckets(ages):
+    """Tranche d'âge exacte pour des bornes entières : 2k pour un âge égal à k, 2k+1 pour ]k, k+1[."""
+    ages = np.asarray(ages, dtype=float)
+    floor = np.floor(ages)
+    buckets = floor * 2 + (ages != floor)
+    return pd.array(np.where(np.isnan(ages), np.nan, buckets), dtype='Int16')
+
+
+def bucket_ages(buckets):
+    """Âge représentatif d'une tranche de ``age_buckets`` : k pour 2k, k + 0,5 pour 2k+1 (dans ]k, k+1[)."""
+    return pd.array(buckets, dtype='Float64').to_numpy(dtype=float, na_value=np.nan) / 2
+
+
+class AggregateCube:
+    """Table d'agrégats (dimensions + ``patients`` + ``variants``) et ses agrégations.
+
+    ``cells`` donne la ligne de ``table`` de chaque ligne d'origine et
+    ``row_variants`` son nombre de variants (cube construit par ``from_frame``).
+    """
+
+    def __init__(self, table, cells=None, row_variants=None):
+        self.table = table
+        self.cells = cells
+        self.row_variants = row_variants
+
+    @classmethod
+    def from_frame(cls, df, dimensions=DIMENSIONS):
+        dimensions = [col for col in dimensions if col in df.columns]
+        keys = [df[col] for col in dimensions]
+        if AGE_COLUMN in df.columns:
+            keys.append(pd.Series(age_buckets(df[AGE_COLUMN]), index=df.index, name=AGE_BUCKET))
+        variants = df[VARIANT_COLUMN] if VARIANT_COLUMN in df.columns else pd.Series(np.nan, index=df.index)
+        measures = pd.DataFrame({PATIENTS: 1, VARIANTS: variants.astype('float64')}, index=df.index)
+        grouped = measures.groupby(keys, dropna=False, observed=True, sort=False)
+        table = grouped.agg({PATIENTS: 'size', VARIANTS: 'sum'}).reset_index()
+        # Groupes numérotés dans l'ordre d'apparition, comme les lignes de ``table``
+        cells = grouped.ngroup().to_numpy(dtype=np.int64)
+        return cls(table, cells, np.nan_to_num(measures[VARIANTS].to_numpy()))
+
+    def __len__(self):
+        return len(self.table)
+
+    def slice(self, filters, age=None):
+        """Sous-cube des combinaisons satisfaisant les filtres.
+
+        ``filters`` associe une colonne à la liste des valeurs acceptées (une
+        liste vide ne filtre pas) ; ``age`` est un intervalle entier (min, max),
+        bornes incluses, ou ``None``.
+        """
+        mask = np.ones(len(self.table), dtype=bool)
+        for col, values in filters.items():
+            if values:
+                mask &= self.table[col].isin(values).to_numpy()
+        if age is not None and AGE_BUCKET in self.table.columns:
+            buckets = self.table[AGE_BUCKET]
+            mask &= ((buckets >= 2 * age[0]) & (buckets <= 2 * age[1])).fillna(False).to_numpy(dtype=bool)
+        return AggregateCube(self.table[mask])
+
+    def subset(self, positions):
+        """Sous-cube des patients ``positions`` (lignes d'origine), recompté par cellule."""
+        positions = np.asarray(positions, dtype=np.int64)
+        cells = self.cells[positions]
+        patients = np.bincount(cells, minlength=len(self.table))
+        variants = np.bincount(cells, weights=self.row_variants[positions], minlength=len(self.table))
+        table = self.table.assign(**{PATIENTS: patients, VARIANTS: variants})
+        return AggregateCube(table[patients > 0].reset_index(drop=True))
+
+    def total(self, measure=PATIENTS):
+        return int(self.table[measure].sum())
+
+    def rollup(self, columns, measure=PATIENTS, dropna=False):
+        """Agrège le cube sur ``columns`` (équivalent d'un ``groupby(columns).size()``)."""
+        rolled = (self.table.groupby(columns, dropna=dropna, observed=True, sort=False)[measure]
+                  .sum().reset_index())
+        return rolled[rolled[measure] > 0] if measure == PATIENTS else rolled
+
+    def counts(self, column, dropna=False):
+        """Effectifs par valeur de ``column``, par ordre décroissant.
+
+        Équivalent de ``df[column].value_counts(dropna=dropna)``.
+        """
+        rolled = self.rollup([column], dropna=dropna)
+        return rolled.sort_values(PATIENTS, ascending=False, kind='stable').set_index(column)[PATIENTS]
+
+    def age_counts(self):
+        """Patients par tranche d'âge (colonnes ``age_bucket`` et ``patients``), âges manquants exclus."""
+        if AGE_BUCKET not in self.table.columns:
+            return pd.DataFrame({AGE_BUCKET: pd.array([], dtype='Int16'), PATIENTS: np.array([], dtype=np.int64)})
+        return self.rollup([AGE_BUCKET], dropna=True)
+
+    def nunique(self, column):
+        """Nombre de valeurs distinctes (non manquantes) de ``column``."""
+        return self.table.loc[self.table[PATIENTS] > 0, column].nunique()
+
+    def nunique_by(self, column, by):
+        """Nombre de valeurs distinctes de ``column`` pour chaque valeur de ``by``."""
+        table = self.table[self.table[PATIENTS] > 0]
+        return table.groupby(by, observed=True)[column].nunique()
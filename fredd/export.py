@@ -0,0 +1,95 @@
+"""Export en flux d'une cohorte filtrée, en CSV ou en Parquet.
+
+Les lignes retenues ne sont jamais copiées d'un bloc : elles sont lues par
+blocs de ``CHUNK_ROWS`` lignes (positions dans la table chargée, ou lots
+d'une requête DuckDB), restreintes aux colonnes demandées, puis chaque bloc
+est encodé et rendu aussitôt sous forme d'octets. Le fichier n'existe jamais
+en entier en mémoire : un téléchargement ne coûte qu'un bloc à la fois.
+"""
+
+import io
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from fredd.streaming import CSV_SEP
+
+CHUNK_ROWS = 10_000
+
+# Format -> (type MIME, extension)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', '.csv'),
+    'parquet': ('application/vnd.apache.parquet', '.parquet'),
+}
+
+
+def frame_chunks(df, positions, columns, chunk_rows=CHUNK_ROWS):
+    """Blocs des lignes ``positions`` de ``df``, restreints à ``columns`` (sans copie de la sélection entière)."""
+    # Positions des colonnes calculées une fois ; lignes et colonnes sont sélectionnées en une seule copie par bloc
+    indexer = df.columns.get_indexer([col for col in columns if col in df.columns])
+    # Une cohorte vide donne tout de même un bloc vide (en-tête du CSV, schéma du Parquet)
+    for start in range(0, max(len(positions), 1), chunk_rows):
+        yield df.iloc[positions[start:start + chunk_rows], indexer]
+
+
+def iter_csv(chunks):
+    """Octets d'un CSV (séparateur ``;``, en-tête sur le premier bloc), un morceau par bloc."""
+    header = True
+    for chunk in chunks:
+        yield chunk.to_csv(sep=CSV_SEP, index=False, header=header).encode()
+        header = False
+
+
+class _Pipe(io.RawIOBase):
+    """Fichier en écriture seule dont le contenu est récupéré (et oublié) au fur et à mesure."""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def iter_parquet(chunks):
+    """Octets d'un fichier Parquet, un groupe de lignes par bloc, rendus dès qu'un bloc est écrit."""
+    pipe = _Pipe()
+    writer = None
+    for chunk in chunks:
+        # Les colonnes texte restantes (types mélangés, blocs entièrement vides) sont écrites en texte
+        object_columns = chunk.select_dtypes(include='object').columns
+        chunk = chunk.assign(**{col: chunk[col].where(chunk[col].isna(), chunk[col].astype(str))
+                                for col in object_columns})
+        if writer is None:
+            # Schéma fixé par le premier bloc, colonnes texte forcées en chaînes
+            schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+            for col in object_columns:
+                schema = schema.set(schema.get_field_index(col), pa.field(col, pa.string()))
+            writer = pq.ParquetWriter(pipe, schema)
+        writer.write_table(pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False))
+        yield pipe.drain()
+    if writer is not None:
+        writer.close()
+        yield pipe.drain()
+
+
+def stream_export(chunks, fmt='csv'):
+    """Générateur des octets de l'export au format ``fmt`` (``csv`` ou ``parquet``)."""
+    if fmt == 'csv':
+        return iter_csv(chunks)
+    if fmt == 'parquet':
+        return iter_parquet(chunks)
+    raise ValueError(f"Format d'export inconnu : {fmt}")
@@ -0,0 +1,118 @@
+"""Index inversé des filtres du tableau de bord (diagnostic, gène, site, âge).
+
+Pour chaque valeur filtrable, l'index garde l'ensemble des positions de lignes
+correspondantes, sous forme compressée comme dans les bitmaps Roaring : liste
+de positions triées si la valeur est rare, bitset compacté (``np.packbits``,
+1 bit par ligne) sinon. Une combinaison de filtres devient un OU entre valeurs
+d'une même dimension, un ET entre dimensions, puis un seul ``take``.
+"""
+
+import numpy as np
+import pandas as pd
+
+# En dessous d'une ligne sur 32, une liste d'int32 est plus compacte qu'un bitset
+DENSE_RATIO = 32
+
+
+class FilterIndex:
+    """Index bitset des lignes d'un DataFrame par valeur de filtre.
+
+    ``columns`` associe un nom de dimension à une colonne du DataFrame ;
+    ``age_column`` (facultatif) permet de filtrer sur un intervalle d'âges
+    entiers [min, max] bornes incluses, via des bitsets cumulés par année.
+    ``positions`` (facultatif) fournit directement les lignes de chaque valeur
+    d'une dimension à plusieurs valeurs par ligne, sous la forme ``(valeurs,
+    positions triées)`` (ex. les gènes de tous les emplacements,
+    ``VariantStore.gene_positions``) ; elle remplace alors la colonne.
+    """
+
+    def __init__(self, df, columns, age_column=None, age_range=(0, 100), positions=None):
+        self.n_rows = len(df)
+        self._n_bytes = (self.n_rows + 7) // 8
+        self._containers = {}
+        self._values = {}
+        positions = positions or {}
+        for dim, col in columns.items():
+            values, rows = positions[dim] if dim in positions else self._group_rows(df[col])
+            self._values[dim] = list(values)
+            self._containers[dim] = {value: self._container(rows) for value, rows in zip(values, rows)}
+
+        self.age_range = age_range
+        self._age_le = self._age_lt = None
+        if age_column is not None:
+            ages = df[age_column].to_numpy(dtype=float, na_value=np.nan)
+            bounds = np.arange(age_range[0], age_range[1] + 1)
+            # Lignes d'âge <= b et < b pour chaque année b ; les âges manquants ne sont dans aucun
+            self._age_le = np.stack([np.packbits(ages <= bound) for bound in bounds])
+            self._age_lt = np.stack([np.packbits(ages < bound) for bound in bounds])
+
+    def _group_rows(self, series):
+        # Valeurs distinctes et positions triées de leurs lignes
+        codes, uniques = pd.factorize(series)
+        order = np.argsort(codes, kind='stable').astype(np.int32)
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        return list(uniques), [order[bounds[code]:bounds[code + 1]] for code in range(len(uniques))]
+
+    def _container(self, positions):
+        if len(positions) * DENSE_RATIO < self.n_rows:
+            return np.asarray(positions, dtype=np.int32)
+        return self._pack(positions)
+
+    def _pack(self, positions):
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[positions] = True
+        return np.packbits(mask)
+
+    def _bitset(self, container):
+        if container.dtype == np.uint8:
+            return container
+        return self._pack(container)
+
+    def values(self, dim):
+        """Valeurs distinctes (non manquantes) d'une dimension, par ordre d'apparition."""
+        return self._values[dim]
+
+    def count(self, dim, value):
+        container = self._containers[dim].get(value)
+        if container is None:
+            return 0
+        if container.dtype == np.uint8:
+            return int(np.unpackbits(container, count=self.n_rows).sum())
+        return len(container)
+
+    def mask(self, dim, values):
+        """Bitset des lignes ayant l'une des ``values`` pour la dimension ``dim``."""
+        result = np.zeros(self._n_bytes, dtype=np.uint8)
+        for value in values:
+            container = self._containers[dim].get(value)
+            if container is not None:
+                result |= self._bitset(container)
+        return result
+
+    def age_mask(self, age_min, age_max):
+        """Bitset des lignes d'âge compris dans [age_min, age_max]."""
+        low, high = self.age_range
+        age_min, age_max = max(age_min, low), min(age_max, high)
+        return self._age_le[age_max - low] & ~self._age_lt[age_min - low]
+
+    def positions(self, filters, age=None):
+        """Positions (triées) des lignes satisfaisant tous les filtres.
+
+        ``filters`` associe une dimension à la liste des valeurs acceptées ; une
+        liste vide ne filtre pas. ``age`` est un couple (min, max) ou ``None``.
+        """
+        result = None
+        for dim, values in filters.items():
+            if values:
+                mask = self.mask(dim, values)
+                result = mask if result is None else result & mask
+        if age is not None and self._age_le is not None:
+            mask = self.age_mask(*age)
+            result = mask if result is None else result & mask
+        if result is None:
+            return np.arange(self.n_rows)
+        return np.flatnonzero(np.unpackbits(result, count=self.n_rows))
+
+    def select(self, df, filters, age=None):
+        """Sous-ensemble de ``df`` (celui indexé) satisfaisant les filtres."""
+        return df.take(self.positions(filters, age))
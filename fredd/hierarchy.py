@@ -0,0 +1,126 @@
+"""Arbre des variants gène → classe → nature, élagué et développé à la demande.
+
+Les effectifs de tous les nœuds sont calculés une seule fois par version des
+données (et par état des filtres) à partir des feuilles de la table longue des
+variants : pour chaque nœud, ses enfants triés par effectif décroissant.
+L'effectif d'un nœud est un nombre de variants, somme exacte de ceux de ses
+enfants ; un nombre de patients ne s'additionnerait pas (un patient à plusieurs
+classes ou natures sous un même gène serait compté plusieurs fois). Une
+figure ne reçoit ensuite que les ``top_k`` premiers enfants de chaque nœud
+affiché, les autres étant regroupés dans un nœud « Autres », et seuls les
+niveaux demandés : le niveau le plus profond n'est ajouté que pour le nœud que
+l'utilisateur développe. La taille de la figure dépend de ``top_k`` et de la
+profondeur, non du nombre de gènes.
+"""
+
+import numpy as np
+import pandas as pd
+
+from fredd.cube import VARIANTS
+from fredd.schema import label_codes
+from fredd.variants import CLASSE, GENE, NATURE
+
+PATH = [GENE, CLASSE, NATURE]
+OTHER = 'Autres'
+MISSING = 'Non renseigné'
+
+# Colonne de ventilation conservée dans les feuilles (figures par site)
+SITE_COLUMN = 'leg_site_inc_nom'
+
+
+class Hierarchy:
+    """Effectifs des nœuds d'un arbre ``path`` : enfants de chaque nœud, par effectif décroissant.
+
+    ``leaves`` a une ligne par feuille (colonnes de ``path``, ``value`` et
+    éventuellement ``by``) ; chaque nœud compte la somme de ses feuilles.
+    """
+
+    def __init__(self, leaves, path=PATH, value=VARIANTS, by=SITE_COLUMN):
+        self.path = list(path)
+        self.value = value
+        self.by = by if by in leaves.columns else None
+        self.leaves = leaves[self.path + [value] + ([self.by] if self.by else [])].reset_index(drop=True)
+        keys = pd.DataFrame({col: self.leaves[col].astype(str) for col in self.path})
+        keys[value] = self.leaves[value].to_numpy()
+        # Par niveau : nœuds triés par parent puis par effectif décroissant ; plage des enfants de chaque parent
+        self._levels = []
+        self._ranges = {}
+        for depth in range(1, len(self.path) + 1):
+            parents, column = self.path[:depth - 1], self.path[depth - 1]
+            level = keys.groupby(self.path[:depth], sort=False)[value].sum().reset_index()
+            level = level.sort_values(parents + [value], ascending=[True] * len(parents) + [False], kind='stable')
+            self._levels.append((level[column].to_numpy(), level[value].to_numpy()))
+            if not parents:
+                self._ranges[()] = (0, 0, len(level))
+                continue
+            keys_ = level[parents].to_numpy()
+            starts = np.flatnonzero(np.append(True, (keys_[1:] != keys_[:-1]).any(axis=1)))
+            bounds = np.append(starts, len(level))
+            for parent, start, stop in zip(map(tuple, keys_[starts]), bounds[:-1], bounds[1:]):
+                self._ranges[parent] = (depth - 1, start, stop)
+
+    @classmethod
+    def from_variants(cls, variants, path=PATH, by=SITE_COLUMN):
+        """Arbre des variants d'un ``VariantStore`` (variants par feuille, classes libellées).
+
+        Les variants dont la classe ou la nature manque sont comptés sous « Non renseigné ».
+        """
+        columns = list(path) + ([by] if by in variants.variants.columns else [])
+        leaves = (variants.variants.groupby(columns, dropna=False, observed=True, sort=False).size()
+                  .rename(VARIANTS).reset_index())
+        # Classe manquante distincte de la classe « Inconnu » (code 1)
+        for col, coded in [(CLASSE, 'diaGen_var_classe_1_1'), (NATURE, 'diaGen_var_nature_1_1')]:
+            if col in leaves.columns:
+                leaves[col] = label_codes(leaves[col], coded, missing=MISSING)
+        return cls(leaves, path, VARIANTS, by)
+
+    def children(self, node=()):
+        """Effectifs des enfants de ``node`` (tuple de libellés depuis la racine), par ordre décroissant."""
+        if tuple(node) not in self._ranges:
+            return pd.Series(dtype='int64')
+        depth, start, stop = self._ranges[tuple(node)]
+        labels, values = self._levels[depth]
+        return pd.Series(values[start:stop], index=labels[start:stop])
+
+    def total(self):
+        return int(self.children().sum())
+
+    def nodes(self, top_k=10, depth=2, expand=()):
+        """Nœuds (``ids``, ``labels``, ``parents``, ``values``) de l'arbre élagué.
+
+        Chaque nœud affiché garde ses ``top_k`` premiers enfants, les autres
+        regroupés dans un nœud « Autres » ; l'arbre descend jusqu'à ``depth``
+        niveaux, et jusqu'aux feuilles sous le nœud ``expand`` (seul ce
+        sous-arbre est ajouté). Les identifiants sont le ``repr`` du chemin
+        depuis la racine ; celui d'un nœud « Autres » finit par ``None``.
+        """
+        expand = tuple(expand)
+
+        def node_id(node):
+            return repr(node) if node else ''
+
+        rows = []
+        stack = [()]
+        while stack:
+            node = stack.pop()
+            children = self.children(node)
+            for label, value in children.iloc[:top_k].items():
+                child = node + (label,)
+                rows.append((node_id(child), label, node_id(node), value))
+                # Niveaux suivants : jusqu'à ``depth``, et sous le nœud développé (ses ancêtres et lui-même)
+                under = bool(expand) and (child[:len(expand)] == expand or expand[:len(child)] == child)
+                if len(child) < len(self.path) and (len(child) < depth or under):
+                    stack.append(child)
+            if len(children) > top_k:
+                rows.append((node_id(node + (None,)), f'{OTHER} ({len(children) - top_k})', node_id(node),
+                             children.iloc[top_k:].sum()))
+        return pd.DataFrame(rows, columns=['ids', 'labels', 'parents', 'values'])
+
+    def breakdown(self, depth=2, top_k=10):
+        """Effectifs des nœuds de niveau ``depth`` sous les ``top_k`` premiers nœuds de premier niveau,
+        ventilés selon la colonne ``by`` des feuilles."""
+        top = self.children().index[:top_k]
+        leaves = self.leaves[self.leaves[self.path[0]].astype(str).isin(top)]
+        keys = self.path[:depth] + ([self.by] if self.by else [])
+        return (leaves.groupby(keys, observed=True, sort=False)[self.value].sum().reset_index()
+                .sort_values(self.value, ascending=False, kind='stable', ignore_index=True))
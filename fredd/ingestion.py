@@ -0,0 +1,95 @@
+"""Chargement des exports FREDD avec un cache borné indexé par empreinte.
+
+Chaque fichier est identifié par le hash SHA-1 de son contenu : seuls les
+fichiers nouveaux ou modifiés sont relus, les autres sont servis depuis le
+cache (éviction LRU, nombre d'entrées et durée de vie limités).
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from fredd.instrumentation import frame_memory, section
+from fredd.preprocessing import concat_exports
+from fredd.streaming import stream_exports
+
+
+def fingerprint(content):
+    """Empreinte SHA-1 du contenu brut d'un fichier."""
+    return hashlib.sha1(content).hexdigest()
+
+
+def read_export(content, name):
+    """Lit un export CSV FREDD (octets ou chemin) et applique le prétraitement, par blocs."""
+    df, _ = stream_exports([(name, content)])
+    return df
+
+
+class ExportCache:
+    """Cache LRU des exports prétraités, indexé par (empreinte, nom de fichier).
+
+    Les DataFrames renvoyés sont partagés : ils ne doivent pas être modifiés
+    en place par l'appelant.
+    """
+
+    def __init__(self, max_entries=16, ttl=6 * 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _purge_expired(self, now):
+        expired = [key for key, (loaded_at, _) in self._entries.items() if now - loaded_at > self.ttl]
+        for key in expired:
+            del self._entries[key]
+
+    def get(self, digest, name, content):
+        """Renvoie l'export prétraité, en ne le relisant que s'il est absent du cache."""
+        key = (digest, name)
+        with self._lock:
+            now = time.monotonic()
+            self._purge_expired(now)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                with section('lecture:export') as record:
+                    record.cache = 'hit'
+                return self._entries[key][1]
+            self.misses += 1
+
+        with section('lecture:export') as record:
+            df = read_export(content, name)
+            record.cache, record.rows, record.memory = 'miss', len(df), frame_memory(df)
+
+        with self._lock:
+            self._entries[key] = (time.monotonic(), df)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return df
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def load_exports(cache, files):
+    """Charge une liste de fichiers (nom, contenu) et les concatène.
+
+    Renvoie le DataFrame fusionné et la version du jeu de données (empreinte
+    des empreintes et noms des fichiers).
+    """
+    frames = []
+    keys = []
+    for name, content in files:
+        digest = fingerprint(content)
+        keys.append(f"{digest}:{name}")
+        frames.append(cache.get(digest, name, content))
+    version = fingerprint("|".join(keys).encode())
+    return concat_exports(frames), version
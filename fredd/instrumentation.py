@@ -0,0 +1,130 @@
+"""Mesures légères des étapes coûteuses (temps, lignes, mémoire, cache).
+
+Les étapes du chargement, du prétraitement, des agrégats et des graphiques
+sont entourées de sections (``section`` ou ``timed``). Tant qu'aucun
+``Recorder`` n'est actif, une section ne coûte qu'un test ; sinon elle cumule,
+par nom, le nombre d'appels, le temps écoulé, les lignes traitées, la mémoire
+des DataFrames produits, la taille des figures envoyées au navigateur et les
+succès ou échecs de cache. Les mesures sont
+exportables en JSON, et un profil ``cProfile`` peut être ajouté pour le
+détail par fonction.
+"""
+
+import contextvars
+import functools
+import io
+import json
+import marshal
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+_current = contextvars.ContextVar('fredd_recorder', default=None)
+
+
+class Record:
+    """Informations complétées par le code mesuré (lignes, mémoire et figure en octets, cache)."""
+
+    __slots__ = ('rows', 'memory', 'payload', 'cache')
+
+    def __init__(self, rows=None):
+        self.rows = rows
+        self.memory = None
+        self.payload = None
+        self.cache = None
+
+
+class Recorder:
+    """Mesures cumulées par section, dans l'ordre de première exécution."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.sections = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds, record):
+        with self._lock:
+            stats = self.sections.setdefault(name, {'appels': 0, 'secondes': 0.0, 'lignes': 0,
+                                                    'memoire_mo': None, 'octets': None,
+                                                    'cache_succes': 0, 'cache_echecs': 0})
+            stats['appels'] += 1
+            stats['secondes'] += seconds
+            if record.rows is not None:
+                stats['lignes'] += int(record.rows)
+            if record.memory is not None:
+                stats['memoire_mo'] = max(stats['memoire_mo'] or 0.0, record.memory / 2**20)
+            if record.payload is not None:
+                stats['octets'] = max(stats['octets'] or 0, int(record.payload))
+            if record.cache == 'hit':
+                stats['cache_succes'] += 1
+            elif record.cache == 'miss':
+                stats['cache_echecs'] += 1
+
+    def table(self):
+        """Une ligne par section, par temps cumulé décroissant."""
+        with self._lock:
+            rows = [{'section': name, **stats} for name, stats in self.sections.items()]
+        table = pd.DataFrame(rows, columns=['section', 'appels', 'secondes', 'lignes', 'memoire_mo', 'octets',
+                                            'cache_succes', 'cache_echecs'])
+        return table.sort_values('secondes', ascending=False, kind='stable').reset_index(drop=True)
+
+    def to_json(self):
+        with self._lock:
+            return json.dumps({'debut': self.started, 'sections': self.sections}, ensure_ascii=False, indent=1)
+
+
+def activate(recorder):
+    """Rend ``recorder`` actif pour le contexte courant (le thread de la session Streamlit)."""
+    return _current.set(recorder)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+@contextmanager
+def section(name, rows=None):
+    """Mesure le bloc ``with`` sous le nom ``name`` ; le ``Record`` renvoyé peut être complété."""
+    recorder = _current.get()
+    record = Record(rows)
+    if recorder is None:
+        yield record
+        return
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        recorder.add(name, time.perf_counter() - start, record)
+
+
+def timed(name):
+    """Décorateur : mesure chaque appel ; les lignes sont celles du DataFrame passé en premier argument."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            rows = len(args[0]) if args and isinstance(args[0], pd.DataFrame) else None
+            with section(name, rows):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def frame_memory(df):
+    """Mémoire occupée par les colonnes d'un DataFrame (octets, sans inspecter les objets Python)."""
+    return int(df.memory_usage(index=False).sum())
+
+
+def profile_dump(profile):
+    """Profil ``cProfile`` au format des fichiers ``.prof`` (``pstats``, snakeviz…)."""
+    profile.create_stats()
+    return marshal.dumps(profile.stats)
+
+
+def profile_summary(profile, limit=25):
+    """Fonctions les plus coûteuses (temps cumulé) d'un profil, en texte."""
+    out = io.StringIO()
+    pstats.Stats(profile, stream=out).sort_stats('cumulative').print_stats(limit)
+    return out.getvalue()
@@ -0,0 +1,100 @@
+"""Résumé des valeurs manquantes d'un export, de taille bornée.
+
+Au lieu d'afficher la matrice complète ``df.isna()`` (lignes × colonnes), on
+calcule en NumPy le taux de valeurs manquantes par colonne, les profils de
+valeurs manquantes (lignes ayant exactement les mêmes colonnes vides) et une
+carte agrégée : les lignes (et au besoin les colonnes) sont regroupées en
+tranches consécutives et chaque case donne la proportion de valeurs manquantes
+de sa tranche. Le détail exact d'une plage de lignes est extrait à la demande.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Taille maximale de la carte agrégée (tranches de lignes × tranches de colonnes)
+MAX_ROW_BINS = 200
+MAX_COLUMN_BINS = 300
+
+# Nombre maximal de lignes du détail exact
+MAX_DETAIL_ROWS = 500
+
+
+def null_mask(df):
+    """Matrice booléenne lignes × colonnes des valeurs manquantes."""
+    return df.isna().to_numpy(dtype=bool)
+
+
+def null_rates(df):
+    """Proportion de valeurs manquantes par colonne, dans l'ordre des colonnes."""
+    return pd.Series(null_mask(df).mean(axis=0) if len(df) else 0.0, index=df.columns, name='taux_manquant')
+
+
+def null_patterns(df, mask=None):
+    """Profils de valeurs manquantes, du plus fréquent au moins fréquent.
+
+    Renvoie ``(profils, codes)`` : ``profils`` a une colonne booléenne par
+    colonne de ``df`` (``True`` si vide), plus ``count`` (nombre de lignes) et
+    ``n_manquantes`` ; ``codes[i]`` est le numéro de profil de la ligne ``i``.
+    """
+    mask = null_mask(df) if mask is None else mask
+    # Une ligne devient une clé de quelques octets (1 bit par colonne) : comparaison rapide des profils
+    packed = np.ascontiguousarray(np.packbits(mask, axis=1))
+    keys = packed.view(np.dtype((np.void, packed.shape[1]))).ravel() if packed.shape[1] else np.zeros(len(mask))
+    _, first, codes, counts = np.unique(keys, return_index=True, return_inverse=True, return_counts=True)
+    order = np.argsort(-counts, kind='stable')
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+
+    profiles = pd.DataFrame(mask[first[order]], columns=df.columns)
+    profiles['count'] = counts[order]
+    profiles['n_manquantes'] = mask[first[order]].sum(axis=1)
+    return profiles, rank[codes.ravel()]
+
+
+def _bin_edges(n, max_bins):
+    n_bins = max(1, min(n, max_bins))
+    return np.linspace(0, n, n_bins + 1).astype(int)
+
+
+def pattern_order(df):
+    """Ordre des lignes regroupant les profils de valeurs manquantes (le plus fréquent d'abord)."""
+    _, codes = null_patterns(df)
+    return np.argsort(codes, kind='stable')
+
+
+def binned_heatmap(df, max_rows=MAX_ROW_BINS, max_columns=MAX_COLUMN_BINS, order=None):
+    """Carte des valeurs manquantes agrégée par tranches de lignes et de colonnes.
+
+    Chaque case est la proportion de valeurs manquantes de la tranche ; la
+    carte fait au plus ``max_rows`` × ``max_columns`` cases, quelle que soit
+    la taille de ``df``. ``order`` (par exemple ``pattern_order(df)``) réordonne
+    les lignes avant le regroupement. L'index indique la plage de lignes de
+    chaque tranche, en positions dans cet ordre.
+    """
+    mask = null_mask(df)
+    if order is not None:
+        mask = mask[order]
+    n_rows, n_cols = mask.shape
+    if n_rows == 0 or n_cols == 0:
+        return pd.DataFrame(index=pd.Index([], name='lignes'), columns=list(df.columns), dtype='float32')
+
+    row_edges = _bin_edges(n_rows, max_rows)
+    col_edges = _bin_edges(n_cols, max_columns)
+    # Sommes par tranche de lignes, puis par tranche de colonnes
+    sums = np.add.reduceat(mask.astype(np.float32), row_edges[:-1], axis=0)
+    sums = np.add.reduceat(sums, col_edges[:-1], axis=1)
+    sizes = np.outer(np.diff(row_edges), np.diff(col_edges))
+    columns = [df.columns[start] if stop - start == 1 else f"{df.columns[start]} … {df.columns[stop - 1]}"
+               for start, stop in zip(col_edges[:-1], col_edges[1:])]
+    index = pd.Index([f"{start}–{stop - 1}" for start, stop in zip(row_edges[:-1], row_edges[1:])], name='lignes')
+    return pd.DataFrame(sums / sizes, index=index, columns=columns)
+
+
+def row_range(df, start, stop, order=None, max_rows=MAX_DETAIL_ROWS):
+    """Matrice exacte des valeurs manquantes des lignes ``start`` à ``stop`` (exclu), bornée.
+
+    Les positions s'entendent dans ``order`` s'il est donné (même ordre que la carte).
+    """
+    stop = min(stop, start + max_rows, len(df))
+    positions = np.arange(start, stop) if order is None else order[start:stop]
+    return df.take(positions).isna()
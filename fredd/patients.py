@@ -0,0 +1,70 @@
+"""Index des patients par identifiant.
+
+Les identifiants (convertis en texte) sont triés une seule fois avec la position
+de leurs lignes : la fiche d'un patient est retrouvée par recherche
+dichotomique, et la recherche par début d'identifiant renvoie une plage
+contiguë de l'index, découpée en pages.
+"""
+
+import numpy as np
+import pandas as pd
+
+ID_COLUMN = 'id'
+
+# Plus grand caractère Unicode : borne supérieure des identifiants commençant par un préfixe
+_MAX_CHAR = '\U0010ffff'
+
+
+def id_keys(ids):
+    """Identifiants en texte ; les identifiants numériques entiers sont écrits sans décimale."""
+    if pd.api.types.is_float_dtype(ids) and (ids % 1 == 0).all():
+        ids = ids.astype('Int64')
+    return ids.astype(str).to_numpy(dtype=str)
+
+
+class PatientIndex:
+    """Index trié ``identifiant -> positions des lignes`` d'un DataFrame."""
+
+    def __init__(self, df, column=ID_COLUMN):
+        ids = df[column]
+        present = np.flatnonzero(ids.notna().to_numpy())
+        keys = id_keys(ids.iloc[present])
+        order = np.argsort(keys, kind='stable')
+        self._keys = keys[order]
+        self._positions = present[order]
+        # Identifiants distincts, dans l'ordre de l'index
+        first = np.ones(len(self._keys), dtype=bool)
+        first[1:] = self._keys[1:] != self._keys[:-1]
+        self._ids = self._keys[first]
+
+    def __len__(self):
+        """Nombre d'identifiants distincts."""
+        return len(self._ids)
+
+    def __contains__(self, patient_id):
+        start, stop = self._range(str(patient_id))
+        return stop > start
+
+    def _range(self, key):
+        return (int(np.searchsorted(self._keys, key, side='left')),
+                int(np.searchsorted(self._keys, key, side='right')))
+
+    def positions(self, patient_id):
+        """Positions (croissantes) des lignes du patient ; vide s'il est inconnu."""
+        start, stop = self._range(str(patient_id))
+        return self._positions[start:stop]
+
+    def lookup(self, df, patient_id):
+        """Lignes de ``df`` (celui indexé) du patient."""
+        return df.take(self.positions(patient_id))
+
+    def search(self, prefix='', page=0, page_size=50):
+        """Identifiants commençant par ``prefix``, par page.
+
+        Renvoie ``(identifiants de la page, nombre total de correspondances)``.
+        """
+        prefix = str(prefix)
+        start = int(np.searchsorted(self._ids, prefix, side='left'))
+        stop = int(np.searchsorted(self._ids, prefix + _MAX_CHAR, side='left'))
+        first = start + page * page_size
+        return self._ids[first:min(first + page_size, stop)].tolist(), stop - start
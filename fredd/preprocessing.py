@@ -0,0 +1,143 @@
+"""Prétraitement des exports FREDD piloté par ``fredd.schema``.
+
+Le prétraitement est fait une seule fois, au chargement : dates converties avec
+des formats explicites, variables codées en entiers compacts (``Int8``), colonnes
+texte peu variées en ``category`` et âges dérivés en ``float32``. Le DataFrame
+obtenu est marqué comme prétraité (``df.attrs``) et doit ensuite être traité
+en lecture seule.
+"""
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from fredd.instrumentation import timed
+from fredd.schema import (
+    CATEGORY_MAX_RATIO,
+    DATE_COLUMNS,
+    DATE_FORMATS,
+    DERIVED_AGES,
+    SCHEMA_VERSION,
+    category_columns,
+    coded_columns,
+)
+
+PREPROCESSED_ATTR = 'fredd_schema'
+
+INT8_MIN, INT8_MAX = np.iinfo(np.int8).min, np.iinfo(np.int8).max
+
+
+def is_preprocessed(df):
+    return df.attrs.get(PREPROCESSED_ATTR) == SCHEMA_VERSION
+
+
+@timed('pretraitement:parse_dates')
+def parse_dates(df):
+    """Convertit les colonnes de dates du schéma, format par format (``DATE_FORMATS``).
+
+    Seules les valeurs non reconnues par un format sont relues avec le suivant ;
+    aucune inférence n'est faite élément par élément.
+    """
+    for col in DATE_COLUMNS:
+        if col not in df.columns or pd.api.types.is_datetime64_any_dtype(df[col]):
+            continue
+        raw = df[col]
+        parsed = pd.to_datetime(raw, format=DATE_FORMATS[0], errors='coerce')
+        for fmt in DATE_FORMATS[1:]:
+            retry = parsed.isna() & raw.notna()
+            if not retry.any():
+                break
+            parsed[retry] = pd.to_datetime(raw[retry], format=fmt, errors='coerce')
+        df[col] = parsed
+    return df
+
+
+@timed('pretraitement:derive_ages')
+def derive_ages(df):
+    """Calcule les âges dérivés (en années) déclarés dans ``DERIVED_AGES``."""
+    for name, (end, start) in DERIVED_AGES.items():
+        if end in df.columns and start in df.columns:
+            df[name] = ((df[end] - df[start]).dt.days / 365.25).astype('float32')
+    return df
+
+
+@timed('pretraitement:encode_codes')
+def encode_codes(df):
+    """Convertit les variables codées en ``Int8`` (si toutes les valeurs sont des entiers 8 bits)."""
+    for col in coded_columns(df.columns):
+        values = pd.to_numeric(df[col], errors='coerce')
+        present = values.dropna()
+        if ((present % 1 == 0) & present.between(INT8_MIN, INT8_MAX)).all() and values.notna().sum() == df[col].notna().sum():
+            df[col] = values.astype('Int8')
+    return df
+
+
+@timed('pretraitement:encode_categories')
+def encode_categories(df, max_ratio=CATEGORY_MAX_RATIO):
+    """Encode en ``category`` les colonnes texte déclarées et celles peu variées."""
+    declared = set(category_columns(df.columns))
+    n_rows = max(len(df), 1)
+    for col in df.columns:
+        s = df[col]
+        if not (pd.api.types.is_object_dtype(s) or pd.api.types.is_string_dtype(s)):
+            continue
+        if col in declared or s.nunique(dropna=True) / n_rows <= max_ratio:
+            df[col] = s.astype('category')
+    return df
+
+
+@timed('pretraitement:downcast_integers')
+def downcast_integers(df):
+    """Réduit les colonnes entières à la plus petite taille sans perte."""
+    for col in df.select_dtypes(include='int64').columns:
+        df[col] = pd.to_numeric(df[col], downcast='integer')
+    return df
+
+
+def preprocess(df):
+    """Applique le schéma FREDD à un export brut, une seule fois."""
+    if is_preprocessed(df):
+        return df
+    parse_dates(df)
+    derive_ages(df)
+    encode_codes(df)
+    encode_categories(df)
+    downcast_integers(df)
+    df.attrs[PREPROCESSED_ATTR] = SCHEMA_VERSION
+    return df
+
+
+def union_categories(series):
+    """Union (``union_categoricals``) de séries catégorielles.
+
+    Une série sans valeur (lue entièrement vide) a des catégories de type
+    ``object`` : elle prend le type des catégories des autres séries, que
+    ``union_categoricals`` exige identique.
+    """
+    dtype = next((s.cat.categories.dtype for s in series if len(s.cat.categories)), object)
+    series = [s if len(s.cat.categories) else
+              pd.Series(pd.Categorical.from_codes(s.cat.codes, categories=pd.Index([], dtype=dtype)))
+              for s in series]
+    return union_categoricals(series, ignore_order=True)
+
+
+def concat_exports(frames):
+    """Concatène des exports prétraités en conservant les colonnes ``category``.
+
+    Les catégories de chaque colonne sont d'abord unifiées entre exports, sans
+    quoi ``pd.concat`` retomberait sur des colonnes ``object``.
+    """
+    if len(frames) == 1:
+        return frames[0]
+    categorical = {col for df in frames for col in df.select_dtypes(include='category').columns}
+    unified = []
+    for col in categorical:
+        series = [df[col] for df in frames if col in df.columns]
+        if len(series) == len(frames) and all(isinstance(s.dtype, pd.CategoricalDtype) for s in series):
+            categories = union_categories(series).categories
+            unified.append((col, pd.CategoricalDtype(categories)))
+    frames = [df.astype(dict(unified)) for df in frames]
+    result = pd.concat(frames, ignore_index=True)
+    if all(is_preprocessed(df) for df in frames):
+        result.attrs[PREPROCESSED_ATTR] = SCHEMA_VERSION
+    return result
@@ -0,0 +1,252 @@
+"""Contrôles qualité déclaratifs, évalués en une seule passe vectorisée par site.
+
+Un contrôle est une donnée : une description et une liste de conditions
+``(colonne, opérateur[, valeur])``, toutes vraies pour une ligne en anomalie.
+Les contrôles sont compilés ensemble : chaque condition distincte n'est
+évaluée qu'une fois (tableau NumPy de booléens lignes × conditions), puis un
+seul produit matriciel avec la matrice d'incidence conditions × contrôles
+donne, pour chaque ligne, le nombre de conditions non remplies de chaque
+contrôle ; une ligne est en anomalie quand il est nul.
+
+Les sites sont contrôlés dans un pool de processus lorsque la table est
+grande ; le résultat est une table des anomalies (une ligne par patient et
+contrôle) et un résumé par contrôle et par site.
+"""
+
+import multiprocessing
+import operator
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+SITE_COLUMN = 'leg_site_inc_nom'
+ID_COLUMN = 'id'
+
+# En dessous de ce nombre de lignes, les sites sont contrôlés dans le processus courant
+POOL_MIN_ROWS = 200_000
+
+
+@dataclass(frozen=True)
+class Column:
+    """Valeur d'une condition lue dans une autre colonne de la même ligne."""
+
+    name: str
+
+
+# Opérateurs de comparaison ; une valeur manquante ne vérifie que « != »
+_COMPARE = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    'in': np.isin,
+}
+
+# Contrôles qualité : nom -> (description, conditions) ; les valeurs de « in » sont des tuples
+QC_CHECKS = {
+    'diagnostic_manquant': (
+        "Pas de maladie rare renseignée alors que le diagnostic clinique n'est pas indéterminé",
+        [('diaCli_diagMR_nom', 'missing'), ('diaCli_stat_diag', '!=', 4)]),
+    'diagnostic_et_code_manquants': (
+        "Ni maladie rare ni code ORPHA alors que le diagnostic clinique n'est pas indéterminé",
+        [('diaCli_diagMR_nom', 'missing'), ('diaCli_diagMR_code', 'missing'), ('diaCli_stat_diag', '!=', 4)]),
+    'date_naissance_manquante': (
+        "Date de naissance non saisie",
+        [('adm_date_naissance', 'missing')]),
+    'inclusion_avant_naissance': (
+        "Date d'inclusion dans FREDD antérieure à la date de naissance",
+        [('leg_date_incFREDD', '<', Column('adm_date_naissance'))]),
+    'age_inclusion_improbable': (
+        "Âge à l'inclusion supérieur à 120 ans",
+        [('leg_age_patientFREDD', '>', 120)]),
+    'date_cr_manquante': (
+        "Pas de date du dernier compte rendu génétique avec une analyse terminée",
+        [('diaGen_CR_date', 'missing'), ('diaGen_statut_analyse', '==', 2)]),
+    'cr_avant_naissance': (
+        "Compte rendu génétique daté d'avant la naissance",
+        [('diaGen_CR_date', '<', Column('adm_date_naissance'))]),
+    'caracterisation_manquante': (
+        "Pas de caractérisation du dernier test génétique avec une analyse terminée",
+        [('diaGen_caract', 'missing'), ('diaGen_statut_analyse', '==', 2)]),
+    'gene_manquant': (
+        "Au moins un gène annoncé mais aucun gène saisi",
+        [('diaGen_var_nbgene', '>=', 1), ('diaGen_var_hgcn_1', 'missing')]),
+    'nombre_variants_manquant': (
+        "Premier gène saisi sans nombre de variants",
+        [('diaGen_var_hgcn_1', 'present'), ('diaGen_var_nbvar_1', 'missing')]),
+    'type_examen_chv_manquant': (
+        "Examen du champ visuel réalisé sans type d'examen",
+        [('exaChv_fait', '==', True), ('exaChv_type', 'missing')]),
+    'date_examen_chv_manquante': (
+        "Examen du champ visuel réalisé sans date d'examen",
+        [('exaChv_fait', '==', True), ('exaChv_date', 'missing')]),
+}
+
+
+def check_columns(conditions):
+    """Colonnes lues par une liste de conditions (y compris les colonnes comparées)."""
+    columns = []
+    for condition in conditions:
+        columns.append(condition[0])
+        if len(condition) > 2 and isinstance(condition[2], Column):
+            columns.append(condition[2].name)
+    return list(dict.fromkeys(columns))
+
+
+def rule_columns(checks=None):
+    """Colonnes lues par l'ensemble des contrôles ``checks`` (tous par défaut)."""
+    checks = QC_CHECKS if checks is None else checks
+    return list(dict.fromkeys(col for _, conditions in checks.values() for col in check_columns(conditions)))
+
+
+def _values(series):
+    # Valeurs comparables en NumPy : flottants (dates en nanosecondes), sinon objets
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.to_numpy(dtype='datetime64[ns]').astype(np.int64).astype(float)
+    if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+        return series.to_numpy(dtype=float, na_value=np.nan)
+    return series.to_numpy(dtype=object)
+
+
+def _literal(series, value):
+    # Valeur littérale dans la même unité que ``_values`` (dates en nanosecondes)
+    if pd.api.types.is_datetime64_any_dtype(series) and not isinstance(value, (int, float)):
+        return float(pd.Timestamp(value).value)
+    return value
+
+
+class RuleSet:
+    """Contrôles compilés : conditions distinctes et matrice d'incidence conditions × contrôles.
+
+    Seuls les contrôles dont toutes les colonnes sont dans ``columns`` sont retenus.
+    """
+
+    def __init__(self, columns, checks=None):
+        checks = QC_CHECKS if checks is None else checks
+        columns = set(columns)
+        self.checks = {name: check for name, check in checks.items() if set(check_columns(check[1])) <= columns}
+        self.names = list(self.checks)
+        self.columns = rule_columns(self.checks)
+        conditions = {}
+        for _, rule in self.checks.values():
+            for condition in rule:
+                conditions.setdefault(condition, len(conditions))
+        self.conditions = list(conditions)
+        self.incidence = np.zeros((len(self.conditions), len(self.names)), dtype=np.uint8)
+        for j, (_, rule) in enumerate(self.checks.values()):
+            self.incidence[[conditions[condition] for condition in rule], j] = 1
+
+    def evaluate(self, df):
+        """Matrice booléenne lignes × contrôles des anomalies de ``df`` (une passe par condition distincte)."""
+        values, missing = {}, {}
+        for col in self.columns:
+            values[col] = _values(df[col])
+            missing[col] = df[col].isna().to_numpy()
+
+        satisfied = np.empty((len(df), len(self.conditions)), dtype=bool)
+        for i, (col, op, *value) in enumerate(self.conditions):
+            if op == 'missing':
+                satisfied[:, i] = missing[col]
+            elif op == 'present':
+                satisfied[:, i] = ~missing[col]
+            else:
+                value = value[0]
+                known = ~missing[col]
+                if isinstance(value, Column):
+                    known &= ~missing[value.name]
+                    value = values[value.name][known]
+                else:
+                    value = _literal(df[col], value)
+                # Comparaison des seules valeurs connues (pas de comparaison avec None dans les objets)
+                result = np.zeros(len(df), dtype=bool)
+                result[known] = _COMPARE[op](values[col][known], value)
+                satisfied[:, i] = (result | ~known) if op == '!=' else result
+
+        # Conditions non remplies de chaque contrôle : nulles pour une ligne en anomalie
+        return (~satisfied).astype(np.uint8) @ self.incidence == 0
+
+
+def _evaluate_site(checks, columns, frame):
+    return RuleSet(columns, checks).evaluate(frame)
+
+
+def _site_groups(df, site_column):
+    # Positions des lignes de chaque site (les lignes sans site forment un groupe à part)
+    if site_column not in df.columns:
+        return [None], [np.arange(len(df))]
+    codes, sites = pd.factorize(df[site_column], use_na_sentinel=False)
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(len(sites) + 1))
+    sites = [None if pd.isna(site) else site for site in sites]
+    return sites, [order[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+
+
+def check_sites(df, checks=None, site_column=SITE_COLUMN, workers=None):
+    """Contrôles qualité de tous les sites de ``df`` : ``(anomalies, résumé)``.
+
+    ``anomalies`` a une ligne par patient et contrôle en anomalie (``ligne`` :
+    position dans ``df``) ; ``résumé`` une ligne par contrôle et par site. Les
+    sites sont contrôlés dans un pool de ``workers`` processus (tous les cœurs
+    par défaut) quand ``df`` compte au moins ``POOL_MIN_ROWS`` lignes ;
+    ``workers=1`` force le processus courant.
+    """
+    rules = RuleSet(df.columns, checks)
+    sites, groups = _site_groups(df, site_column)
+    frame = df[rules.columns]
+    if workers == 1 or len(groups) < 2 or len(df) < POOL_MIN_ROWS:
+        matrix = rules.evaluate(frame)
+        violations = [matrix[positions] for positions in groups]
+    else:
+        # Processus neufs (spawn) : le tableau de bord est multithreadé, un fork y est risqué
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                                 mp_context=multiprocessing.get_context('spawn')) as pool:
+            violations = list(pool.map(_evaluate_site, [rules.checks] * len(groups), [rules.columns] * len(groups),
+                                       [frame.take(positions) for positions in groups]))
+
+    anomalies, summary = [], []
+    for site, positions, matrix in zip(sites, groups, violations):
+        rows, checks_ = np.nonzero(matrix)
+        anomalies.append(pd.DataFrame({'ligne': positions[rows], site_column: site,
+                                       'controle': np.asarray(rules.names, dtype=object)[checks_]}))
+        counts = matrix.sum(axis=0)
+        summary += [{site_column: site, 'controle': name, 'description': rules.checks[name][0],
+                     'lignes': len(positions), 'anomalies': int(count)} for name, count in zip(rules.names, counts)]
+
+    anomalies = pd.concat(anomalies, ignore_index=True) if anomalies else \
+        pd.DataFrame(columns=['ligne', site_column, 'controle'])
+    anomalies = anomalies.sort_values(['ligne', 'controle'], kind='stable', ignore_index=True)
+    if ID_COLUMN in df.columns:
+        anomalies.insert(1, ID_COLUMN, df[ID_COLUMN].to_numpy()[anomalies['ligne'].to_numpy(dtype=np.int64)])
+    summary = pd.DataFrame(summary, columns=[site_column, 'controle', 'description', 'lignes', 'anomalies'])
+    summary['taux'] = summary['anomalies'] / summary['lignes'].where(summary['lignes'] > 0)
+    return anomalies, summary
+
+
+def qc_mask(df, check):
+    """Lignes de ``df`` en anomalie pour le contrôle ``check`` (série booléenne)."""
+    rules = RuleSet(df.columns, {check: QC_CHECKS[check]})
+    if not rules.names:
+        return pd.Series(False, index=df.index)
+    return pd.Series(rules.evaluate(df)[:, 0], index=df.index)
+
+
+def qc_violations(df, check, columns=None):
+    """Lignes en anomalie pour ``check``, restreintes à ``columns`` si donné."""
+    violations = df[qc_mask(df, check)]
+    if columns is not None:
+        violations = violations[[col for col in columns if col in violations.columns]]
+    return violations
+
+
+def qc_summary(df):
+    """Nombre de lignes en anomalie par contrôle (tous les contrôles applicables, en une passe)."""
+    rules = RuleSet(df.columns)
+    counts = rules.evaluate(df).sum(axis=0) if rules.names else []
+    rows = [{'controle': name, 'description': rules.checks[name][0], 'anomalies': int(count)}
+            for name, count in zip(rules.names, counts)]
+    return pd.DataFrame(rows, columns=['controle', 'description', 'anomalies'])
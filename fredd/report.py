@@ -0,0 +1,155 @@
+"""Rapport des indicateurs FREDD par site, sans Streamlit ni Quarto.
+
+Chaque export est lu une seule fois et tous les indicateurs en sont tirés
+(résumé, distributions, croisement diagnostic × gène, contrôles qualité) ;
+les exports sont traités en parallèle dans un pool de processus. Les tables
+obtenues, une ligne par valeur et par export (``source_file``), sont écrites
+en Parquet ou en JSON et relues par le tableau de bord et le rapport Quarto.
+
+Génération en ligne de commande ::
+
+    python -m fredd.report Answers_1.csv Answers_2.csv --out reports
+"""
+
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from fredd.binning import histogram
+from fredd.ingestion import fingerprint, read_export
+# Contrôles qualité (fredd.quality), réexportés pour les appels existants
+from fredd.quality import QC_CHECKS, check_sites, qc_mask, qc_summary, qc_violations  # noqa: F401
+from fredd.schema import label_codes
+
+SOURCE_COLUMN = 'source_file'
+
+# Tranches d'âge à l'inclusion (années) de l'histogramme
+AGE_BINS = np.arange(0, 105, 5)
+
+
+def value_counts(df, column, labeled=False):
+    """Effectifs par valeur de ``column`` (valeurs manquantes comprises), par ordre décroissant."""
+    counts = df[column].value_counts(dropna=False, sort=True).rename_axis('valeur').reset_index(name='patients')
+    counts['valeur'] = label_codes(counts['valeur'], column, missing='Non renseigné') if labeled else counts['valeur'].astype(object)
+    return counts
+
+
+def age_histogram(df, column='leg_age_patientFREDD', bins=AGE_BINS):
+    """Histogramme des âges par tranches ``[début, fin[`` (la dernière tranche est fermée)."""
+    return histogram(df[column].to_numpy(dtype=float, na_value=np.nan), edges=bins)
+
+
+def crosstab(df, rows, columns):
+    """Croisement de deux colonnes, au format long (une ligne par couple observé)."""
+    pairs = df.groupby([rows, columns], observed=True).size().reset_index(name='patients')
+    return pairs.astype({rows: object, columns: object})
+
+
+def summary(df):
+    """Indicateurs principaux d'un export (une ligne)."""
+    return pd.DataFrame([{
+        'sites': ', '.join(map(str, df['leg_site_inc_nom'].dropna().unique())) if 'leg_site_inc_nom' in df else '',
+        'patients': len(df),
+        'maladies': df['diaCli_diagMR_nom'].nunique() if 'diaCli_diagMR_nom' in df else 0,
+        'genes': df['diaGen_var_hgcn_1'].nunique() if 'diaGen_var_hgcn_1' in df else 0,
+        'age_moyen': float(df['leg_age_patientFREDD'].mean()) if 'leg_age_patientFREDD' in df else np.nan,
+    }])
+
+
+def site_indicators(df):
+    """Toutes les tables d'indicateurs d'un export prétraité."""
+    # Contrôles qualité en une passe : résumé par contrôle et par site, et patients en anomalie
+    anomalies, qc = check_sites(df, workers=1)
+    tables = {'resume': summary(df), 'qc': qc, 'qc_anomalies': anomalies}
+    for name, column, labeled in [('sexe', 'adm_sexe', True), ('diagnostics', 'diaCli_diagMR_nom', False),
+                                  ('genes', 'diaGen_var_hgcn_1', False), ('classes', 'diaGen_var_classe_1_1', True)]:
+        if column in df.columns:
+            tables[name] = value_counts(df, column, labeled)
+    if 'leg_age_patientFREDD' in df.columns:
+        tables['ages'] = age_histogram(df)
+    if {'diaCli_diagMR_nom', 'diaGen_var_hgcn_1'} <= set(df.columns):
+        tables['diagnostic_gene'] = crosstab(df, 'diaCli_diagMR_nom', 'diaGen_var_hgcn_1')
+    return tables
+
+
+def _site_report(name, path):
+    tables = site_indicators(read_export(Path(path), name))
+    for table in tables.values():
+        table.insert(0, SOURCE_COLUMN, name)
+    return tables
+
+
+def compute_report(paths, workers=None):
+    """Indicateurs de plusieurs exports, un processus par export (``workers`` au plus).
+
+    Renvoie un dictionnaire ``nom de table -> DataFrame`` (toutes les lignes de
+    tous les exports, colonne ``source_file``).
+    """
+    paths = [Path(path) for path in paths]
+    if workers == 1 or len(paths) == 1:
+        results = [_site_report(path.name, path) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_site_report, [path.name for path in paths], paths))
+    names = list(dict.fromkeys(name for tables in results for name in tables))
+    return {name: pd.concat([tables[name] for tables in results if name in tables], ignore_index=True)
+            for name in names}
+
+
+def write_report(report, out, fmt='parquet'):
+    """Écrit chaque table dans ``out`` (``<table>.parquet`` ou ``<table>.json``)."""
+    out = Path(out)
+    out.mkdir(parents=True, exist_ok=True)
+    for name, table in report.items():
+        if fmt == 'json':
+            records = json.loads(table.to_json(orient='records', date_format='iso', force_ascii=False))
+            (out / f"{name}.json").write_text(json.dumps(records, ensure_ascii=False, indent=1), encoding='utf-8')
+        else:
+            table.to_parquet(out / f"{name}.parquet", index=False)
+
+
+def _report_files(root):
+    root = Path(root)
+    if not root.is_dir():
+        return []
+    return sorted(p for p in root.iterdir() if p.suffix in ('.parquet', '.json'))
+
+
+def report_version(root):
+    """Empreinte des fichiers du rapport (nom, taille, date)."""
+    keys = [f"{p.name}:{p.stat().st_size}:{p.stat().st_mtime_ns}" for p in _report_files(root)]
+    return fingerprint("|".join(keys).encode())
+
+
+def load_report(root):
+    """Relit les tables d'un rapport (Parquet ou JSON) : ``nom -> DataFrame``."""
+    report = {}
+    for path in _report_files(root):
+        if path.suffix == '.parquet':
+            report[path.stem] = pd.read_parquet(path)
+        elif path.stem not in report:
+            report[path.stem] = pd.DataFrame(json.loads(path.read_text(encoding='utf-8')))
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calcule les indicateurs FREDD de plusieurs exports CSV.")
+    parser.add_argument('csv', nargs='+', help="fichiers CSV (séparateur ';'), un par site")
+    parser.add_argument('--out', default=os.environ.get('FREDD_REPORT_DIR', 'reports'),
+                        help="répertoire du rapport (défaut : $FREDD_REPORT_DIR ou ./reports)")
+    parser.add_argument('--format', choices=['parquet', 'json'], default='parquet', help="format des tables")
+    parser.add_argument('--workers', type=int, default=None, help="nombre de processus (défaut : nombre de CPU)")
+    args = parser.parse_args(argv)
+    report = compute_report(args.csv, workers=args.workers)
+    write_report(report, args.out, fmt=args.format)
+    for name, table in report.items():
+        print(f"{name}: {len(table)} lignes -> {args.out}")
+
+
+if __name__ == '__main__':
+    main()
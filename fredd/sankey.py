@@ -0,0 +1,76 @@
+"""Liens du diagramme de Sankey maladies → gènes.
+
+Les deux colonnes sont factorisées en codes entiers, puis les flux sont
+agrégés en NumPy (``bincount`` sur un code de couple) au lieu de dictionnaires
+et de listes Python. Les nœuds peu fréquents peuvent être regroupés en
+« Autres » (``top_k`` nœuds gardés de chaque côté) et les flux trop faibles
+écartés (``min_flow``), pour garder un graphique lisible avec des centaines de
+maladies et de gènes.
+"""
+
+import numpy as np
+import pandas as pd
+
+OTHER = 'Autres'
+
+# Palette statique (tab20), sans dépendre de matplotlib
+PALETTE = [
+    '#1f77b4', '#aec7e8', '#ff7f0e', '#ffbb78', '#2ca02c', '#98df8a', '#d62728', '#ff9896', '#9467bd', '#c5b0d5',
+    '#8c564b', '#c49c94', '#e377c2', '#f7b6d2', '#7f7f7f', '#c7c7c7', '#bcbd22', '#dbdb8d', '#17becf', '#9edae5',
+]
+
+
+def rgba(color, alpha):
+    """Couleur ``#rrggbb`` en ``rgba(r, g, b, alpha)`` pour Plotly."""
+    r, g, b = (int(color[i:i + 2], 16) for i in (1, 3, 5))
+    return f'rgba({r}, {g}, {b}, {alpha})'
+
+
+def _top_codes(codes, uniques, weights, top_k):
+    # Garde les ``top_k`` valeurs de plus fort flux, les autres deviennent « Autres »
+    if top_k is None or top_k >= len(uniques):
+        return codes, uniques
+    totals = np.bincount(codes, weights=weights, minlength=len(uniques))
+    kept = np.argsort(-totals, kind='stable')[:top_k]
+    remap = np.full(len(uniques), top_k)
+    remap[kept] = np.arange(top_k)
+    return remap[codes], [uniques[i] for i in kept] + [OTHER]
+
+
+def _used(codes, labels):
+    # Numérotation des seuls nœuds encore reliés après l'élagage des flux
+    used, codes = np.unique(codes, return_inverse=True)
+    return codes, [labels[i] for i in used]
+
+
+def sankey_links(sources, targets, weights=None, top_k=None, min_flow=0):
+    """Flux agrégés entre les valeurs de ``sources`` et de ``targets`` (séries alignées).
+
+    ``weights`` donne le poids de chaque ligne (1 par défaut, ou les effectifs
+    d'un cube agrégé). Les couples avec une valeur manquante sont ignorés.
+    Renvoie les libellés des nœuds sources, ceux des nœuds cibles et un
+    DataFrame ``source``, ``target``, ``value`` (indices de nœuds, les cibles
+    numérotées après les sources), par flux décroissant.
+    """
+    source_codes, source_uniques = pd.factorize(sources)
+    target_codes, target_uniques = pd.factorize(targets)
+    weights = np.ones(len(source_codes)) if weights is None else np.asarray(weights, dtype=float)
+    present = (source_codes >= 0) & (target_codes >= 0)
+    source_codes, target_codes, weights = source_codes[present], target_codes[present], weights[present]
+
+    source_codes, source_labels = _top_codes(source_codes, list(source_uniques), weights, top_k)
+    target_codes, target_labels = _top_codes(target_codes, list(target_uniques), weights, top_k)
+
+    # Un code par couple (source, cible), puis somme des poids par couple
+    n_targets = max(len(target_labels), 1)
+    pairs, inverse = np.unique(source_codes * n_targets + target_codes, return_inverse=True)
+    values = np.bincount(inverse, weights=weights, minlength=len(pairs))
+    keep = (values > 0) & (values >= min_flow)
+    pairs, values = pairs[keep], values[keep]
+    order = np.argsort(-values, kind='stable')
+    pairs, values = pairs[order], values[order]
+
+    link_sources, source_labels = _used(pairs // n_targets, source_labels)
+    link_targets, target_labels = _used(pairs % n_targets, target_labels)
+    links = pd.DataFrame({'source': link_sources, 'target': link_targets + len(source_labels), 'value': values})
+    return source_labels, target_labels, links
@@ -0,0 +1,114 @@
+"""Schéma déclaratif des colonnes FREDD utilisées par les analyses.
+
+Le schéma décrit les dates (format explicite), les variables codées (entiers
+compacts et libellés), les colonnes texte catégorielles et les colonnes
+dérivées. ``fredd.preprocessing.preprocess`` l'applique une seule fois par
+export.
+"""
+
+import functools
+import re
+
+import pandas as pd
+
+SCHEMA_VERSION = 1
+
+# Les exports FREDD datent au format jour/mois/année ; l'ISO 8601 est accepté en second choix
+DATE_FORMATS = ['%d/%m/%Y', 'ISO8601']
+
+DATE_COLUMNS = [
+    'leg_date_incFREDD',
+    'adm_date_naissance',
+    'diaGen_CR_date',
+    'his_date_MR',
+    'exaAcu_date',
+    'exaChv_date',
+]
+
+CLASSE_LABELS = {
+    1: "Inconnu",
+    2: "Indéterminé",
+    3: "Signification incertaine",
+    4: "Probablement pathogène",
+    5: "Pathogène",
+}
+
+EXAMEN_ACUITE_LABELS = {
+    1: 'Monoyer',
+    2: 'Pigassou',
+    3: 'Bébé vision',
+    4: 'Cardiff',
+    5: 'EDTRS',
+    6: 'Autre',
+}
+
+# Variables codées : motif du nom de colonne -> libellés des codes (None si non documentés)
+CODED_COLUMNS = {
+    r'adm_sexe': {1: 'Homme', 2: 'Femme'},
+    r'adm_occupation': {1: 'Salarié', 2: 'Retraité', 3: 'Sans emploi', 4: 'Etudiant',
+                        5: 'Non applicable (enfant)', 6: 'Inconnu'},
+    r'his_age_psignes': {1: 'Anténatal', 2: 'A la naissance', 3: 'Post natal', 4: 'Non déterminé'},
+    r'diaCli_stat_diag': {1: 'En cours', 2: 'Probable', 3: 'Confirmé', 4: 'Indéterminé'},
+    r'diaGen_statut_analyse': {1: 'En cours', 2: 'Terminé', 3: 'Inconnu'},
+    r'diaGen_liste_tec': {1: 'Séquençage SANGER simple', 2: 'Séquençage ciblé avec panel de 10-30 gènes',
+                          5: 'PCR Quantitative', 6: 'Séquençage exome entier (WES)',
+                          7: 'Séquençage génome entier (WGS)', 9: 'Autre'},
+    r'diaGen_corr': {1: 'Oui (cas classique)', 0: 'Non (cas atypique)'},
+    r'diaGen_var_nbgene': None,
+    r'diaGen_var_nbvar_\d+': None,
+    r'diaGen_var_trans_\d+': {1: 'De novo', 2: 'Autosomique dominant', 3: 'Autosomique récessif'},
+    r'diaGen_var_classe_\d+_\d+': CLASSE_LABELS,
+    r'diaGen_var_nature_\d+_\d+': None,
+    r'exaAcu_type_examen_O[DG]': EXAMEN_ACUITE_LABELS,
+}
+
+# Colonnes texte à faible cardinalité, stockées en ``category``
+CATEGORY_COLUMNS = [
+    r'source_file',
+    r'leg_site_inc_nom',
+    r'diaCli_diagMR_nom',
+    r'diaGen_var_hgcn_\d+',
+    r'diaCli_signes_ass\d+',
+    r'exaChv_type',
+]
+
+# Les autres colonnes texte sont aussi encodées si elles ont peu de valeurs distinctes
+CATEGORY_MAX_RATIO = 0.5
+
+# Colonnes dérivées : nom -> (date de fin, date de début), âge en années
+DERIVED_AGES = {
+    # Age à l'inclusion dans FREDD
+    'leg_age_patientFREDD': ('leg_date_incFREDD', 'adm_date_naissance'),
+    # Age au moment du dernier compte rendu génétique (juste patients ayant statut confirmé)
+    'age_diagnostic': ('diaGen_CR_date', 'adm_date_naissance'),
+}
+
+_CODED_PATTERNS = [(re.compile(pattern), labels) for pattern, labels in CODED_COLUMNS.items()]
+_CATEGORY_PATTERNS = [re.compile(pattern) for pattern in CATEGORY_COLUMNS]
+
+
+def coded_columns(columns):
+    """Colonnes codées présentes parmi ``columns``."""
+    return [col for col in columns if any(p.fullmatch(col) for p, _ in _CODED_PATTERNS)]
+
+
+def category_columns(columns):
+    """Colonnes texte déclarées catégorielles présentes parmi ``columns``."""
+    return [col for col in columns if any(p.fullmatch(col) for p in _CATEGORY_PATTERNS)]
+
+
+@functools.lru_cache(maxsize=None)
+def code_labels(column):
+    """Libellés des codes d'une colonne codée (dictionnaire vide si inconnus), résolus une fois par colonne."""
+    for pattern, labels in _CODED_PATTERNS:
+        if pattern.fullmatch(column):
+            return labels or {}
+    return {}
+
+
+def label_codes(values, column, missing='Inconnu'):
+    """Libellés d'une série de codes ; les codes non documentés restent affichés tels quels."""
+    values = pd.Series(values)
+    labeled = values.map(code_labels(column))
+    labeled = labeled.where(labeled.notna(), values.astype(object).astype(str))
+    return labeled.where(values.notna(), missing)
@@ -0,0 +1,51 @@
+"""Combinaisons de signes cliniques associés (``diaCli_signes_ass1..9``).
+
+La matrice patients × signes est construite en une seule passe vectorisée
+(positions non vides des colonnes de signes → codes factorisés), puis les
+combinaisons sont comptées par lignes uniques de cette matrice.
+"""
+
+import numpy as np
+import pandas as pd
+
+from fredd.instrumentation import timed
+
+SIGN_COLUMNS = [f'diaCli_signes_ass{i}' for i in range(1, 10)]
+
+
+@timed('agregat:signes_indicateurs')
+def sign_indicators(df, columns=SIGN_COLUMNS):
+    """Matrice booléenne patients × signes (``True`` si le patient présente le signe).
+
+    Les colonnes sont les signes, dans leur ordre de première apparition. Le
+    résultat peut être passé tel quel à ``upsetplot.from_indicators``.
+    """
+    columns = [col for col in columns if col in df.columns]
+    values = df[columns].to_numpy(dtype=object)
+    rows, cols = np.nonzero(pd.notna(values))
+    codes, signs = pd.factorize(values[rows, cols].astype(str))
+
+    matrix = np.zeros((len(df), len(signs)), dtype=bool)
+    matrix[rows, codes] = True
+    return pd.DataFrame(matrix, index=df.index, columns=list(signs))
+
+
+@timed('agregat:signes_combinaisons')
+def count_combinations(indicators):
+    """Compte les patients par combinaison de signes, par effectif décroissant.
+
+    Renvoie un DataFrame avec une colonne booléenne par signe, ``count`` et
+    ``combination`` (libellé « signe A, signe B »).
+    """
+    signs = np.asarray(indicators.columns, dtype=object)
+    matrix = indicators.to_numpy(dtype=bool)
+    if matrix.shape[1] == 0:
+        patterns = np.zeros((int(len(matrix) > 0), 0), dtype=bool)
+        counts = np.array([len(matrix)] if len(matrix) else [], dtype=np.int64)
+    else:
+        patterns, counts = np.unique(matrix, axis=0, return_counts=True)
+
+    combos = pd.DataFrame(patterns, columns=indicators.columns)
+    combos['count'] = counts
+    combos['combination'] = [', '.join(signs[pattern]) for pattern in patterns]
+    return combos.sort_values('count', ascending=False, kind='stable').reset_index(drop=True)
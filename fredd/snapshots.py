@@ -0,0 +1,215 @@
+"""Snapshots Parquet des exports FREDD.
+
+Chaque export CSV est converti une seule fois en Parquet typé selon
+``fredd.schema`` (dates déjà converties, variables codées en entiers compacts,
+colonnes catégorielles encodées en dictionnaire), partitionné par
+``source_file``. Le tableau de bord relit ensuite uniquement les colonnes dont
+il a besoin, en lecture mappée en mémoire.
+
+Chaque ligne stockée garde l'empreinte de sa version brute (``row_hash``). Quand
+un site renvoie une nouvelle version complète d'un export, les lignes sont
+comparées par (``id``, ``source_file``) et empreinte : seules les lignes
+nouvelles ou modifiées sont prétraitées, les lignes supprimées ou modifiées
+retirées, et les agrégats précalculés (``fredd.aggregates``, répertoire
+``_agregats``) mis à jour avec ce seul delta.
+
+Conversion en ligne de commande ::
+
+    python -m fredd.snapshots Answers_1.csv Answers_2.csv --out snapshots
+"""
+
+import argparse
+import os
+from pathlib import Path
+from urllib.parse import unquote
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from fredd.aggregates import CohortAggregates
+from fredd.ingestion import fingerprint, read_export
+from fredd.patients import ID_COLUMN, id_keys
+from fredd.preprocessing import PREPROCESSED_ATTR, concat_exports, is_preprocessed, preprocess
+from fredd.schema import SCHEMA_VERSION
+from fredd.streaming import HASH_COLUMN, raw_to_csv, read_raw, row_hashes
+
+PARTITION_COLUMN = 'source_file'
+
+# Agrégats précalculés ; le préfixe « _ » les exclut de la lecture du dataset
+AGGREGATES_DIR = '_agregats'
+
+
+def save_snapshot(df, root):
+    """Écrit (ou remplace) les partitions ``source_file`` présentes dans ``df``."""
+    if not is_preprocessed(df):
+        df = preprocess(df.copy())
+    # Les colonnes texte restantes (types mélangés, entièrement vides) sont stockées en texte
+    object_columns = df.select_dtypes(include='object').columns
+    df = df.assign(**{col: df[col].where(df[col].isna(), df[col].astype(str)) for col in object_columns})
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_to_dataset(
+        table,
+        root_path=str(root),
+        partition_cols=[PARTITION_COLUMN],
+        existing_data_behavior='delete_matching',
+    )
+
+
+def _row_keys(ids):
+    # Identifiant et rang d'apparition : des identifiants répétés restent distincts
+    keys = pd.Series(id_keys(pd.Series(ids).reset_index(drop=True)))
+    return (keys + '#' + keys.groupby(keys).cumcount().astype(str)).to_numpy()
+
+
+def diff_rows(old_ids, old_hashes, new_ids, new_hashes):
+    """Compare deux versions d'un export ligne à ligne (identifiant et empreinte).
+
+    Renvoie trois masques : lignes nouvelles et lignes modifiées (nouvelle
+    version), lignes supprimées ou modifiées à retirer (ancienne version).
+    """
+    old_hashes, new_hashes = np.asarray(old_hashes), np.asarray(new_hashes)
+    positions = pd.Index(_row_keys(old_ids)).get_indexer(_row_keys(new_ids))
+    added = positions < 0
+    changed = ~added & (old_hashes[np.maximum(positions, 0)] != new_hashes)
+    stale = np.ones(len(old_hashes), dtype=bool)
+    stale[positions[~added & ~changed]] = False
+    return added, changed, stale
+
+
+def _stored_partition(root, name):
+    # Partition déjà stockée avec ses empreintes de lignes, sinon None
+    if name not in list_sources(root) or HASH_COLUMN not in snapshot_columns(root):
+        return None
+    df = load_snapshot(root, columns=snapshot_columns(root), sources=[name])
+    if df[HASH_COLUMN].isna().any():
+        return None
+    df.attrs[PREPROCESSED_ATTR] = SCHEMA_VERSION
+    return df
+
+
+def convert_csv(csv_path, root, full=False):
+    """Convertit un export CSV en snapshot Parquet, par delta si la partition existe déjà.
+
+    Renvoie le nom de la partition et le nombre de lignes ``nouvelles``,
+    ``modifiees``, ``supprimees`` et ``inchangees``. ``full`` force la
+    reconversion de tout l'export.
+    """
+    csv_path = Path(csv_path)
+    name = csv_path.name
+    raw = read_raw(csv_path)
+    hashes = row_hashes(raw)
+    aggregates = CohortAggregates.load(Path(root) / AGGREGATES_DIR)
+    old = None if full or ID_COLUMN not in raw.columns else _stored_partition(root, name)
+
+    if old is None:
+        df = read_export(csv_path, name)
+        df[HASH_COLUMN] = hashes
+        save_snapshot(df, root)
+        aggregates.replace_source(name, df)
+        delta = {'nouvelles': len(df), 'modifiees': 0, 'supprimees': 0, 'inchangees': 0}
+    else:
+        added, changed, stale = diff_rows(old[ID_COLUMN], old[HASH_COLUMN], raw[ID_COLUMN], hashes)
+        delta = {'nouvelles': int(added.sum()), 'modifiees': int(changed.sum()),
+                 'supprimees': int(stale.sum() - changed.sum()), 'inchangees': int((~stale).sum())}
+        if stale.any() or added.any():
+            # Seules les lignes nouvelles ou modifiées sont relues et prétraitées (aucune si seules des lignes
+            # ont été supprimées)
+            fresh = added | changed
+            df = old[~stale].reset_index(drop=True)
+            fresh_df = None
+            if fresh.any():
+                fresh_df = read_export(raw_to_csv(raw[fresh]), name)
+                fresh_df[HASH_COLUMN] = hashes[fresh]
+                df = concat_exports([df, fresh_df])
+            # Valeurs des seules lignes retirées : catégories supprimées, comme après une reconversion complète
+            categorical = df.select_dtypes(include='category').columns
+            df = df.assign(**{col: df[col].cat.remove_unused_categories() for col in categorical})
+            save_snapshot(df, root)
+            if name in aggregates.sources():
+                aggregates.remove(name, old[stale])
+                if fresh_df is not None:
+                    aggregates.add(name, fresh_df)
+            else:
+                aggregates.replace_source(name, df)
+        elif name not in aggregates.sources():
+            aggregates.replace_source(name, old)
+    aggregates.save(Path(root) / AGGREGATES_DIR)
+    return name, delta
+
+
+def load_aggregates(root):
+    """Agrégats précalculés du snapshot (``fredd.aggregates.CohortAggregates``)."""
+    return CohortAggregates.load(Path(root) / AGGREGATES_DIR)
+
+
+def _dataset(root):
+    return ds.dataset(str(root), format='parquet', partitioning='hive')
+
+
+def list_sources(root):
+    """Liste les exports (valeurs de ``source_file``) présents dans le snapshot."""
+    root = Path(root)
+    if not root.is_dir():
+        return []
+    prefix = f"{PARTITION_COLUMN}="
+    return sorted(
+        unquote(p.name[len(prefix):])
+        for p in root.iterdir() if p.is_dir() and p.name.startswith(prefix)
+    )
+
+
+def snapshot_version(root, sources=None):
+    """Empreinte des fichiers Parquet (chemin, taille, date) des partitions lues."""
+    root = Path(root)
+    wanted = set(sources) if sources else None
+    keys = []
+    for path in sorted(root.glob(f"{PARTITION_COLUMN}=*/*.parquet")):
+        if wanted is not None and unquote(path.parent.name.split('=', 1)[1]) not in wanted:
+            continue
+        stat = path.stat()
+        keys.append(f"{path.relative_to(root)}:{stat.st_size}:{stat.st_mtime_ns}")
+    return fingerprint("|".join(keys).encode())
+
+
+def snapshot_columns(root):
+    """Noms des colonnes disponibles dans le snapshot."""
+    return _dataset(root).schema.names
+
+
+def load_snapshot(root, columns=None, sources=None, filters=None):
+    """Lit le snapshot en ne chargeant que ``columns`` (toutes si ``None``).
+
+    ``sources`` restreint la lecture à certaines partitions ``source_file`` et
+    ``filters`` accepte des filtres au format ``pyarrow.parquet``
+    (ex. ``[('leg_site_inc_nom', '=', 'HUS')]``).
+    """
+    if columns is not None:
+        available = set(snapshot_columns(root))
+        columns = [col for col in dict.fromkeys(columns) if col in available]
+    elif HASH_COLUMN in snapshot_columns(root):
+        # Les empreintes ne servent qu'au chargement par delta
+        columns = [col for col in snapshot_columns(root) if col != HASH_COLUMN]
+    if sources:
+        source_filter = [(PARTITION_COLUMN, 'in', list(sources))]
+        filters = source_filter + list(filters or [])
+    table = pq.read_table(str(root), columns=columns, filters=filters or None, memory_map=True)
+    return table.to_pandas()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convertit des exports CSV FREDD en snapshots Parquet.")
+    parser.add_argument('csv', nargs='+', help="fichiers CSV (séparateur ';')")
+    parser.add_argument('--out', default=os.environ.get('FREDD_SNAPSHOT_DIR', 'snapshots'),
+                        help="répertoire du snapshot (défaut : $FREDD_SNAPSHOT_DIR ou ./snapshots)")
+    parser.add_argument('--full', action='store_true', help="reconvertit tout l'export au lieu du seul delta")
+    args = parser.parse_args(argv)
+    for path in args.csv:
+        name, delta = convert_csv(path, args.out, full=args.full)
+        print(f"{name} -> {args.out} : " + ", ".join(f"{count} {kind}" for kind, count in delta.items()))
+
+
+if __name__ == '__main__':
+    main()
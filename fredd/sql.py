@@ -0,0 +1,185 @@
+"""Moteur SQL embarqué (DuckDB) au-dessus des snapshots Parquet.
+
+Les partitions ``source_file`` sélectionnées sont exposées comme une vue SQL
+d'une base DuckDB en mémoire, ouverte une fois par processus et partagée en
+lecture seule par toutes les sessions du tableau de bord. Filtres, comptes,
+agrégats par site et liens du Sankey sont exécutés en SQL (multithreadé) :
+seules les colonnes citées par la requête sont lues, et seul le résultat agrégé
+revient en pandas, au lieu d'une table patients chargée par session.
+
+``SqlCube`` offre la même interface que ``fredd.cube.AggregateCube`` : les vues
+fonctionnent indifféremment sur l'un ou l'autre.
+
+Dépendance facultative : ``pip install duckdb``.
+"""
+
+import threading
+from pathlib import Path
+
+import duckdb
+
+from fredd.cube import AGE_BUCKET, AGE_COLUMN, PATIENTS, VARIANTS, VARIANT_COLUMN
+from fredd.export import CHUNK_ROWS
+from fredd.snapshots import PARTITION_COLUMN
+
+TABLE = 'exports'
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _where(conditions):
+    return f" WHERE {' AND '.join(conditions)}" if conditions else ''
+
+
+class SnapshotDatabase:
+    """Base DuckDB en lecture seule sur les partitions ``sources`` d'un snapshot.
+
+    ``threads`` fixe le nombre de threads de DuckDB (tous les cœurs par défaut).
+    Chaque requête utilise son propre curseur : l'objet peut être partagé entre
+    les sessions (threads) de Streamlit.
+    """
+
+    def __init__(self, root, sources=None, threads=None):
+        self._connection = duckdb.connect(':memory:')
+        self._lock = threading.Lock()
+        if threads:
+            self._connection.execute(f"SET threads = {int(threads)}")
+        pattern = (Path(root) / f'{PARTITION_COLUMN}=*' / '*.parquet').as_posix()
+        query = f"SELECT * FROM read_parquet({_literal(pattern)}, hive_partitioning = true)"
+        if sources:
+            query += f" WHERE {_quote(PARTITION_COLUMN)} IN ({', '.join(_literal(s) for s in sources)})"
+        self._connection.execute(f"CREATE VIEW {TABLE} AS {query}")
+        self.columns = [row[0] for row in self._connection.execute(f"DESCRIBE {TABLE}").fetchall()]
+
+    def _cursor(self):
+        with self._lock:
+            return self._connection.cursor()
+
+    def execute(self, query, params=()):
+        """Exécute une requête sur la vue ``exports`` et renvoie le résultat en DataFrame."""
+        cursor = self._cursor()
+        try:
+            return cursor.execute(query, list(params)).df()
+        finally:
+            cursor.close()
+
+    def scalar(self, query, params=()):
+        cursor = self._cursor()
+        try:
+            return cursor.execute(query, list(params)).fetchone()[0]
+        finally:
+            cursor.close()
+
+    def conditions(self, filters, age=None):
+        """Clauses SQL (et paramètres) des filtres, mêmes règles que ``AggregateCube.slice``.
+
+        Une clé de ``filters`` peut être un tuple de colonnes (ex. les emplacements
+        ``diaGen_var_hgcn_*``) : une ligne est retenue si l'une d'elles prend l'une des valeurs.
+        """
+        conditions, params = [], []
+        for col, values in filters.items():
+            if values:
+                columns = col if isinstance(col, tuple) else (col,)
+                conditions.append(f"({' OR '.join(f'{_quote(c)} IN ?' for c in columns) or 'FALSE'})")
+                params += [list(values)] * len(columns)
+        if age is not None and AGE_COLUMN in self.columns:
+            conditions.append(f"{_quote(AGE_COLUMN)} BETWEEN ? AND ?")
+            params += [age[0], age[1]]
+        return conditions, params
+
+    def values(self, column):
+        """Valeurs distinctes (non manquantes) de ``column``, triées."""
+        col = _quote(column)
+        df = self.execute(f"SELECT DISTINCT {col} FROM {TABLE} WHERE {col} IS NOT NULL ORDER BY {col}")
+        return df[column].tolist()
+
+    def frame(self, columns, filters=None, age=None):
+        """Lignes satisfaisant les filtres, restreintes à ``columns`` (colonnes absentes ignorées)."""
+        columns = [col for col in dict.fromkeys(columns) if col in self.columns]
+        conditions, params = self.conditions(filters or {}, age)
+        return self.execute(f"SELECT {', '.join(map(_quote, columns))} FROM {TABLE}{_where(conditions)}", params)
+
+    def iter_frames(self, columns, filters=None, age=None, chunk_rows=CHUNK_ROWS):
+        """Comme ``frame``, mais par lots de ``chunk_rows`` lignes lus au fur et à mesure (export en flux)."""
+        columns = [col for col in dict.fromkeys(columns) if col in self.columns]
+        conditions, params = self.conditions(filters or {}, age)
+        cursor = self._cursor()
+        try:
+            cursor.execute(f"SELECT {', '.join(map(_quote, columns))} FROM {TABLE}{_where(conditions)}", list(params))
+            reader = cursor.fetch_record_batch(chunk_rows)
+            for batch in reader:
+                yield batch.to_pandas()
+        finally:
+            cursor.close()
+
+    def cube(self):
+        """Cube SQL de toutes les lignes (non filtré)."""
+        return SqlCube(self)
+
+
+class SqlCube:
+    """Agrégations de ``AggregateCube`` exécutées en SQL sur une ``SnapshotDatabase``."""
+
+    def __init__(self, database, conditions=(), params=()):
+        self.database = database
+        self._conditions = list(conditions)
+        self._params = list(params)
+
+    def __len__(self):
+        return self.total()
+
+    def slice(self, filters, age=None):
+        """Sous-cube des lignes satisfaisant les filtres (cf. ``AggregateCube.slice``)."""
+        conditions, params = self.database.conditions(filters, age)
+        return SqlCube(self.database, self._conditions + conditions, self._params + params)
+
+    def _measure(self, measure):
+        if measure == PATIENTS:
+            return 'COUNT(*)'
+        if measure == VARIANTS:
+            if VARIANT_COLUMN not in self.database.columns:
+                return '0.0'
+            return f"COALESCE(SUM(CAST({_quote(VARIANT_COLUMN)} AS DOUBLE)), 0)"
+        raise KeyError(measure)
+
+    def total(self, measure=PATIENTS):
+        query = f"SELECT {self._measure(measure)} FROM {TABLE}{_where(self._conditions)}"
+        return int(self.database.scalar(query, self._params))
+
+    def rollup(self, columns, measure=PATIENTS, dropna=False):
+        """Agrège sur ``columns`` (équivalent d'un ``groupby(columns).size()``)."""
+        keys = ', '.join(map(_quote, columns))
+        conditions = self._conditions + ([f"{_quote(col)} IS NOT NULL" for col in columns] if dropna else [])
+        query = (f"SELECT {keys}, {self._measure(measure)} AS {measure} FROM {TABLE}{_where(conditions)} "
+                 f"GROUP BY {keys} ORDER BY {measure} DESC, {keys}")
+        return self.database.execute(query, self._params)
+
+    def counts(self, column, dropna=False):
+        """Effectifs par valeur de ``column``, par ordre décroissant."""
+        return self.rollup([column], dropna=dropna).set_index(column)[PATIENTS]
+
+    def age_counts(self):
+        """Patients par tranche d'âge, mêmes tranches que ``fredd.cube.age_buckets``."""
+        age = _quote(AGE_COLUMN)
+        bucket = f"CAST(CASE WHEN {age} = FLOOR({age}) THEN 2 * {age} ELSE 2 * FLOOR({age}) + 1 END AS INTEGER)"
+        conditions = self._conditions + [f"{age} IS NOT NULL"]
+        query = (f"SELECT {bucket} AS {AGE_BUCKET}, COUNT(*) AS {PATIENTS} FROM {TABLE}{_where(conditions)} "
+                 f"GROUP BY 1 ORDER BY 1")
+        return self.database.execute(query, self._params)
+
+    def nunique(self, column):
+        query = f"SELECT COUNT(DISTINCT {_quote(column)}) FROM {TABLE}{_where(self._conditions)}"
+        return int(self.database.scalar(query, self._params))
+
+    def nunique_by(self, column, by):
+        """Nombre de valeurs distinctes de ``column`` pour chaque valeur de ``by``."""
+        conditions = self._conditions + [f"{_quote(by)} IS NOT NULL"]
+        query = (f"SELECT {_quote(by)}, COUNT(DISTINCT {_quote(column)}) AS n FROM {TABLE}{_where(conditions)} "
+                 f"GROUP BY {_quote(by)}")
+        return self.database.execute(query, self._params).set_index(by)['n'].rename(column)
@@ -0,0 +1,171 @@
+"""Chargement en flux des exports FREDD, par blocs de lignes.
+
+Chaque export est lu par blocs (``chunksize``) ; dates, âges dérivés et codes
+compacts sont calculés bloc par bloc, les colonnes texte encodées en
+``category`` dès la lecture, puis chaque bloc est ajouté colonne par colonne à une destination
+unique. Les colonnes finales sont assemblées une à une en libérant les blocs
+au fur et à mesure : la mémoire reste proche de la taille du résultat, au lieu
+de garder les exports bruts, leurs versions prétraitées et la concaténation.
+Des comptes (site, diagnostic, gène) sont tenus à jour pendant la lecture.
+"""
+
+import io
+
+import numpy as np
+import pandas as pd
+
+from fredd.instrumentation import frame_memory, section
+from fredd.preprocessing import (PREPROCESSED_ATTR, derive_ages, downcast_integers, encode_codes, parse_dates,
+                                 union_categories)
+from fredd.schema import CATEGORY_MAX_RATIO, SCHEMA_VERSION, category_columns, coded_columns
+
+CSV_SEP = ';'
+
+CHUNK_SIZE = 50_000
+
+# Comptes tenus à jour pendant la lecture
+COUNT_COLUMNS = ['leg_site_inc_nom', 'diaCli_diagMR_nom', 'diaGen_var_hgcn_1']
+
+# Empreinte de chaque ligne brute, stockée dans les snapshots pour le chargement par delta
+HASH_COLUMN = 'row_hash'
+
+
+def read_chunks(source, name, chunksize=CHUNK_SIZE):
+    """Blocs d'un export (chemin ou octets), avec ``source_file``, dates converties et âges dérivés."""
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    with pd.read_csv(source, sep=CSV_SEP, low_memory=False, chunksize=chunksize) as reader:
+        while True:
+            with section('lecture:csv') as record:
+                chunk = next(reader, None)
+                record.rows = 0 if chunk is None else len(chunk)
+            if chunk is None:
+                return
+            chunk['source_file'] = name
+            parse_dates(chunk)
+            derive_ages(chunk)
+            yield chunk
+
+
+def read_raw(source):
+    """Export lu sans aucune conversion (valeurs en texte), pour comparer deux versions ligne à ligne."""
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    return pd.read_csv(source, sep=CSV_SEP, dtype=str)
+
+
+def row_hashes(raw):
+    """Empreinte 64 bits de chaque ligne brute (toutes les colonnes de l'export, dans leur ordre)."""
+    return pd.util.hash_pandas_object(raw, index=False).to_numpy()
+
+
+def raw_to_csv(raw):
+    """Réécrit des lignes brutes au format d'export, pour les relire avec ``read_chunks``."""
+    return raw.to_csv(sep=CSV_SEP, index=False).encode()
+
+
+class RunningCounts:
+    """Effectifs par valeur de quelques colonnes, cumulés bloc par bloc."""
+
+    def __init__(self, columns=COUNT_COLUMNS):
+        self.n_rows = 0
+        self._counts = {col: pd.Series(dtype='int64') for col in columns}
+
+    def update(self, chunk):
+        self.n_rows += len(chunk)
+        for col, counts in self._counts.items():
+            if col in chunk.columns:
+                self._counts[col] = counts.add(chunk[col].value_counts(), fill_value=0).astype('int64')
+
+    def __getitem__(self, column):
+        """Effectifs de ``column``, par ordre décroissant."""
+        return self._counts[column].sort_values(ascending=False, kind='stable')
+
+
+def _as_category(values):
+    # Bloc non catégoriel d'une colonne déclarée : valeurs en texte, valeurs manquantes conservées
+    if values.isna().all():
+        return pd.Series(pd.Categorical.from_codes(np.full(len(values), -1), categories=[]))
+    return values.astype(object).where(values.isna(), values.astype(str)).astype('category')
+
+
+class ColumnarBuilder:
+    """Destination en colonnes des blocs lus, assemblée en un DataFrame prétraité.
+
+    Les colonnes absentes de certains blocs (exports aux colonnes différentes)
+    sont complétées par des valeurs manquantes.
+    """
+
+    def __init__(self):
+        self.n_rows = 0
+        self._parts = {}
+
+    def append(self, chunk):
+        # Codes et entiers compactés dès le bloc : la destination ne garde jamais de float64 inutiles
+        encode_codes(chunk)
+        downcast_integers(chunk)
+        coded = set(coded_columns(chunk.columns))
+        for col in chunk.columns:
+            values = chunk[col]
+            # Texte stocké en category dès la lecture (les codes mal saisis restent bruts pour encode_codes)
+            if col not in coded and (pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values)):
+                values = values.astype('category')
+            self._parts.setdefault(col, []).append((self.n_rows, values.reset_index(drop=True)))
+        self.n_rows += len(chunk)
+
+    def _column(self, parts, declared=False):
+        if declared:
+            # Colonne déclarée catégorielle : les blocs lus sans texte (entièrement vides, en float) sont ré-encodés
+            parts = [(start, part if isinstance(part.dtype, pd.CategoricalDtype) else _as_category(part))
+                     for start, part in parts]
+        categorical = all(isinstance(part.dtype, pd.CategoricalDtype) for _, part in parts)
+        pieces = []
+        position = 0
+        for start, part in parts + [(self.n_rows, None)]:
+            if start > position:
+                gap = start - position
+                pieces.append(pd.Series(pd.Categorical.from_codes(np.full(gap, -1), categories=[]))
+                              if categorical else pd.Series(np.full(gap, np.nan)))
+            if part is not None:
+                pieces.append(part)
+                position = start + len(part)
+        if categorical:
+            return pd.Series(union_categories(pieces))
+        return pd.concat(pieces, ignore_index=True)
+
+    def finish(self, max_ratio=CATEGORY_MAX_RATIO):
+        """Assemble les colonnes (en libérant les blocs au fur et à mesure) et applique le schéma."""
+        declared = set(category_columns(self._parts))
+        n_rows = max(self.n_rows, 1)
+        columns = {}
+        for col in list(self._parts):
+            values = self._column(self._parts.pop(col), col in declared)
+            # Même règle que encode_categories : texte très varié et non déclaré laissé en texte
+            if isinstance(values.dtype, pd.CategoricalDtype) and col not in declared \
+                    and len(values.cat.categories) / n_rows > max_ratio:
+                values = values.astype(values.cat.categories.dtype)
+            columns[col] = values
+        df = pd.DataFrame(columns, copy=False)
+        del columns
+        encode_codes(df)
+        downcast_integers(df)
+        df.attrs[PREPROCESSED_ATTR] = SCHEMA_VERSION
+        return df
+
+
+def stream_exports(files, chunksize=CHUNK_SIZE, count_columns=COUNT_COLUMNS):
+    """Charge en flux des exports ``(nom, chemin ou octets)`` en un seul DataFrame prétraité.
+
+    Renvoie le DataFrame et les comptes cumulés (``RunningCounts``).
+    """
+    builder = ColumnarBuilder()
+    counts = RunningCounts(count_columns)
+    for name, source in files:
+        for chunk in read_chunks(source, name, chunksize):
+            counts.update(chunk)
+            with section('lecture:encodage_blocs', len(chunk)):
+                builder.append(chunk)
+    with section('lecture:assemblage', builder.n_rows) as record:
+        df = builder.finish()
+        record.memory = frame_memory(df)
+    return df, counts
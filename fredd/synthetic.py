@@ -0,0 +1,190 @@
+"""Cohortes FREDD synthétiques, pour mesurer les performances sans données réelles.
+
+Les exports générés suivent le format des exports FREDD (séparateur ``;``,
+dates au format jour/mois/année, variables codées) avec des cardinalités et
+des taux de valeurs manquantes plausibles : maladies, gènes et signes suivent
+une loi de Zipf, chaque maladie est associée à quelques gènes, les dates sont
+cohérentes entre elles (naissance < inclusion < compte rendu). Les tailles
+vont de quelques centaines à plusieurs millions de patients.
+
+Génération en ligne de commande ::
+
+    python -m fredd.synthetic 100000 --sites 3 --out synthetic
+"""
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from fredd.schema import DATE_FORMATS, coded_columns
+from fredd.streaming import CSV_SEP
+
+SITES = [
+    "Hôpital National des 15-20",
+    "Hôpitaux universitaires de Strasbourg",
+    "CHU de Lille",
+    "Hospices Civils de Lyon",
+    "CHU de Bordeaux",
+    "AP-HM Marseille",
+]
+
+N_DIAGNOSES = 300
+N_GENES = 500
+N_SIGNS = 80
+GENES_PER_DIAGNOSIS = 4
+
+# Part de valeurs manquantes par colonne
+MISSING = {
+    'adm_date_naissance': 0.02,
+    'adm_occupation': 0.15,
+    'diaCli_diagMR_nom': 0.12,
+    'his_date_MR': 0.25,
+    'his_age_psignes': 0.10,
+    'diaGen_CR_date': 0.35,
+    'diaGen_caract': 0.30,
+    'exaAcu_date': 0.20,
+    'exaAcu_type_examen_OD': 0.20,
+    'exaAcu_type_examen_OG': 0.20,
+    'exaAcu_quant_OD': 0.25,
+    'exaAcu_quant_OG': 0.25,
+    'exaChv_date': 0.50,
+    'exaChv_type': 0.55,
+}
+
+_EPOCH = np.datetime64('1970-01-01')
+
+
+def _zipf_choice(rng, n_values, size, exponent=1.2):
+    # Rangs tirés selon une loi de Zipf tronquée : quelques valeurs fréquentes, une longue traîne
+    weights = 1.0 / np.arange(1, n_values + 1) ** exponent
+    return rng.choice(n_values, size=size, p=weights / weights.sum())
+
+
+def _dates(days):
+    # Jours depuis 1970 -> texte jour/mois/année ; NaN -> valeur manquante.
+    # Quelques dizaines de milliers de jours distincts : chacun n'est formaté qu'une fois
+    present = ~np.isnan(days)
+    text = np.full(len(days), None, dtype=object)
+    unique_days, inverse = np.unique(days[present].astype('int64'), return_inverse=True)
+    formatted = pd.to_datetime(unique_days, unit='D').strftime(DATE_FORMATS[0]).to_numpy(dtype=object)
+    text[present] = formatted[inverse]
+    return text
+
+
+def _with_missing(rng, values, rate):
+    values = np.array(values, dtype=object)
+    values[rng.random(len(values)) < rate] = None
+    return values
+
+
+def _codes(rng, codes, size, missing=0.0, p=None):
+    values = rng.choice(np.asarray(codes, dtype=float), size=size, p=p)
+    values[rng.random(size) < missing] = np.nan
+    return values
+
+
+def synthetic_export(n_patients, site, seed=0, id_prefix=None):
+    """Export FREDD synthétique (valeurs brutes, comme lues dans le CSV) de ``n_patients`` patients."""
+    rng = np.random.default_rng(seed)
+    # Vocabulaire commun à tous les sites (même graine), tirages propres au site
+    vocabulary = np.random.default_rng(0)
+    diagnosis_genes = vocabulary.integers(0, N_GENES, size=(N_DIAGNOSES, GENES_PER_DIAGNOSIS))
+    n = n_patients
+    prefix = id_prefix or ''.join(word[0] for word in site.split()).upper()
+
+    # Dates en jours depuis 1970 : naissance < premiers signes < inclusion (depuis 2015) < compte rendu
+    start, today = ((np.datetime64(day) - _EPOCH).astype(int) for day in ('2015-01-01', '2025-06-30'))
+    inclusion = rng.uniform(start, today, n)
+    birth = inclusion - rng.uniform(0, 85 * 365.25, n)
+    first_signs = birth + rng.uniform(0, 1, n) * (inclusion - birth)
+    report = np.minimum(today, inclusion + rng.exponential(400, n))
+
+    diagnosis = _zipf_choice(rng, N_DIAGNOSES, n)
+    n_genes = rng.choice([0, 1, 2], size=n, p=[0.35, 0.55, 0.10])
+    # Le premier gène est le plus souvent l'un des gènes associés à la maladie
+    associated = diagnosis_genes[diagnosis, rng.integers(0, GENES_PER_DIAGNOSIS, n)]
+    gene_1 = np.where(rng.random(n) < 0.8, associated, _zipf_choice(rng, N_GENES, n))
+    gene_2 = _zipf_choice(rng, N_GENES, n)
+
+    df = pd.DataFrame({
+        'id': np.char.add(f"{prefix}-", np.char.zfill(np.arange(1, n + 1).astype(str), 7)),
+        'leg_site_inc_nom': site,
+        'leg_date_incFREDD': _dates(inclusion),
+        'adm_date_naissance': _dates(np.where(rng.random(n) < MISSING['adm_date_naissance'], np.nan, birth)),
+        'adm_sexe': _codes(rng, [1, 2], n),
+        'adm_occupation': _codes(rng, [1, 2, 3, 4, 5, 6], n, MISSING['adm_occupation']),
+        'diaCli_diagMR_nom': _with_missing(rng, np.char.add('Maladie rare ', diagnosis.astype(str)),
+                                           MISSING['diaCli_diagMR_nom']),
+        'diaCli_diagMR_code': 10000 + diagnosis,
+        'diaCli_stat_diag': _codes(rng, [1, 2, 3, 4], n, p=[0.2, 0.25, 0.45, 0.1]),
+        'his_date_MR': _dates(np.where(rng.random(n) < MISSING['his_date_MR'], np.nan, first_signs)),
+        'his_age_psignes': _codes(rng, [1, 2, 3, 4], n, MISSING['his_age_psignes'], p=[0.05, 0.25, 0.6, 0.1]),
+        'diaGen_CR_date': _dates(np.where(rng.random(n) < MISSING['diaGen_CR_date'], np.nan, report)),
+        'diaGen_statut_analyse': _codes(rng, [1, 2, 3], n, p=[0.25, 0.65, 0.1]),
+        'diaGen_caract': _codes(rng, [1, 2, 3], n, MISSING['diaGen_caract']),
+        'diaGen_var_nbgene': n_genes,
+        'diaGen_var_hgcn_1': np.where(n_genes >= 1, np.char.add('GENE', gene_1.astype(str)), None),
+        'diaGen_var_hgcn_2': np.where(n_genes >= 2, np.char.add('GENE', gene_2.astype(str)), None),
+    })
+    for g in (1, 2):
+        n_variants = np.where(n_genes >= g, rng.choice([1, 2], size=n, p=[0.7, 0.3]), np.nan)
+        df[f'diaGen_var_nbvar_{g}'] = n_variants
+        for v in (1, 2):
+            present = n_variants >= v
+            df[f'diaGen_var_classe_{g}_{v}'] = np.where(present, _codes(rng, [1, 2, 3, 4, 5], n,
+                                                                         p=[0.05, 0.1, 0.3, 0.3, 0.25]), np.nan)
+            df[f'diaGen_var_nature_{g}_{v}'] = np.where(present, _codes(rng, [1, 2, 3, 4], n, 0.1), np.nan)
+
+    exam_types = [1, 2, 3, 4, 5, 6]
+    exam_p = [0.5, 0.15, 0.1, 0.05, 0.15, 0.05]
+    df['exaAcu_date'] = _dates(np.where(rng.random(n) < MISSING['exaAcu_date'], np.nan, report))
+    for eye in ('OD', 'OG'):
+        df[f'exaAcu_type_examen_{eye}'] = _codes(rng, exam_types, n, MISSING[f'exaAcu_type_examen_{eye}'], p=exam_p)
+        df[f'exaAcu_quant_{eye}'] = _with_missing(rng, rng.uniform(0, 1, n).round(2), MISSING[f'exaAcu_quant_{eye}'])
+    chv_done = rng.random(n) >= MISSING['exaChv_date']
+    df['exaChv_date'] = _dates(np.where(chv_done, report, np.nan))
+    df['exaChv_fait'] = chv_done
+    df['exaChv_type'] = np.where(chv_done & (rng.random(n) > 0.1),
+                                 rng.choice(np.array(['Goldmann', 'Humphrey', 'Octopus'], dtype=object), n), None)
+
+    # Signes cliniques : 0 à 9 par patient, vocabulaire de Zipf, emplacements remplis dans l'ordre
+    n_signs = np.minimum(rng.geometric(0.35, n) - 1, 9)
+    signs = np.char.add('Signe clinique ', _zipf_choice(rng, N_SIGNS, (n, 9)).astype(str)).astype(object)
+    signs[np.arange(9) >= n_signs[:, None]] = None
+    for i in range(9):
+        df[f'diaCli_signes_ass{i + 1}'] = signs[:, i]
+    # Codes écrits en entiers (« 3 » et non « 3.0 »), comme dans les exports
+    return df.astype({col: 'Int16' for col in coded_columns(df.columns)})
+
+
+def write_cohort(out, n_patients, n_sites=2, seed=0):
+    """Écrit une cohorte de ``n_patients`` répartie sur ``n_sites`` exports CSV ; renvoie leurs chemins."""
+    out = Path(out)
+    out.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    shares = rng.dirichlet(np.full(n_sites, 4.0))
+    sizes = np.maximum(1, np.round(shares * n_patients).astype(int))
+    sizes[0] += n_patients - sizes.sum()
+    paths = []
+    for i, (site, size) in enumerate(zip(SITES * (n_sites // len(SITES) + 1), sizes)):
+        path = out / f"synthetique_{i + 1}.csv"
+        synthetic_export(int(size), site, seed=seed + i + 1, id_prefix=f"S{i + 1}").to_csv(path, sep=CSV_SEP, index=False)
+        paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Génère des exports FREDD synthétiques.")
+    parser.add_argument('patients', type=int, help="nombre total de patients")
+    parser.add_argument('--sites', type=int, default=2, help="nombre d'exports (un par site)")
+    parser.add_argument('--out', default='synthetic', help="répertoire de sortie (défaut : ./synthetic)")
+    parser.add_argument('--seed', type=int, default=0, help="graine aléatoire")
+    args = parser.parse_args(argv)
+    for path in write_cohort(args.out, args.patients, args.sites, args.seed):
+        print(path)
+
+
+if __name__ == '__main__':
+    main()
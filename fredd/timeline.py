@@ -0,0 +1,222 @@
+"""Analyses temporelles : inclusions, délai jusqu'au diagnostic génétique et rendement diagnostique.
+
+Les dates de chaque type d'événement (inclusion, premiers signes, compte rendu
+génétique, examens) sont triées une seule fois par version des données : un
+index de dates garde les dates connues triées et la position de leur ligne.
+Un intervalle de dates ou une fenêtre glissante se résout alors par recherche
+dichotomique (``np.searchsorted``) dans cet index, sans relire ni reparser les
+colonnes de dates.
+
+Les effectifs par mois sont précalculés pour chaque événement, au total et par
+site, diagnostic et gène (premier gène saisi) ; les effectifs par trimestre en
+sont déduits. Le rendement diagnostique est la part des patients ayant un gène
+identifié ; le délai va de la date des premiers signes à celle du compte rendu
+génétique.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Type d'événement -> colonne de date
+EVENTS = {
+    'inclusion': 'leg_date_incFREDD',
+    'premiers_signes': 'his_date_MR',
+    'compte_rendu': 'diaGen_CR_date',
+    'acuite': 'exaAcu_date',
+    'champ_visuel': 'exaChv_date',
+}
+
+# Dimensions de ventilation des effectifs -> colonne
+GROUPS = {'site': 'leg_site_inc_nom', 'diagnostic': 'diaCli_diagMR_nom', 'gene': 'diaGen_var_hgcn_1'}
+
+# Périodes -> nombre de mois
+PERIODS = {'mois': 1, 'trimestre': 3}
+
+SOLVED_COLUMN = 'diaGen_var_hgcn_1'
+PERIOD = 'periode'
+PATIENTS = 'patients'
+SOLVED = 'resolus'
+OTHER = 'Autres'
+
+_DAY = np.timedelta64(1, 'D')
+
+
+def timeline_columns():
+    """Colonnes lues par ``Timeline``."""
+    return list(dict.fromkeys([*EVENTS.values(), *GROUPS.values(), SOLVED_COLUMN]))
+
+
+def _dates(series):
+    return series.to_numpy(dtype='datetime64[ns]')
+
+
+def _months(dates):
+    # Numéro de mois depuis janvier 1970
+    return dates.astype('datetime64[M]').astype(np.int64)
+
+
+def period_start(months, period='mois'):
+    """Date de début des périodes de numéros ``months`` (mois depuis 1970, ou trimestres pour ``trimestre``)."""
+    return (np.asarray(months, dtype=np.int64) * PERIODS[period]).astype('datetime64[M]').astype('datetime64[ns]')
+
+
+class DateIndex:
+    """Dates connues d'un événement, triées, avec la position de leur ligne dans la table d'origine."""
+
+    def __init__(self, dates):
+        dates = np.asarray(dates, dtype='datetime64[ns]')
+        positions = np.flatnonzero(~np.isnat(dates))
+        order = np.argsort(dates[positions], kind='stable')
+        self.dates = dates[positions][order]
+        self.positions = positions[order]
+
+    def __len__(self):
+        return len(self.dates)
+
+    def span(self):
+        """Première et dernière date (``None`` si aucune date)."""
+        if not len(self.dates):
+            return None
+        return pd.Timestamp(self.dates[0]), pd.Timestamp(self.dates[-1])
+
+    def bounds(self, start=None, end=None):
+        """Plage ``[début, fin[`` de l'index des dates comprises dans ``[start, end]`` (bornes incluses)."""
+        low = 0 if start is None else np.searchsorted(self.dates, np.datetime64(start, 'ns'), side='left')
+        high = len(self.dates) if end is None else np.searchsorted(self.dates, np.datetime64(end, 'ns'), side='right')
+        return int(low), int(max(low, high))
+
+    def count(self, start=None, end=None):
+        low, high = self.bounds(start, end)
+        return high - low
+
+    def between(self, start=None, end=None):
+        """Positions des lignes datées dans ``[start, end]``, par date croissante."""
+        low, high = self.bounds(start, end)
+        return self.positions[low:high]
+
+    def window_counts(self, ends, days):
+        """Nombre de dates dans la fenêtre glissante de ``days`` jours se terminant à chacune des dates ``ends``."""
+        ends = np.asarray(ends, dtype='datetime64[ns]')
+        return (np.searchsorted(self.dates, ends, side='right')
+                - np.searchsorted(self.dates, ends - days * _DAY, side='right'))
+
+
+class Timeline:
+    """Index de dates et effectifs mensuels des événements d'une table (une par version des données)."""
+
+    def __init__(self, df):
+        self.n_rows = len(df)
+        self.indexes = {event: DateIndex(_dates(df[col])) for event, col in EVENTS.items() if col in df.columns}
+        self.solved = (df[SOLVED_COLUMN].notna().to_numpy() if SOLVED_COLUMN in df.columns
+                       else np.zeros(len(df), dtype=bool))
+        # Codes des valeurs de chaque dimension (-1 si manquante)
+        self.groups = {}
+        for dim, col in GROUPS.items():
+            if col in df.columns:
+                codes, values = pd.factorize(df[col])
+                self.groups[dim] = (codes, pd.Index(values).astype(str))
+
+        # Délai des premiers signes au compte rendu génétique (années), dans l'ordre de l'index des comptes rendus
+        self.delays = np.empty(0)
+        self.delay_dates = np.empty(0, dtype='datetime64[ns]')
+        if {'premiers_signes', 'compte_rendu'} <= set(self.indexes):
+            report = self.indexes['compte_rendu']
+            first_signs = _dates(df[EVENTS['premiers_signes']])[report.positions]
+            delays = (report.dates - first_signs) / _DAY / 365.25
+            # Délais inconnus ou négatifs (premiers signes datés après le compte rendu) écartés
+            known = ~np.isnan(delays) & (delays >= 0)
+            self.delays, self.delay_dates = delays[known], report.dates[known]
+
+        self._monthly = {}
+        for event, index in self.indexes.items():
+            months = _months(index.dates)
+            solved = self.solved[index.positions]
+            self._monthly[event, None] = self._count(months, solved)
+            for dim, (codes, values) in self.groups.items():
+                self._monthly[event, dim] = self._count(months, solved, values, codes[index.positions])
+
+    @staticmethod
+    def _count(months, solved, values=None, codes=None):
+        frame = pd.DataFrame({PERIOD: months, PATIENTS: 1, SOLVED: solved.astype(np.int64)})
+        keys = [PERIOD]
+        if values is not None:
+            known = codes >= 0
+            frame = frame[known].assign(valeur=pd.Categorical.from_codes(codes[known], values))
+            keys.append('valeur')
+        return frame.groupby(keys, observed=True, sort=True)[[PATIENTS, SOLVED]].sum().reset_index()
+
+    def events(self):
+        return list(self.indexes)
+
+    def span(self, event='inclusion'):
+        return self.indexes[event].span() if event in self.indexes else None
+
+    def count(self, event, start=None, end=None):
+        """Nombre de patients dont l'événement est daté dans ``[start, end]``."""
+        return self.indexes[event].count(start, end) if event in self.indexes else 0
+
+    def rollup(self, event, period='mois', by=None, start=None, end=None, limit=None):
+        """Patients et patients résolus par période (``mois`` ou ``trimestre``), ventilés selon ``by``.
+
+        La table mensuelle précalculée est restreinte à ``[start, end]`` au mois
+        près (recherche dichotomique sur ses mois triés) : avec des bornes en
+        début et fin de mois, les effectifs concordent avec ``count``. Avec ``limit``, seules
+        les ``limit`` valeurs les plus fréquentes sur l'intervalle sont gardées,
+        les autres regroupées sous « Autres ».
+        """
+        table = self._monthly.get((event, by))
+        if table is None:
+            return pd.DataFrame(columns=[PERIOD, PATIENTS, SOLVED])
+        months = table[PERIOD].to_numpy()
+        low = 0 if start is None else np.searchsorted(months, _months(np.datetime64(start, 'ns')), side='left')
+        high = len(months) if end is None else np.searchsorted(months, _months(np.datetime64(end, 'ns')), side='right')
+        table = table.iloc[low:high]
+        keys = [PERIOD]
+        if by is not None:
+            keys.append('valeur')
+            values = table['valeur'].astype(str)
+            if limit is not None:
+                top = table.groupby(values, sort=False)[PATIENTS].sum().nlargest(limit).index
+                values = values.where(values.isin(top), OTHER)
+            table = table.assign(valeur=values)
+        table = table.assign(**{PERIOD: table[PERIOD] // PERIODS[period]})
+        table = table.groupby(keys, sort=True)[[PATIENTS, SOLVED]].sum().reset_index()
+        table[PERIOD] = period_start(table[PERIOD], period)
+        return table
+
+    def rolling(self, event, ends, days=365):
+        """Patients dont l'événement tombe dans les ``days`` jours précédant chacune des dates ``ends``."""
+        if event not in self.indexes:
+            return np.zeros(len(ends), dtype=np.int64)
+        return self.indexes[event].window_counts(ends, days)
+
+    def delay_summary(self, period='trimestre', start=None, end=None):
+        """Délai (années) des premiers signes au compte rendu génétique par période du compte rendu.
+
+        Médiane, quartiles et nombre de patients ; les comptes rendus sont
+        retrouvés par recherche dichotomique de chaque début de période.
+        """
+        dates, delays = self._delays(start, end)
+        columns = [PERIOD, PATIENTS, 'q1', 'mediane', 'q3']
+        if not len(dates):
+            return pd.DataFrame(columns=columns)
+        periods = np.unique(_months(dates) // PERIODS[period])
+        bounds = np.append(np.searchsorted(dates, period_start(periods, period), side='left'), len(dates))
+        rows = []
+        for number, first, last in zip(periods, bounds[:-1], bounds[1:]):
+            q1, median, q3 = np.percentile(delays[first:last], [25, 50, 75])
+            rows.append((number, last - first, q1, median, q3))
+        table = pd.DataFrame(rows, columns=columns)
+        table[PERIOD] = period_start(table[PERIOD], period)
+        return table
+
+    def delays_between(self, start=None, end=None):
+        """Délais (années) des patients dont le compte rendu est daté dans ``[start, end]``."""
+        return self._delays(start, end)[1]
+
+    def _delays(self, start, end):
+        # Dates des comptes rendus et délais dans [start, end], par recherche dichotomique
+        low = 0 if start is None else np.searchsorted(self.delay_dates, np.datetime64(start, 'ns'), side='left')
+        high = len(self.delay_dates) if end is None else \
+            np.searchsorted(self.delay_dates, np.datetime64(end, 'ns'), side='right')
+        return self.delay_dates[low:high], self.delays[low:high]
@@ -0,0 +1,242 @@
+"""Table longue des gènes et variants de tous les emplacements ``diaGen_var_*``.
+
+L'export est large : le gène ``g`` d'un patient est dans ``diaGen_var_hgcn_g``,
+son nombre de variants dans ``diaGen_var_nbvar_g`` et la classe et la nature de
+son variant ``v`` dans ``diaGen_var_classe_g_v`` et ``diaGen_var_nature_g_v``.
+La table est remise au format long une seule fois : les colonnes d'un même
+type sont empilées en matrices (lignes × emplacements) et les cases remplies
+sont extraites par ``np.nonzero``, sans boucle sur les patients.
+
+Deux tables en résultent, triées par ligne de l'export : une ligne par patient
+et gène (``genes``) et une ligne par patient, gène et variant (``variants``).
+Un index par gène (positions des patients porteurs) et un index par patient
+(plage de ses lignes dans chaque table) évitent de reparcourir les colonnes
+larges ; les patients à plusieurs gènes sont comptés pour chacun de leurs gènes.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from fredd.cube import PATIENTS, VARIANTS
+
+ROW = 'row'
+GENE_SLOT = 'gene_slot'
+VARIANT_SLOT = 'variant_slot'
+GENE = 'gene'
+CLASSE = 'classe'
+NATURE = 'nature'
+
+# Colonnes de l'export recopiées sur chaque ligne des tables longues
+CONTEXT_COLUMNS = ['leg_site_inc_nom', 'diaCli_diagMR_nom']
+
+_GENE_PATTERN = re.compile(r'diaGen_var_hgcn_(\d+)')
+_NBVAR_PATTERN = re.compile(r'diaGen_var_nbvar_(\d+)')
+_VARIANT_PATTERN = re.compile(r'diaGen_var_(classe|nature)_(\d+)_(\d+)')
+
+
+def gene_columns(columns):
+    """Colonnes ``diaGen_var_hgcn_g`` présentes parmi ``columns``, par emplacement croissant."""
+    slots = [(int(m.group(1)), col) for col in columns if (m := _GENE_PATTERN.fullmatch(col))]
+    return [col for _, col in sorted(slots)]
+
+
+def variant_columns(columns):
+    """Colonnes des emplacements de gènes et de variants présentes parmi ``columns``."""
+    patterns = (_GENE_PATTERN, _NBVAR_PATTERN, _VARIANT_PATTERN)
+    return [col for col in columns if any(p.fullmatch(col) for p in patterns)]
+
+
+def _stack(columns, n, dtype=float):
+    # Matrice lignes × emplacements (éventuellement sans colonne)
+    return np.column_stack(columns) if columns else np.empty((n, 0), dtype=dtype)
+
+
+def _numbers(df, name):
+    # Valeurs d'une colonne en flottants (NaN si manquante ou absente de l'export)
+    if name not in df.columns:
+        return np.full(len(df), np.nan)
+    return df[name].to_numpy(dtype=float, na_value=np.nan)
+
+
+def _gene_codes(series, categories):
+    # Codes des gènes dans ``categories`` (-1 si manquant), sans repasser par le texte pour les catégorielles
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        mapping = np.append(categories.get_indexer(series.cat.categories.astype(str)), -1)
+        return mapping[series.cat.codes.to_numpy()]
+    return pd.Categorical(series.astype(object), categories=categories).codes
+
+
+def _gene_values(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.categories.astype(str)
+    return series.dropna().astype(str).unique()
+
+
+def _codes(values):
+    return pd.array(values, dtype='Float64').astype('Int8')
+
+
+class VariantStore:
+    """Tables longues ``genes`` et ``variants`` d'un export, indexées par gène et par patient.
+
+    ``n_patients`` est le nombre de lignes (patients) couvertes, y compris
+    celles sans gène ; la colonne ``row`` donne la position de la ligne d'origine.
+    """
+
+    def __init__(self, genes, variants, n_patients):
+        self.genes = genes
+        self.variants = variants
+        self.n_patients = n_patients
+        rows = genes[ROW].to_numpy()
+        n_rows = int(rows.max()) + 1 if len(rows) else 0
+        # Index par patient : plage [début, fin[ des lignes de chaque patient, dans chaque table
+        self._gene_bounds = np.searchsorted(rows, np.arange(n_rows + 1))
+        self._variant_bounds = np.searchsorted(variants[ROW].to_numpy(), np.arange(n_rows + 1))
+        # Index par gène : patients porteurs (positions triées, sans doublon), gènes par ordre d'apparition
+        all_codes = genes[GENE].cat.codes.to_numpy()
+        present, first_seen = np.unique(all_codes, return_index=True)
+        order = np.lexsort((rows, all_codes))
+        codes, carriers = all_codes[order], rows[order]
+        keep = np.ones(len(codes), dtype=bool)
+        keep[1:] = (codes[1:] != codes[:-1]) | (carriers[1:] != carriers[:-1])
+        codes, carriers = codes[keep], carriers[keep]
+        appearance = present[np.argsort(first_seen, kind='stable')]
+        starts = np.searchsorted(codes, appearance, side='left')
+        stops = np.searchsorted(codes, appearance, side='right')
+        categories = genes[GENE].cat.categories
+        self._gene_rows = {categories[code]: carriers[start:stop]
+                           for code, start, stop in zip(appearance, starts, stops)}
+
+    @classmethod
+    def from_frame(cls, df):
+        """Remise au format long des colonnes ``diaGen_var_*`` de ``df`` (lignes numérotées de 0 à n-1)."""
+        n = len(df)
+        columns = gene_columns(df.columns)
+        slots = np.array([int(_GENE_PATTERN.fullmatch(col).group(1)) for col in columns], dtype=np.int16)
+        # Catégories communes à tous les emplacements, puis matrice des codes lignes × emplacements
+        categories = pd.Index(pd.unique(np.concatenate([np.asarray(_gene_values(df[col]), dtype=object)
+                                                        for col in columns] + [np.array([], dtype=object)])))
+        matrix = _stack([_gene_codes(df[col], categories) for col in columns], n, dtype=np.int64)
+
+        rows, slot = np.nonzero(matrix >= 0)
+        genes = pd.DataFrame({
+            ROW: rows,
+            GENE_SLOT: slots[slot],
+            GENE: pd.Categorical.from_codes(matrix[rows, slot], categories=categories),
+            VARIANTS: _stack([_numbers(df, f'diaGen_var_nbvar_{g}') for g in slots], n)[rows, slot],
+        })
+
+        # Emplacements (gène, variant) décrits par une classe ou une nature
+        pairs = sorted({(int(m.group(2)), int(m.group(3))) for col in df.columns
+                        if (m := _VARIANT_PATTERN.fullmatch(col)) and int(m.group(2)) in slots})
+        pair_genes = np.array([g for g, _ in pairs], dtype=np.int16)
+        pair_variants = np.array([v for _, v in pairs], dtype=np.int16)
+        pair_slot = np.searchsorted(slots, pair_genes) if len(slots) else pair_genes.astype(int)
+        classes = _stack([_numbers(df, f'diaGen_var_classe_{g}_{v}') for g, v in pairs], n)
+        natures = _stack([_numbers(df, f'diaGen_var_nature_{g}_{v}') for g, v in pairs], n)
+        filled = (matrix[:, pair_slot] >= 0) & (~np.isnan(classes) | ~np.isnan(natures))
+        variant_rows, pair = np.nonzero(filled)
+        variants = pd.DataFrame({
+            ROW: variant_rows,
+            GENE_SLOT: pair_genes[pair],
+            VARIANT_SLOT: pair_variants[pair],
+            GENE: pd.Categorical.from_codes(matrix[variant_rows, pair_slot[pair]], categories=categories),
+            CLASSE: _codes(classes[variant_rows, pair]),
+            NATURE: _codes(natures[variant_rows, pair]),
+        })
+
+        for col in CONTEXT_COLUMNS:
+            if col in df.columns:
+                values = df[col].reset_index(drop=True)
+                genes[col] = values.take(genes[ROW]).reset_index(drop=True)
+                variants[col] = values.take(variants[ROW]).reset_index(drop=True)
+        return cls(genes, variants, n)
+
+    def __len__(self):
+        return len(self.genes)
+
+    def values(self, column=GENE):
+        """Valeurs distinctes (non manquantes) de ``column`` ; les gènes par ordre d'apparition."""
+        if column == GENE:
+            return list(self._gene_rows)
+        return self.genes[column].dropna().unique().tolist()
+
+    def gene_positions(self):
+        """``(gènes, positions)`` : pour chaque gène, positions triées des patients qui le portent."""
+        return list(self._gene_rows), list(self._gene_rows.values())
+
+    def rows(self, genes):
+        """Positions triées des patients portant l'un des ``genes``, quel que soit l'emplacement."""
+        found = [self._gene_rows[gene] for gene in genes if gene in self._gene_rows]
+        return np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+
+    def subset(self, positions):
+        """Tables réduites aux patients ``positions`` (triées), par l'index par patient."""
+        positions = np.asarray(positions, dtype=np.int64)
+        n_patients = len(positions)
+        # Les patients après le dernier porteur d'un gène n'ont aucune ligne
+        positions = positions[positions < len(self._gene_bounds) - 1]
+
+        def take(table, bounds):
+            starts, stops = bounds[positions], bounds[positions + 1]
+            lengths = stops - starts
+            offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+            return table.take(offsets + np.arange(lengths.sum())).reset_index(drop=True)
+
+        return VariantStore(take(self.genes, self._gene_bounds), take(self.variants, self._variant_bounds),
+                            n_patients)
+
+    def slice(self, filters):
+        """Lignes dont chaque colonne de ``filters`` prend l'une des valeurs données (liste vide : pas de filtre).
+
+        Les patients sans gène n'étant pas dans les tables, ``n_patients`` ne compte alors que les porteurs.
+        """
+        genes, variants = self.genes, self.variants
+        for col, values in filters.items():
+            if values:
+                genes = genes[genes[col].isin(values)]
+                variants = variants[variants[col].isin(values)]
+        patients = genes[ROW].nunique()
+        return VariantStore(genes.reset_index(drop=True), variants.reset_index(drop=True), patients)
+
+    def _table(self, columns):
+        return self.genes if all(col in self.genes.columns for col in columns) else self.variants
+
+    def rollup(self, columns, measure=PATIENTS):
+        """Patients distincts (ou somme des variants) par combinaison de ``columns``, par ordre décroissant.
+
+        ``columns`` sont prises dans ``genes`` si possible, sinon dans ``variants`` ;
+        les combinaisons avec une valeur manquante sont ignorées.
+        """
+        table = self._table(columns).dropna(subset=columns)
+        if measure == PATIENTS:
+            rolled = table.drop_duplicates([ROW] + columns).groupby(columns, observed=True, sort=False).size()
+        elif measure == VARIANTS:
+            rolled = table.groupby(columns, observed=True, sort=False)[VARIANTS].sum()
+        else:
+            raise KeyError(measure)
+        rolled = rolled.rename(measure).reset_index()
+        return rolled.sort_values(measure, ascending=False, kind='stable').reset_index(drop=True)
+
+    def counts(self, column=GENE, dropna=True):
+        """Patients par valeur de ``column``, par ordre décroissant.
+
+        Avec ``dropna=False``, les patients sans aucune valeur sont comptés sous ``NaN``.
+        """
+        counts = self.rollup([column]).set_index(column)[PATIENTS]
+        if not dropna:
+            without = self.n_patients - self._table([column]).dropna(subset=[column])[ROW].nunique()
+            if without:
+                counts = pd.concat([counts, pd.Series([without], index=[np.nan])])
+                counts = counts.sort_values(ascending=False, kind='stable').rename(PATIENTS)
+        return counts
+
+    def nunique(self, column=GENE):
+        return self._table([column])[column].nunique()
+
+    def nunique_by(self, column, by):
+        """Nombre de valeurs distinctes de ``column`` pour chaque valeur de ``by``."""
+        table = self._table([column, by])
+        return table.groupby(by, observed=True)[column].nunique()
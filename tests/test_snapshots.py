@@ -0,0 +1,51 @@
+"""Conversion par delta : même snapshot et mêmes agrégats qu'une reconversion complète."""
+
+import pandas as pd
+import pytest
+
+import fredd.snapshots
+from fredd.aggregates import AGGREGATE_KEYS
+from fredd.snapshots import HASH_COLUMN, convert_csv, load_aggregates, load_snapshot, snapshot_columns
+from fredd.synthetic import CSV_SEP, synthetic_export
+
+
+def _snapshot(root):
+    df = load_snapshot(root, columns=snapshot_columns(root))
+    return df.sort_values(['id', HASH_COLUMN], ignore_index=True)
+
+
+def _counts(root, name):
+    return load_aggregates(root).counts(name).sort_values(AGGREGATE_KEYS[name], ignore_index=True)
+
+
+def _changed(raw):
+    raw = raw.copy()
+    raw.loc[3, 'adm_sexe'] = 1 if str(raw.loc[3, 'adm_sexe']) == '2' else 2
+    return raw
+
+
+def _removed(raw):
+    return raw.drop(index=range(50, 60))
+
+
+@pytest.mark.parametrize('update', [_changed, _removed])
+def test_delta_matches_full_conversion(tmp_path, monkeypatch, update):
+    raw = synthetic_export(200, 'Site test', seed=1)
+    path = tmp_path / 'export.csv'
+    raw.to_csv(path, sep=CSV_SEP, index=False)
+    convert_csv(path, tmp_path / 'delta')
+
+    update(raw).to_csv(path, sep=CSV_SEP, index=False)
+    if update is _removed:
+        # Lignes seulement supprimées : rien n'est relu ni prétraité
+        with monkeypatch.context() as patch:
+            patch.setattr(fredd.snapshots, 'read_export', pytest.fail)
+            _, delta = convert_csv(path, tmp_path / 'delta')
+    else:
+        _, delta = convert_csv(path, tmp_path / 'delta')
+    convert_csv(path, tmp_path / 'full', full=True)
+
+    assert delta['inchangees'] == len(update(raw)) - delta['nouvelles'] - delta['modifiees']
+    pd.testing.assert_frame_equal(_snapshot(tmp_path / 'delta'), _snapshot(tmp_path / 'full'))
+    for name in AGGREGATE_KEYS:
+        pd.testing.assert_frame_equal(_counts(tmp_path / 'delta', name), _counts(tmp_path / 'full', name))
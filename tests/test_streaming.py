@@ -0,0 +1,21 @@
+"""Chargement en flux : mêmes types de colonnes qu'un chargement en une fois."""
+
+import io
+
+import pandas as pd
+
+from fredd.preprocessing import preprocess
+from fredd.streaming import CSV_SEP, stream_exports
+
+EXPORT = "id;leg_site_inc_nom;exaChv_type\n1;A;\n2;A;\n3;B;Goldmann\n4;B;Humphrey\n5;A;\n"
+
+
+def test_declared_category_with_empty_chunk():
+    # Le premier bloc de deux lignes n'a aucune valeur de exaChv_type (lu en float)
+    streamed, _ = stream_exports([('a.csv', EXPORT.encode())], chunksize=2)
+    loaded = preprocess(pd.read_csv(io.StringIO(EXPORT), sep=CSV_SEP))
+    column = streamed['exaChv_type']
+    assert isinstance(column.dtype, pd.CategoricalDtype)
+    assert list(column.cat.categories) == list(loaded['exaChv_type'].cat.categories) == ['Goldmann', 'Humphrey']
+    assert column.isna().tolist() == [True, True, False, False, True]
+    assert column.dropna().tolist() == ['Goldmann', 'Humphrey']